@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Benchmark myrktop's collectors against a synthetic RK3588 sysfs/procfs tree.
+
+Builds a fake board under a temporary directory (8 cores in A55/A76 clusters,
+3 NPU cores, several NICs, two NVMe and two USB disks, 50 Docker containers,
+2000 DMA-buf buffers, 200 processes), points the collectors
+at it with myrktop.configure() and a stub command runner, then reports per
+collector and for a full build_dashboard() pass:
+
+  * latency (mean / p50 / p99) measured with perf_counter_ns
+  * bytes allocated at peak per call (tracemalloc)
+  * Python-level file calls per call: os.open/read/stat/listdir/... and
+    builtin open(), counted by wrapping them. Reads through a file object
+    returned by open() are not included.
+  * read syscalls per call, from the kernel's syscr counter in /proc/self/io.
+    This includes the reads behind file objects, but no open/stat/getdents.
+
+No Rockchip hardware, root privileges or smartctl are needed:
+
+    python3 benchmarks/bench_collectors.py --iterations 500
+    python3 benchmarks/bench_collectors.py --json > bench.json
+"""
+import argparse
+import builtins
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import myrktop  # noqa: E402
+
+CORES = 8
+NPU_CORES = 3
+INTERFACES = ["lo", "eth0", "enP3p49s0", "enP4p65s0", "docker0", "veth1a2b3c", "wlan0"]
+NVME_DISKS = ["nvme0n1", "nvme1n1"]
+USB_DISKS = ["sda", "sdb"]
+CONTAINERS = 50
+DMA_BUFS = 2000
+PROCESSES = 200
+FIRST_PID = 1000
+
+SMARTCTL_OUTPUT = b"""{
+  "smartctl": {"version": [7, 3], "exit_status": 0},
+  "device": {"name": "/dev/sda", "type": "sat"},
+  "model_name": "Portable SSD T7",
+  "serial_number": "S5SXNG0R123456",
+  "smart_status": {"passed": true},
+  "temperature": {"current": 36},
+  "power_on_time": {"hours": 1234}
+}
+"""
+
+# Filesystem entry points the collectors reach through the os module
+OS_CALLS = ("open", "read", "pread", "preadv", "stat", "lstat", "listdir", "scandir", "readlink", "statvfs")
+
+
+def write(root, path, content):
+    full = os.path.join(root, path.lstrip("/"))
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    mode = "wb" if isinstance(content, bytes) else "w"
+    with open(full, mode) as f:
+        f.write(content)
+
+
+def link(root, path, target):
+    full = os.path.join(root, path.lstrip("/"))
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    os.symlink(target, full)
+
+
+def build_tree(root, tick=0):
+    """Write the synthetic board; `tick` advances every counter so deltas are non-zero."""
+    stat = ["cpu  %d 0 %d %d 0 0 0 0 0 0" % (800 * tick, 200 * tick, 8000 * tick)]
+    for core in range(CORES):
+        stat.append("cpu%d %d %d %d %d %d %d %d 0 0 0" % (
+            core, 100 * tick + core, tick, 25 * tick, 1000 * tick, 5 * tick, tick, 2 * tick))
+    stat.append("intr " + " ".join(str(i * tick) for i in range(1200)))
+    stat.append("ctxt %d" % (123456 * tick))
+    write(root, "/proc/stat", "\n".join(stat) + "\n")
+
+    cpuinfo = []
+    for core in range(CORES):
+        part = "0xd05" if core < 4 else "0xd0b"
+        cpuinfo.append(f"processor\t: {core}\nBogoMIPS\t: 48.00\nCPU implementer\t: 0x41\nCPU part\t: {part}\n")
+    write(root, "/proc/cpuinfo", "\n".join(cpuinfo))
+    write(root, "/proc/meminfo", "MemTotal:       16146624 kB\nMemFree:         9412412 kB\n"
+                                 "MemAvailable:   12933520 kB\nBuffers:          123456 kB\n"
+                                 "Cached:          3011245 kB\nSwapTotal:       8073308 kB\n"
+                                 "SwapFree:        8073308 kB\nCmaTotal:        1048576 kB\n"
+                                 "CmaFree:          262144 kB\n")
+    write(root, "/proc/uptime", "349123.45 2712345.67\n")
+
+    net = ["Inter-|   Receive                                                |  Transmit",
+           " face |bytes    packets errs drop fifo frame compressed multicast|"
+           "bytes    packets errs drop fifo colls carrier compressed"]
+    for i, ifname in enumerate(INTERFACES):
+        rx, tx = (i + 1) * 1000000 * tick, (i + 1) * 250000 * tick
+        net.append(f"{ifname:>6}: {rx} {rx // 1000} 0 0 0 0 0 {tick} {tx} {tx // 1000} 0 0 0 0 0 0")
+    write(root, "/proc/net/dev", "\n".join(net) + "\n")
+
+    diskstats = []
+    for minor, name in enumerate(["loop0", "loop1", "zram0"] + NVME_DISKS + ["nvme0n1p1", "nvme0n1p2"] + USB_DISKS):
+        diskstats.append(f"{259 if name.startswith('nvme') else 8:4d} {minor:7d} {name} "
+                         + " ".join(str((i + 1) * 10 * tick) for i in range(17)))
+    write(root, "/proc/diskstats", "\n".join(diskstats) + "\n")
+
+    for i in range(CONTAINERS):
+        scope = f"/sys/fs/cgroup/system.slice/docker-{container_id(i)}.scope"
+        write(root, f"{scope}/cpu.stat", f"usage_usec {(i + 1) * 20000 * tick}\nuser_usec 0\nsystem_usec 0\n")
+        write(root, f"{scope}/memory.current", f"{(i + 1) << 22}\n")
+        write(root, f"{scope}/memory.peak", f"{(i + 2) << 22}\n")
+        for resource in ("cpu", "memory", "io"):
+            write(root, f"{scope}/{resource}.pressure", f"some avg10=0.00 avg60=0.00 avg300=0.00 total={i * tick}\n"
+                                                        f"full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n")
+        write(root, f"{scope}/io.stat", f"259:0 rbytes={4096 * i * tick} wbytes={8192 * tick} rios={i * tick} "
+                                        f"wios={tick} dbytes=0 dios=0\n")
+
+    cpu = "/sys/devices/system/cpu"
+    write(root, f"{cpu}/possible", f"0-{CORES - 1}\n")
+    for core in range(CORES):
+        policy = 0 if core < 4 else (4 if core < 6 else 6)
+        related = " ".join(str(c) for c in range(policy, 4 if policy == 0 else policy + 2))
+        write(root, f"{cpu}/cpu{core}/cpufreq/scaling_cur_freq", "1800000\n" if core < 4 else "2256000\n")
+        write(root, f"{cpu}/cpu{core}/cpufreq/related_cpus", related + "\n")
+
+    for policy, (hw_max, cap) in {0: (1800000, 1800000), 4: (2256000, 1608000), 6: (2256000, 2256000)}.items():
+        base = f"{cpu}/cpufreq/policy{policy}"
+        write(root, f"{base}/cpuinfo_max_freq", f"{hw_max}\n")
+        write(root, f"{base}/scaling_max_freq", f"{cap}\n")
+        write(root, f"{base}/scaling_cur_freq", f"{cap}\n")
+    # policy6 has no stats/, like a kernel built without CONFIG_CPU_FREQ_STAT
+    for policy, freqs in {0: (408000, 1008000, 1800000), 4: (408000, 1608000, 2256000)}.items():
+        base = f"{cpu}/cpufreq/policy{policy}/stats"
+        write(root, f"{base}/time_in_state", "".join(f"{f} {(i + 1) * 40 * tick}\n" for i, f in enumerate(freqs)))
+        write(root, f"{base}/total_trans", f"{6 * tick}\n")
+        header = "   From  :    To\n         : " + "".join(f"{f:>10}" for f in freqs) + "\n"
+        write(root, f"{base}/trans_table", header + "".join(
+            f"{f:>9}: " + "".join(f"{0 if i == j else tick:>10}" for j in range(len(freqs))) + "\n"
+            for i, f in enumerate(freqs)))
+    for device, freqs in {"fb000000.gpu": (300, 600, 1000), "fdab0000.npu": (300, 700, 1000)}.items():
+        write(root, f"/sys/class/devfreq/{device}/available_frequencies",
+              " ".join(str(f * 1000000) for f in freqs) + "\n")
+        write(root, f"/sys/class/devfreq/{device}/max_freq", f"{freqs[-1] * 1000000}\n")
+    write(root, "/sys/class/devfreq/fb000000.gpu/load", "37@600000000Hz\n")
+    gpu_freqs = (300000000, 600000000, 1000000000)
+    write(root, "/sys/class/devfreq/fb000000.gpu/trans_stat",
+          "     From  :   To\n           :" + "".join(f"{f:>11}" for f in gpu_freqs) + "   time(ms)\n" + "".join(
+              f"{'*' if f == 600000000 else ' '}{f:>10}:" + "".join(f"{0 if i == j else tick:>11}"
+                                                             for j in range(len(gpu_freqs)))
+              + f"{(i + 1) * 300 * tick:>11}\n" for i, f in enumerate(gpu_freqs))
+          + f"Total transition : {6 * tick}\n")
+
+    write(root, "/sys/class/devfreq/fb000000.gpu/cur_freq", "600000000\n")
+    write(root, "/sys/class/devfreq/fdab0000.npu/cur_freq", "1000000000\n")
+    write(root, "/sys/kernel/debug/rknpu/load", "NPU load:  Core0: 45%, Core1: 12%, Core2:  0%,\n")
+    write(root, "/sys/kernel/debug/rknpu/version", "RKNPU driver: v0.9.6\n")
+    write(root, "/proc/mpp_service/load", f"fdc38100.rkvdec-core0 load: {tick % 100}.00% utilization: 1.00%\n"
+                                          "fdc48100.rkvdec-core1 load: 3.50% utilization: 1.00%\n"
+                                          "fdbd0000.rkvenc-core0 load: 20.00% utilization: 9.00%\n"
+                                          "fdb50400.vdpu load: 0.00% utilization: 0.00%\n")
+    write(root, "/proc/rkisp0-vir0", f"Isp online\nInterrupt  Cnt:{30 * tick} ErrCnt:0\n")
+    write(root, "/sys/kernel/debug/rkrga/load",
+          "num of scheduler = 3\n================= load ==================\n"
+          "scheduler[0]: rga3_core0\n\t load = 4%\n-----------------------------------\n"
+          "scheduler[1]: rga3_core1\n\t load = 0%\n-----------------------------------\n"
+          "scheduler[2]: rga2\n\t load = 9%\n-----------------------------------\n")
+    write(root, "/sys/firmware/devicetree/base/compatible", b"rockchip,rk3588-orangepi-5-plus\x00rockchip,rk3588\x00")
+    write(root, "/sys/fs/cgroup/system.slice/docker.service/cgroup.procs", "1234\n")
+
+    for i in range(PROCESSES):
+        pid = FIRST_PID + i
+        # Fields 3-24 of proc(5): utime/stime grow with the tick, starttime and rss are fixed
+        write(root, f"/proc/{pid}/stat", f"{pid} (worker {i}) S 1 {pid} {pid} 0 -1 4194560 {tick} 0 0 0 "
+                                         f"{i * tick} {tick} 0 0 20 0 1 0 {100 + i} {1 << 24} {256 + i} "
+                                         "18446744073709551615 1 1 0 0 0 0 0 0 0 0 0 0 17 0 0 0 0 0 0\n")
+    write(root, "/etc/fstab", "# <file system> <mount point> <type> <options> <dump> <pass>\n"
+                              "UUID=1234 / ext4 defaults 0 1\nUUID=abcd /boot vfat defaults 0 2\n"
+                              "/swapfile none swap sw 0 0\n")
+
+
+def container_id(index):
+    return f"{index:064x}"
+
+
+def build_static_tree(root):
+    """Parts of the tree that do not change between ticks (hwmon, block devices)."""
+    sensors = ["soc_thermal", "bigcore0_thermal", "bigcore1_thermal", "littlecore_thermal",
+               "center_thermal", "gpu_thermal", "npu_thermal"]
+    for i, name in enumerate(sensors):
+        write(root, f"/sys/class/hwmon/hwmon{i}/name", name + "\n")
+        write(root, f"/sys/class/hwmon/hwmon{i}/temp1_input", f"{41000 + 1100 * i}\n")
+    for i, disk in enumerate(NVME_DISKS):
+        hw = len(sensors) + i
+        pci = f"/sys/devices/platform/fe150000.pcie/pci000{i}/000{i}:01:00.0"
+        write(root, f"{pci}/uevent", "DRIVER=nvme\n")
+        link(root, f"{pci}/subsystem", "../../../../bus/pci")
+        os.makedirs(os.path.join(root, "sys/bus/pci"), exist_ok=True)
+        write(root, f"{pci}/nvme/nvme{i}/model", "Samsung SSD 980 PRO 1TB\n")
+        link(root, f"{pci}/nvme/nvme{i}/device", "../..")
+        link(root, f"{pci}/nvme/nvme{i}/subsystem", "../../../../../../class/nvme")
+        os.makedirs(os.path.join(root, "sys/class/nvme"), exist_ok=True)
+        write(root, f"/sys/class/hwmon/hwmon{hw}/name", "nvme\n")
+        write(root, f"/sys/class/hwmon/hwmon{hw}/temp1_input", "38850\n")
+        write(root, f"/sys/class/hwmon/hwmon{hw}/temp1_label", "Composite\n")
+        link(root, f"/sys/class/hwmon/hwmon{hw}/device", os.path.join(root, pci.lstrip("/"), f"nvme/nvme{i}"))
+        os.makedirs(os.path.join(root, f"sys/block/{disk}"), exist_ok=True)
+        link(root, f"/sys/block/{disk}/device", os.path.join(root, pci.lstrip("/"), f"nvme/nvme{i}"))
+        log = bytearray(myrktop.NVME_SMART_LOG_SIZE)
+        log[1:3] = (273 + 38).to_bytes(2, "little")
+        log[5] = 3
+        log[128:144] = (4321 + i).to_bytes(16, "little")
+        write(root, f"/dev/{disk}", bytes(log))
+    for i, disk in enumerate(USB_DISKS):
+        usb = f"/sys/devices/platform/usbdrd3_0/fc000000.usb/xhci-hcd.0.auto/usb{i + 2}/{i + 2}-1/{i + 2}-1:1.0"
+        write(root, f"{usb}/host{i}/target{i}:0:0/{i}:0:0:0/model", "Portable SSD T7\n")
+        os.makedirs(os.path.join(root, usb.lstrip("/"), f"host{i}/target{i}:0:0/{i}:0:0:0/block/{disk}"))
+        link(root, f"/sys/block/{disk}", os.path.join(root, usb.lstrip("/"),
+                                                        f"host{i}/target{i}:0:0/{i}:0:0:0/block/{disk}"))
+        link(root, f"{usb}/host{i}/target{i}:0:0/{i}:0:0:0/block/{disk}/device", "../..")
+    for name in ("loop0", "loop1", "zram0", "mmcblk0boot0"):
+        os.makedirs(os.path.join(root, f"sys/block/{name}"), exist_ok=True)
+    bufinfo = ["\nDma-buf Objects:", "size            flags           mode            count           exp_name"
+                                     "        ino             name"]
+    for i in range(DMA_BUFS):
+        exporter, device = ("rknpu", "fdab0000.npu") if i % 4 else ("system", "fdb60000.rga")
+        bufinfo.append(f"{(i % 64 + 1) * 65536:08d}\t00000002\t00080007\t00000003\t{exporter}\t{i:08d}\t<none>")
+        bufinfo.append(f"\tAttached Devices:\n\t{device}\nTotal 1 devices attached\n")
+    bufinfo.append(f"\nTotal {DMA_BUFS} objects, 0 bytes")
+    write(root, myrktop.DMABUF_BUFINFO, "\n".join(bufinfo) + "\n")
+    write(root, myrktop.RKNPU_MM, "0x00000000-0x00100000: 1048576: used\n"
+                                  "total: 4294967296, used 1073741824 free 3221225472\n")
+    for i in range(CONTAINERS):
+        write(root, f"{myrktop.DOCKER_CONTAINERS_DIR}/{container_id(i)}/config.v2.json",
+              json.dumps({"Name": f"/inference-{i}"}))
+    for i in range(PROCESSES):
+        pid = FIRST_PID + i
+        write(root, f"/proc/{pid}/comm", f"worker {i}\n")
+        write(root, f"/proc/{pid}/cmdline", f"python3\0/opt/app/worker.py\0--id\0{i}\0")
+        # Every fourth process runs in a container
+        cgroup = f"/system.slice/docker-{container_id(i % CONTAINERS)}.scope" if i % 4 == 0 else "/user.slice"
+        write(root, f"/proc/{pid}/cgroup", f"0::{cgroup}\n")
+        link(root, f"/proc/{pid}/fd/0", "/dev/null")
+        link(root, f"/proc/{pid}/fd/1", f"socket:[{20000 + pid}]")
+        if i % 10 == 0:
+            # Dangling like a real /dmabuf: link, so the fd walk reads it and its stat fails
+            link(root, f"/proc/{pid}/fd/2", f"/dmabuf:{i}")
+
+
+def stub_runner(argv, timeout=None):
+    if argv and argv[0] == "smartctl":
+        return SMARTCTL_OUTPUT
+    return b""
+
+
+class FileCallCounter:
+    """Counts calls to the os-level filesystem functions and builtin open() while active.
+
+    These are Python-level calls, not syscalls: reads through a file object
+    returned by open() are not seen, see read_syscalls() for those.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.originals = {}
+
+    def _wrap(self, module, name):
+        original = getattr(module, name, None)
+        if original is None:
+            return
+        self.originals[(module, name)] = original
+
+        def counted(*args, **kwargs):
+            self.count += 1
+            return original(*args, **kwargs)
+        setattr(module, name, counted)
+
+    def __enter__(self):
+        for name in OS_CALLS:
+            self._wrap(os, name)
+        self._wrap(builtins, "open")
+        return self
+
+    def __exit__(self, *exc):
+        for (module, name), original in self.originals.items():
+            setattr(module, name, original)
+
+
+def read_syscalls():
+    """The kernel's count of read syscalls made by this process (syscr in /proc/self/io)."""
+    with open("/proc/self/io", "rb") as f:
+        for line in f:
+            if line.startswith(b"syscr:"):
+                return int(line.split()[1])
+    return 0
+
+
+def measure(func, iterations, before=None):
+    """Return latency, peak allocation and filesystem call statistics for func()."""
+    func()  # warm up caches and persistent handles
+    timings = []
+    for _ in range(iterations):
+        if before:
+            before()
+        start = time.perf_counter_ns()
+        func()
+        timings.append(time.perf_counter_ns() - start)
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(iterations, 50)):
+        if before:
+            before()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        func()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    runs = min(iterations, 20)
+    with FileCallCounter() as counter:
+        for _ in range(runs):
+            if before:
+                before()
+            func()
+    calls = counter.count / runs
+
+    # The probe's own reads show up in the next probe, so measure them first
+    overhead = -read_syscalls() + read_syscalls()
+    start = read_syscalls()
+    for _ in range(runs):
+        if before:
+            before()
+        func()
+    syscalls = max(0, read_syscalls() - start - overhead) / runs
+
+    timings.sort()
+    return {
+        "mean_us": statistics.fmean(timings) / 1000,
+        "p50_us": timings[len(timings) // 2] / 1000,
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))] / 1000,
+        "peak_alloc_bytes": int(statistics.fmean(peaks)),
+        "file_calls": calls,
+        "read_syscalls": syscalls,
+    }
+
+
+def run(iterations):
+    root = tempfile.mkdtemp(prefix="myrktop-bench-")
+    try:
+        build_static_tree(root)
+        build_tree(root, tick=1)
+        myrktop.configure(root=root, runner=stub_runner)
+        results = {}
+        # gpu, npu, rga and plugins share one plugin plan run per tick; time
+        # each as if it ran alone, i.e. with the whole plan
+        reuse, myrktop.PLAN_REUSE = myrktop.PLAN_REUSE, 0.0
+        try:
+            for name, (func, _) in myrktop.COLLECTORS.items():
+                results[name] = measure(func, iterations)
+        finally:
+            myrktop.PLAN_REUSE = reuse
+
+        sched = myrktop.CollectorScheduler(tiers=dict.fromkeys(myrktop.REFRESH_TIERS, 0.0))
+        sample = sched.refresh()
+        results["build_dashboard (render only)"] = measure(lambda: myrktop.build_dashboard(sample), iterations)
+        results["build_dashboard (all collectors)"] = measure(lambda: myrktop.build_dashboard(sched.refresh()),
+                                                              iterations)
+        return results
+    finally:
+        myrktop.configure(root="/", runner=myrktop.run_command)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200, help="timed runs per collector (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    results = run(max(1, args.iterations))
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    print(f"{'collector':<34} {'mean µs':>9} {'p50 µs':>9} {'p99 µs':>9} {'peak alloc':>11} {'file calls':>10} "
+          f"{'read sys':>9}")
+    for name, r in results.items():
+        print(f"{name:<34} {r['mean_us']:9.1f} {r['p50_us']:9.1f} {r['p99_us']:9.1f} "
+              f"{r['peak_alloc_bytes']:11d} {r['file_calls']:10.1f} {r['read_syscalls']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
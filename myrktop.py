@@ -1,413 +1,3906 @@
 #!/usr/bin/env python3
-import urwid
-import subprocess
+import argparse
 import re
 import os
+import math
+import array
+import errno
+import logging
+import struct
 import time
+import queue
+import signal
+import sys
+import threading
 
-# Globals for CPU and network measurements
-prev_cpu = {}
-prev_rx = None
-prev_tx = None
-prev_net_time = None
+# Root of the filesystem the collectors read (/proc, /sys, /etc, /dev). Point
+# it at a copy of a board's tree with configure() or --root to run elsewhere.
+FS_ROOT = "/"
 
-def get_device_info():
+def host_path(path):
+    """Map an absolute path as seen on the board to the configured root."""
+    if FS_ROOT == "/":
+        return path
+    return os.path.join(FS_ROOT, path.lstrip("/"))
+
+def run_command(argv, timeout=None):
+    """Run a command and return its stdout; swapped out by configure(runner=...)."""
+    import subprocess
+    return subprocess.run(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=timeout).stdout
+
+COMMAND_RUNNER = run_command
+
+# (warning, critical) levels shared by the dashboard colours and the default alert rules
+THRESHOLDS = {"load": (60, 80), "temp": (60, 70), "iowait": (10, 30)}
+
+def level_attr(kind, value, normal="default"):
+    """Palette attribute for a value against THRESHOLDS[kind]."""
+    warning, critical = THRESHOLDS[kind]
+    if value >= critical:
+        return 'temp_red'
+    if value >= warning:
+        return 'temp_yellow'
+    return normal
+
+# Unit of the tick counts in /proc/*/stat and cpufreq time_in_state
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+log = logging.getLogger("myrktop")
+# Nothing reaches the terminal unless main() sets up a handler: stderr output
+# would garble the dashboard
+log.addHandler(logging.NullHandler())
+log.propagate = False
+
+# Errors after which a cached handle is reopened, e.g. when a devfreq driver is
+# reloaded and the sysfs node we hold is replaced by a new one.
+REOPEN_ERRNOS = (errno.ENODEV, errno.ESTALE, errno.EBADF, errno.ENXIO)
+
+# Descriptors left free for sockets, pipes and files opened for a single read
+FD_RESERVE = 64
+
+def fd_budget():
+    """How many descriptors myrktop may keep open between ticks, all caches together."""
+    import resource
+    soft = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+    if soft == resource.RLIM_INFINITY:
+        soft = 1 << 16
+    return max(0, soft - FD_RESERVE)
+
+class SysfsReader:
+    """Keeps sysfs/procfs pseudo-files open and re-reads them with pread at offset 0.
+
+    Each path is opened once and read into a reused buffer, which saves an
+    open()/close() pair per file per tick. Only use it for pseudo-files: a
+    regular file replaced on disk would keep returning the old contents.
+    At most max_handles paths (half of fd_budget() by default) stay open;
+    past that, files are opened for each read.
+    """
+
+    def __init__(self, bufsize=4096, max_handles=None):
+        self.bufsize = bufsize
+        self.max_handles = fd_budget() // 2 if max_handles is None else max_handles
+        self.handles = {}
+        self.lock = threading.Lock()
+
+    def _open(self, path):
+        """The cached handle for path, or None when max_handles are already open."""
+        with self.lock:
+            handle = self.handles.get(path)
+            if handle is None:
+                if len(self.handles) >= self.max_handles:
+                    return None
+                fd = os.open(host_path(path), os.O_RDONLY | os.O_CLOEXEC)
+                handle = [fd, bytearray(self.bufsize), threading.Lock()]
+                self.handles[path] = handle
+            return handle
+
+    def close(self, path=None):
+        """Close the handle of path (all handles by default), after any read in progress on it."""
+        with self.lock:
+            paths = list(self.handles) if path is None else [path]
+            handles = [self.handles.pop(p) for p in paths if p in self.handles]
+        for handle in handles:
+            # Closing under a reader could hand it another file that reuses the fd number
+            with handle[2]:
+                try:
+                    os.close(handle[0])
+                except OSError:
+                    pass
+                handle[0] = -1
+
+    def _pread(self, handle):
+        fd, buf, _ = handle
+        n = os.preadv(fd, [buf], 0)
+        # A full buffer may mean a truncated read (e.g. /proc/stat on many cores)
+        while n == len(buf):
+            buf = handle[1] = bytearray(len(buf) * 2)
+            n = os.preadv(fd, [buf], 0)
+        return bytes(memoryview(buf)[:n])
+
+    def _read_once(self, path):
+        fd = os.open(host_path(path), os.O_RDONLY | os.O_CLOEXEC)
+        try:
+            return self._pread([fd, bytearray(self.bufsize), None])
+        finally:
+            os.close(fd)
+
+    def read(self, path):
+        handle = self.handles.get(path) or self._open(path)
+        if handle is None:
+            return self._read_once(path)
+        with handle[2]:
+            # fd is -1 if close() got the handle first; open the path again
+            if handle[0] >= 0:
+                try:
+                    return self._pread(handle)
+                except OSError as e:
+                    if e.errno not in REOPEN_ERRNOS:
+                        raise
+        self.close(path)
+        handle = self._open(path)
+        if handle is None:
+            return self._read_once(path)
+        with handle[2]:
+            return self._pread(handle)
+
+    def read_text(self, path):
+        return self.read(path).decode("utf-8", "replace")
+
+    def read_int(self, path):
+        return int(self.read(path))
+
+sysfs = SysfsReader()
+
+def format_uptime(seconds):
+    """Format seconds the way `uptime -p` does, e.g. "up 2 days, 3 hours, 5 minutes"."""
+    seconds = int(seconds)
+    units = [
+        ("decade", seconds // (60 * 60 * 24 * 365 * 10)),
+        ("year", (seconds // (60 * 60 * 24 * 365)) % 10),
+        ("week", (seconds // (60 * 60 * 24 * 7)) % 52),
+        ("day", (seconds // (60 * 60 * 24)) % 7),
+        ("hour", (seconds // (60 * 60)) % 24),
+        ("minute", (seconds // 60) % 60),
+    ]
+    parts = [f"{n} {unit}{'s' if n != 1 else ''}" for unit, n in units if n]
+    if not parts:
+        parts = ["0 minutes"]
+    return "up " + ", ".join(parts)
+
+def get_docker_status():
+    """Equivalent of `systemctl is-active docker` without forking systemctl."""
+    try:
+        if sysfs.read("/sys/fs/cgroup/system.slice/docker.service/cgroup.procs").strip():
+            return "active"
+    except Exception:
+        pass
     try:
-        device_info = subprocess.check_output(
-            "cat /sys/firmware/devicetree/base/compatible", shell=True, stderr=subprocess.DEVNULL
-        ).decode("utf-8").replace("\x00", "").strip()
+        with open(host_path("/run/docker.pid"), "r") as f:
+            pid = int(f.read().strip())
+        with open(host_path(f"/proc/{pid}/comm"), "r") as f:
+            if f.read().strip() == "dockerd":
+                return "active"
+    except Exception:
+        pass
+    return "inactive"
+
+def read_device_info():
+    """Return (compatible string, NPU driver version, uptime seconds, docker state)."""
+    try:
+        device_info = sysfs.read_text("/sys/firmware/devicetree/base/compatible").replace("\x00", "").strip()
     except Exception:
         device_info = "N/A"
     try:
-        npu_version = subprocess.check_output(
-            "cat /sys/kernel/debug/rknpu/version", shell=True, stderr=subprocess.DEVNULL
-        ).decode("utf-8").strip()
+        npu_version = sysfs.read_text("/sys/kernel/debug/rknpu/version").strip()
     except Exception:
         npu_version = "N/A"
     try:
-        uptime = subprocess.check_output("uptime -p", shell=True).decode("utf-8").strip()
+        uptime = float(sysfs.read("/proc/uptime").split()[0])
     except Exception:
-        uptime = "N/A"
+        uptime = None
+    docker_status = get_docker_status()
+    return device_info, npu_version, uptime, docker_status
+
+def format_device_info(info):
+    device_info, npu_version, uptime, docker_status = info
+    return device_info, npu_version, "N/A" if uptime is None else format_uptime(uptime), docker_status
+
+# Per-core /proc/stat columns, in file order
+CPU_STAT_FIELDS = ("user", "nice", "system", "idle", "iowait", "irq", "softirq", "steal")
+NUM_CPU_FIELDS = len(CPU_STAT_FIELDS)
+# Time categories reported per core and per cluster ("user" includes nice)
+CPU_TIME_KEYS = ("user", "system", "iowait", "irq", "softirq", "steal")
+
+# "CPU part" values from /proc/cpuinfo for the cores found on Rockchip SoCs
+ARM_CPU_PARTS = {
+    0xd03: "A53", 0xd04: "A35", 0xd05: "A55", 0xd07: "A57",
+    0xd08: "A72", 0xd09: "A73", 0xd0a: "A75", 0xd0b: "A76",
+}
+
+def detect_core_count():
+    """Number of possible CPUs from sysfs (e.g. "0-7"), falling back to os.cpu_count()."""
     try:
-        docker_status = subprocess.check_output("systemctl is-active docker", shell=True, stderr=subprocess.DEVNULL).decode("utf-8").strip()
+        last = sysfs.read_text("/sys/devices/system/cpu/possible").strip().split(",")[-1]
+        return int(last.split("-")[-1]) + 1
     except Exception:
-        docker_status = "N/A"
-    return device_info, npu_version, uptime, docker_status
+        return os.cpu_count() or 1
+
+def _cpu_range(cores):
+    return f"{cores[0]}-{cores[-1]}" if len(cores) > 1 else str(cores[0])
+
+def detect_cpu_clusters(core_count):
+    """Group cores by core type (A55 vs A76 on RK3588), or by cpufreq policy as a fallback.
+
+    Returns a list of (label, [core indexes]).
+    """
+    parts = {}
+    try:
+        with open(host_path("/proc/cpuinfo"), "r") as f:
+            current = None
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "processor":
+                    current = int(value)
+                elif key == "CPU part" and current is not None:
+                    parts[current] = int(value, 16)
+    except Exception:
+        parts = {}
+    groups = {}
+    if len(parts) == core_count:
+        for core in range(core_count):
+            name = ARM_CPU_PARTS.get(parts[core], f"part {parts[core]:#x}")
+            groups.setdefault(name, []).append(core)
+    else:
+        for core in range(core_count):
+            try:
+                related = sysfs.read_text(f"/sys/devices/system/cpu/cpu{core}/cpufreq/related_cpus").split()
+                name = f"policy{related[0]}"
+            except Exception:
+                name = "cpu"
+            groups.setdefault(name, []).append(core)
+    return [(f"{name} ({_cpu_range(cores)})", cores) for name, cores in groups.items()]
+
+class CpuStat:
+    """Per-core /proc/stat counters kept in flat arrays.
+
+    update() parses the file in a single pass into an array of
+    core_count * NUM_CPU_FIELDS counters and takes all deltas against the
+    previous read in one step, so the cost is linear in the number of cores.
+    """
+
+    def __init__(self, core_count=None):
+        self.core_count = core_count or detect_core_count()
+        self.prev = None
+        self.clusters = None
+
+    def parse(self, data):
+        counters = array.array("Q", bytes(8 * self.core_count * NUM_CPU_FIELDS))
+        present = [False] * self.core_count
+        for line in data.split(b"\n"):
+            if not line.startswith(b"cpu"):
+                # The per-core lines come first; stop at "intr", which can be huge
+                break
+            if line[3:4] == b" ":
+                continue
+            fields = line.split()
+            core = int(fields[0][3:])
+            if core >= self.core_count:
+                continue
+            values = fields[1:1 + NUM_CPU_FIELDS]
+            base = core * NUM_CPU_FIELDS
+            counters[base:base + len(values)] = array.array("Q", map(int, values))
+            present[core] = True
+        return counters, present
+
+    def update(self, data):
+        """Return ({core: load %}, {core: {time key: %}}, [(cluster label, cores, {time key: %})])."""
+        counters, present = self.parse(data)
+        prev, self.prev = self.prev, counters
+        if self.clusters is None:
+            self.clusters = detect_cpu_clusters(self.core_count)
+        if prev is None:
+            prev = counters
+        deltas = [cur - old if cur >= old else 0 for cur, old in zip(counters, prev)]
+
+        loads = {}
+        times = {}
+        for core in range(self.core_count):
+            if not present[core]:
+                continue
+            d = deltas[core * NUM_CPU_FIELDS:(core + 1) * NUM_CPU_FIELDS]
+            total = sum(d)
+            # Same definition as before: everything except idle counts as load
+            loads[core] = (100 * (total - d[3])) // total if total > 0 else 0
+            times[core] = self._percentages(d, total)
+
+        clusters = []
+        for label, cores in self.clusters:
+            d = [0] * NUM_CPU_FIELDS
+            for core in cores:
+                if present[core]:
+                    base = core * NUM_CPU_FIELDS
+                    d = [a + b for a, b in zip(d, deltas[base:base + NUM_CPU_FIELDS])]
+            clusters.append((label, cores, self._percentages(d, sum(d))))
+        return loads, times, clusters
+
+    @staticmethod
+    def _percentages(d, total):
+        if total <= 0:
+            return dict.fromkeys(CPU_TIME_KEYS, 0.0)
+        scale = 100.0 / total
+        return {
+            "user": (d[0] + d[1]) * scale,
+            "system": d[2] * scale,
+            "iowait": d[4] * scale,
+            "irq": d[5] * scale,
+            "softirq": d[6] * scale,
+            "steal": d[7] * scale,
+        }
+
+cpu_stat = CpuStat()
+
+def get_cpu_info():
+    core_count = cpu_stat.core_count
+    try:
+        cpu_loads, cpu_times, cpu_clusters = cpu_stat.update(sysfs.read("/proc/stat"))
+    except Exception:
+        cpu_loads, cpu_times, cpu_clusters = {}, {}, []
+
+    cpu_freqs = {}
+    for i in range(core_count):
+        try:
+            freq = sysfs.read_int(f"/sys/devices/system/cpu/cpu{i}/cpufreq/scaling_cur_freq") // 1000  # Convert kHz to MHz
+        except Exception:
+            freq = 0
+        cpu_freqs[i] = freq
+    return cpu_loads, cpu_freqs, {"cores": cpu_times, "clusters": cpu_clusters}
+
+
+
+# Built-in collector plugins. A plugin groups metrics; each metric declares
+#   path   sysfs/procfs glob, or "devfreq:NAME/FILE" for the devfreq device
+#          called NAME or *.NAME (fb000000.gpu on RK3588, fde60000.gpu on RK3568)
+#   parse  "int", "regex:PATTERN" (every match of the first group) or "kv:KEY"
+#          (the number after "KEY=", "KEY:" or "KEY ")
+#   scale  factor applied to parsed numbers (default 1)
+#   multi  keep every match as a per-core list; "limit" caps its length
+#   rate   report the per-second change of a counter instead of its value
+#   unit   shown after the value; "%" values are coloured like loads
+# A glob matching several files also gives a list, one value per file.
+BUILTIN_PLUGINS = (
+    {"name": "gpu", "title": "GPU", "metrics": {
+        # e.g. "37@600000000Hz"
+        "load": {"path": "devfreq:gpu/load", "parse": r"regex:^\s*(\d+)", "unit": "%"},
+        "freq": {"path": "devfreq:gpu/cur_freq", "parse": "int", "scale": 1e-6, "unit": "MHz"},
+    }},
+    {"name": "npu", "title": "NPU", "metrics": {
+        # e.g. "NPU load:  Core0: 45%, Core1: 12%, Core2:  0%,"
+        "load": {"path": "/sys/kernel/debug/rknpu/load", "parse": r"regex:(\d+)%", "multi": True, "unit": "%"},
+        "freq": {"path": "devfreq:npu/cur_freq", "parse": "int", "scale": 1e-6, "unit": "MHz"},
+    }},
+    {"name": "rga", "title": "RGA", "metrics": {
+        "load": {"path": "/sys/kernel/debug/rkrga/load", "parse": r"regex:load = (\d+)%", "multi": True,
+                 "limit": 3, "unit": "%"},
+    }},
+    # The MPP service prints "<device> load: 12.34% utilization: 10.00%" per
+    # codec core once /proc/mpp_service/load_interval is set
+    {"name": "rkvdec", "title": "RKVDEC", "metrics": {
+        "load": {"path": "/proc/mpp_service/load", "parse": r"regex:rkvdec\S*\s+load:\s*([\d.]+)%",
+                 "multi": True, "unit": "%"},
+    }},
+    {"name": "rkvenc", "title": "RKVENC", "metrics": {
+        "load": {"path": "/proc/mpp_service/load", "parse": r"regex:rkvenc\S*\s+load:\s*([\d.]+)%",
+                 "multi": True, "unit": "%"},
+    }},
+    {"name": "vpu", "title": "VPU", "metrics": {
+        "load": {"path": "/proc/mpp_service/load",
+                 "parse": r"regex:(?:vdpu|vepu|jpeg|av1)\S*\s+load:\s*([\d.]+)%", "multi": True, "unit": "%"},
+    }},
+    # rkisp has no load figure; its interrupt count rises with every frame
+    {"name": "isp", "title": "ISP", "metrics": {
+        "irq": {"path": "/proc/rkisp*-vir*", "parse": "kv:Interrupt Cnt", "rate": True, "unit": "/s"},
+    }},
+)
+# Plugins behind the dedicated gpu/npu/rga collectors; the rest form the "plugins" collector
+CORE_PLUGINS = ("gpu", "npu", "rga")
+# Collectors of one tick share a plan run if they ask within this many seconds
+PLAN_REUSE = 0.05
+
+def compile_parser(rule):
+    """Turn a parse rule into a function from file contents (bytes) to a list of numbers."""
+    kind, _, arg = rule.partition(":")
+    if kind == "int" and not arg:
+        return lambda data: [int(data.split(None, 1)[0])] if data.strip() else []
+    if kind == "regex" and arg:
+        pattern = re.compile(arg.encode())
+        if pattern.groups > 1:
+            return lambda data: [float(match[0]) for match in pattern.findall(data)]
+        return lambda data: [float(match) for match in pattern.findall(data)]
+    if kind == "kv" and arg.strip():
+        # Any run of whitespace in the key matches any other: drivers pad their
+        # labels with printf widths ("%-10s Cnt:%d" prints "Interrupt  Cnt:")
+        key = rb"\s+".join(re.escape(word).encode() for word in arg.split())
+        pattern = re.compile(key + rb"\s*[=:]?\s*(-?\d+(?:\.\d+)?)")
+        return lambda data: [float(match) for match in pattern.findall(data)]
+    raise ValueError(f"invalid parse rule {rule!r}, expected int, regex:PATTERN or kv:KEY")
+
+def validate_plugin(spec):
+    """Check a plugin spec (as loaded from JSON) and return it; raises ValueError."""
+    if not isinstance(spec, dict) or not isinstance(spec.get("name"), str) or not spec["name"]:
+        raise ValueError("plugin needs a name")
+    metrics = spec.get("metrics")
+    if not isinstance(metrics, dict) or not metrics:
+        raise ValueError(f"plugin {spec['name']!r} needs metrics")
+    for metric, source in metrics.items():
+        if not isinstance(source, dict) or not isinstance(source.get("path"), str) or \
+                not source["path"].startswith(("/", "devfreq:")):
+            raise ValueError(f"plugin {spec['name']!r} metric {metric!r} needs an absolute path or devfreq:NAME/FILE")
+        compile_parser(source.get("parse", "int"))
+        if not isinstance(source.get("scale", 1), (int, float)):
+            raise ValueError(f"plugin {spec['name']!r} metric {metric!r}: scale must be a number")
+    return spec
+
+def load_plugin_file(path):
+    """Read plugin specs from a JSON file holding one spec or a list of them."""
+    import json
+    with open(path) as f:
+        specs = json.load(f)
+    if isinstance(specs, dict):
+        specs = [specs]
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a plugin or a list of plugins")
+    try:
+        return [validate_plugin(spec) for spec in specs]
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}")
+
+def find_devfreq(name):
+    """The /sys/class/devfreq directory of the device called NAME or *.NAME, or None."""
+    try:
+        devices = sorted(os.listdir(host_path("/sys/class/devfreq")))
+    except OSError:
+        return None
+    for device in devices:
+        if device == name or device.rpartition(".")[2] == name:
+            return f"/sys/class/devfreq/{device}"
+    return None
+
+class PluginPlan:
+    """All plugin sources compiled into one read plan.
+
+    Paths are discovered on the first run and never again: globs are
+    expanded and devfreq devices looked up by name. Files shared by several
+    metrics (the MPP load file feeds three plugins) are read once, with every
+    parser applied to the same bytes. The gpu, npu and rga collectors and the
+    "plugins" collector all call run(); within PLAN_REUSE seconds they get
+    the same result, so the files are read once per tick.
+    """
+
+    def __init__(self, specs=BUILTIN_PLUGINS):
+        # Later specs replace earlier ones of the same name, so user files can override built-ins
+        self.specs = list({spec["name"]: spec for spec in specs}.values())
+        self.steps = None
+        self.shapes = {}
+        self.lock = threading.Lock()
+        self.last_run = None
+        self.result = {}
+        self.counters = {}
+
+    def _expand(self, path):
+        if path.startswith("devfreq:"):
+            name, _, file = path[8:].partition("/")
+            device = find_devfreq(name)
+            return [f"{device}/{file}"] if device is not None else []
+        import glob
+        matches = glob.glob(host_path(path))
+        if FS_ROOT != "/":
+            matches = ["/" + os.path.relpath(match, FS_ROOT) for match in matches]
+        return sorted(matches)
+
+    def _compile(self):
+        steps = {}
+        for spec in self.specs:
+            for metric, source in spec["metrics"].items():
+                paths = self._expand(source["path"])
+                if not paths:
+                    continue
+                many = source.get("multi", False) or len(paths) > 1
+                self.shapes[(spec["name"], metric)] = many
+                parser = compile_parser(source.get("parse", "int"))
+                for index, path in enumerate(paths):
+                    steps.setdefault(path, []).append((spec["name"], metric, index, parser,
+                                                       float(source.get("scale", 1)), source.get("rate", False),
+                                                       source.get("limit")))
+        return list(steps.items())
+
+    def run(self):
+        """Return {plugin: {metric: value or [values]}} for every discovered metric."""
+        with self.lock:
+            now = time.monotonic()
+            if self.last_run is not None and now - self.last_run < PLAN_REUSE:
+                return self.result
+            if self.steps is None:
+                self.steps = self._compile()
+            result = {}
+            for path, uses in self.steps:
+                try:
+                    data = sysfs.read(path)
+                except OSError:
+                    continue
+                for plugin, metric, index, parser, scale, rate, limit in uses:
+                    try:
+                        values = [v * scale for v in parser(data)]
+                    except (ValueError, IndexError):
+                        continue
+                    if limit is not None:
+                        values = values[:limit]
+                    if rate:
+                        key = (plugin, metric, index)
+                        previous = self.counters.get(key)
+                        self.counters[key] = (now, values)
+                        if previous is None or now <= previous[0] or len(previous[1]) != len(values):
+                            continue
+                        values = [max(0.0, (v - old) / (now - previous[0])) for v, old in zip(values, previous[1])]
+                    if not values:
+                        continue
+                    metrics = result.setdefault(plugin, {})
+                    if self.shapes[(plugin, metric)]:
+                        metrics.setdefault(metric, []).extend(values)
+                    else:
+                        metrics[metric] = values[0]
+            self.result = result
+            self.last_run = now
+            return result
+
+    def titles(self):
+        return {spec["name"]: spec.get("title", spec["name"]) for spec in self.specs}
+
+    def units(self):
+        return {(spec["name"], metric): source.get("unit", "")
+                for spec in self.specs for metric, source in spec["metrics"].items()}
+
+plugin_plan = PluginPlan()
+
+def first_value(value, default=0):
+    """A plugin value as one number: the first of a list, `default` when missing."""
+    if isinstance(value, list):
+        return value[0] if value else default
+    return default if value is None else value
+
+def get_gpu_info():
+    """Return (GPU load %, GPU frequency in MHz)."""
+    gpu = plugin_plan.run().get("gpu", {})
+    return int(first_value(gpu.get("load"))), int(first_value(gpu.get("freq")))
+
+def read_npu_info():
+    """Return ([load % per NPU core], NPU frequency in MHz)."""
+    npu = plugin_plan.run().get("npu", {})
+    loads = npu.get("load", [])
+    return [int(load) for load in (loads if isinstance(loads, list) else [loads])], int(first_value(npu.get("freq")))
+
+def format_loads(loads):
+    """Format per-core loads the way the NPU/RGA lines show them, e.g. "12% 0% 3%"."""
+    if not loads:
+        return "0% 0% 0%"
+    return " ".join(f"{load}%" for load in loads)
+
+def read_rga_info():
+    """Return [load % per RGA core] (at most three)."""
+    loads = plugin_plan.run().get("rga", {}).get("load", [])
+    return [int(load) for load in (loads if isinstance(loads, list) else [loads])]
+
+def read_plugins():
+    """Values of the plugins without a dedicated collector, e.g. {"rkvdec": {"load": [12.0, 0.0]}}."""
+    return {name: metrics for name, metrics in plugin_plan.run().items() if name not in CORE_PLUGINS}
+
+def list_frequency_domains():
+    """Return [(domain, sysfs dir, kind)] for cpufreq policies and devfreq devices."""
+    domains = []
+    try:
+        policies = sorted(os.listdir(host_path("/sys/devices/system/cpu/cpufreq")))
+    except OSError:
+        policies = []
+    for policy in policies:
+        if policy.startswith("policy"):
+            domains.append((f"cpu{policy[6:]}", f"/sys/devices/system/cpu/cpufreq/{policy}", "cpufreq"))
+    try:
+        devices = sorted(os.listdir(host_path("/sys/class/devfreq")))
+    except OSError:
+        devices = []
+    for device in devices:
+        # fb000000.gpu -> gpu, fdab0000.npu -> npu, dmc -> dmc
+        domains.append((device.rpartition(".")[2], f"/sys/class/devfreq/{device}", "devfreq"))
+    return domains
+
+class FrequencyLimits:
+    """Current frequency and the cap placed on it, per cpufreq policy and devfreq device.
+
+    Thermal cooling devices throttle by lowering scaling_max_freq (cpufreq) or
+    max_freq (devfreq) below the hardware maximum, so a cap under the top
+    frequency is what throttling looks like from sysfs. The domain list and
+    hardware maxima are read once.
+    """
+
+    def __init__(self):
+        self.domains = None
+
+    def _discover(self):
+        domains = []
+        for domain, path, kind in list_frequency_domains():
+            try:
+                if kind == "cpufreq":
+                    hw_max = sysfs.read_int(f"{path}/cpuinfo_max_freq") // 1000
+                else:
+                    hw_max = max(int(f) for f in sysfs.read_text(f"{path}/available_frequencies").split()) // 1000000
+            except (OSError, ValueError):
+                continue
+            domains.append((domain, path, kind, hw_max))
+        return domains
+
+    def read(self):
+        """Return {domain: (current MHz, capped max MHz, hardware max MHz)}."""
+        if self.domains is None:
+            self.domains = self._discover()
+        limits = {}
+        for domain, path, kind, hw_max in self.domains:
+            try:
+                if kind == "cpufreq":
+                    cur = sysfs.read_int(f"{path}/scaling_cur_freq") // 1000
+                    cap = sysfs.read_int(f"{path}/scaling_max_freq") // 1000
+                else:
+                    cur = sysfs.read_int(f"{path}/cur_freq") // 1000000
+                    cap = sysfs.read_int(f"{path}/max_freq") // 1000000
+            except (OSError, ValueError):
+                continue
+            limits[domain] = (cur, cap, hw_max)
+        return limits
+
+frequency_limits = FrequencyLimits()
+
+def read_frequency_limits():
+    return frequency_limits.read()
+
+def parse_time_in_state(text):
+    """Parse cpufreq stats/time_in_state into {MHz: seconds}."""
+    states = {}
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) == 2:
+            states[int(parts[0]) // 1000] = int(parts[1]) / CLOCK_TICKS
+    return states
+
+def count_transitions(freqs, rows):
+    """Sum (up, down) transitions from transition-matrix rows of (from freq, counts per `freqs`)."""
+    up = down = 0
+    for source, counts in rows:
+        for target, count in zip(freqs, counts):
+            if target > source:
+                up += count
+            elif target < source:
+                down += count
+    return up, down
+
+def parse_trans_table(text):
+    """Parse cpufreq stats/trans_table into (up, down) transition counts, or None.
+
+    The kernel prints N/A (or truncates) once the matrix outgrows a page.
+    """
+    freqs = None
+    rows = []
+    for line in text.splitlines():
+        head, sep, tail = line.partition(":")
+        if not sep:
+            continue
+        if not head.strip():
+            freqs = [int(f) for f in tail.split()]
+        elif head.strip().isdigit() and freqs is not None:
+            rows.append((int(head), [int(c) for c in tail.split()]))
+    if not freqs or not rows:
+        return None
+    return count_transitions(freqs, rows)
+
+def parse_devfreq_trans_stat(text):
+    """Parse devfreq trans_stat into ({MHz: seconds}, up, down, total), or None.
+
+    Rows are "[*] from_hz: count count ... time_ms", the star marking the
+    current frequency; the last line is "Total transition : N".
+    """
+    freqs = None
+    rows = []
+    states = {}
+    total = None
+    for line in text.splitlines():
+        head, sep, tail = line.partition(":")
+        if not sep:
+            continue
+        head = head.strip().lstrip("*").strip()
+        if head.startswith("Total transition"):
+            total = int(tail)
+        elif not head:
+            freqs = [int(f) for f in tail.split() if f.isdigit()]
+        elif head.isdigit() and freqs is not None:
+            values = [int(v) for v in tail.split()]
+            if len(values) != len(freqs) + 1:
+                continue
+            rows.append((int(head), values[:-1]))
+            states[int(head) // 1000000] = values[-1] / 1000
+    if not rows:
+        return None
+    up, down = count_transitions(freqs, rows)
+    return states, up, down, up + down if total is None else total
+
+# Rate of the optional sampler for domains without cpufreq/devfreq statistics
+DVFS_SAMPLER_HZ = 0
+
+class DvfsStat:
+    """Time-in-state shares and transition rates per cpufreq policy and devfreq device.
+
+    Both frameworks keep cumulative per-frequency residency and transition
+    counts (cpufreq stats/, devfreq trans_stat), so deltas between two reads
+    cover every transition in between at any polling rate. Domains without
+    them are sampled by a daemon thread at `sampler_hz` when that is set,
+    which accumulates the same counters from cur_freq; otherwise they are
+    left out. Like the other delta collectors, the first read only primes.
+    """
+
+    def __init__(self, sampler_hz=DVFS_SAMPLER_HZ):
+        self.sampler_hz = sampler_hz
+        self.domains = None
+        self.prev = {}
+        self.sampled = {}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def _discover(self):
+        domains = []
+        for domain, path, kind in list_frequency_domains():
+            try:
+                if kind == "cpufreq":
+                    sysfs.read(f"{path}/stats/time_in_state")
+                else:
+                    sysfs.read(f"{path}/trans_stat")
+                domains.append((domain, path, kind, "stats"))
+                continue
+            except OSError:
+                pass
+            if self.sampler_hz > 0:
+                domains.append((domain, path, kind, "sampled"))
+                # [{MHz: seconds}, up, down, last MHz, when it was read, path, kind]
+                self.sampled[domain] = [{}, 0, 0, None, None, path, kind]
+        if self.sampled:
+            threading.Thread(target=self._sample_loop, daemon=True).start()
+        return domains
+
+    def _counters(self, domain, path, kind, source):
+        """Cumulative ({MHz: seconds}, up, down, total) for one domain, or None."""
+        if source == "sampled":
+            with self.lock:
+                states, up, down = self.sampled[domain][:3]
+                return dict(states), up, down, up + down
+        if kind == "devfreq":
+            return parse_devfreq_trans_stat(sysfs.read_text(f"{path}/trans_stat"))
+        states = parse_time_in_state(sysfs.read_text(f"{path}/stats/time_in_state"))
+        total = sysfs.read_int(f"{path}/stats/total_trans")
+        try:
+            counts = parse_trans_table(sysfs.read_text(f"{path}/stats/trans_table"))
+        except (OSError, ValueError):
+            counts = None
+        up, down = counts if counts is not None else (None, None)
+        return states, up, down, total
+
+    def _sample_loop(self):
+        period = 1.0 / self.sampler_hz
+        deadline = time.monotonic()
+        while not self.stopped.is_set():
+            for domain, entry in self.sampled.items():
+                path, kind = entry[5], entry[6]
+                try:
+                    if kind == "cpufreq":
+                        mhz = sysfs.read_int(f"{path}/scaling_cur_freq") // 1000
+                    else:
+                        mhz = sysfs.read_int(f"{path}/cur_freq") // 1000000
+                except (OSError, ValueError):
+                    continue
+                now = time.monotonic()
+                with self.lock:
+                    last, since = entry[3], entry[4]
+                    if last is not None:
+                        entry[0][last] = entry[0].get(last, 0.0) + now - since
+                        if mhz > last:
+                            entry[1] += 1
+                        elif mhz < last:
+                            entry[2] += 1
+                    entry[3], entry[4] = mhz, now
+            deadline += period
+            # Skip missed periods rather than bursting to catch up
+            delay = deadline - time.monotonic()
+            if delay < 0:
+                deadline = time.monotonic()
+                delay = 0
+            self.stopped.wait(delay)
+
+    def close(self):
+        self.stopped.set()
+
+    def read(self):
+        """Return {domain: (states, transitions/s, up/s, down/s, source)}.
+
+        states is [(MHz, percent of the interval)] in frequency order; up/s and
+        down/s are None when the kernel's transition table is unavailable.
+        """
+        if self.domains is None:
+            self.domains = self._discover()
+        now = time.monotonic()
+        result = {}
+        for domain, path, kind, source in self.domains:
+            try:
+                counters = self._counters(domain, path, kind, source)
+            except (OSError, ValueError):
+                counters = None
+            if counters is None:
+                continue
+            previous = self.prev.get(domain)
+            self.prev[domain] = (now, counters)
+            if previous is None:
+                continue
+            elapsed = now - previous[0]
+            states, up, down, total = counters
+            old_states, old_up, old_down, old_total = previous[1]
+            deltas = {mhz: seconds - old_states.get(mhz, 0.0) for mhz, seconds in states.items()}
+            spent = sum(deltas.values())
+            # Counters go backwards when someone resets devfreq trans_stat
+            if elapsed <= 0 or total < old_total or min(deltas.values(), default=0) < 0:
+                continue
+            shares = [(mhz, deltas[mhz] * 100 / spent if spent > 0 else 0.0) for mhz in sorted(deltas)]
+            up_rate = (up - old_up) / elapsed if up is not None and old_up is not None else None
+            down_rate = (down - old_down) / elapsed if down is not None and old_down is not None else None
+            result[domain] = (shares, (total - old_total) / elapsed, up_rate, down_rate, source)
+        return result
+
+dvfs_stat = DvfsStat()
+
+def read_dvfs():
+    return dvfs_stat.read()
+
+def read_meminfo():
+    """Parse /proc/meminfo into a dict of values in kB."""
+    meminfo = {}
+    for line in sysfs.read_text("/proc/meminfo").splitlines():
+        key, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            meminfo[key] = int(fields[0])
+    return meminfo
+
+def format_size_binary(kib):
+    """Format a size in kB like `free -h` does (e.g. 5.9Gi, 438Mi, 0B)."""
+    size = kib * 1024
+    if size < 1024:
+        return f"{size}B"
+    base = 1
+    for unit in "KMGTPE":
+        base *= 1024
+        text = f"{size / base:.1f}"
+        if len(text) <= 3:
+            return f"{text}{unit}i"
+        # free truncates here: 9.99Mi is shown as 9Mi
+        text = str(int(size / base))
+        if len(text) <= 3:
+            return f"{text}{unit}i"
+    return f"{text}Ei"
+
+def read_memory():
+    """Return (RAM used, RAM total, swap used, swap total) in kB; None where unknown."""
+    try:
+        meminfo = read_meminfo()
+        ram_total = meminfo["MemTotal"]
+        ram_used = ram_total - meminfo.get("MemAvailable", meminfo.get("MemFree", 0))
+    except Exception:
+        return None, None, None, None
+    if "SwapTotal" in meminfo:
+        swap_total = meminfo["SwapTotal"]
+        swap_used = swap_total - meminfo.get("SwapFree", 0)
+    else:
+        swap_total = swap_used = None
+    return ram_used, ram_total, swap_used, swap_total
+
+def format_memory(memory):
+    return tuple("N/A" if kib is None else format_size_binary(kib) for kib in memory)
+
+DMABUF_BUFINFO = "/sys/kernel/debug/dma_buf/bufinfo"
+DMABUF_SYSFS = "/sys/kernel/dmabuf/buffers"
+RKNPU_MM = "/sys/kernel/debug/rknpu/mm"
+RKNPU_MM_RE = re.compile(rb"total: (\d+), used (\d+) free (\d+)")
+
+def parse_bufinfo(lines):
+    """Fold dma_buf bufinfo lines into (buffers, bytes, {exporter: [buffers, bytes]}, {device: bytes}).
+
+    Takes any iterable of byte lines and keeps only the running totals, so a
+    file of many megabytes is parsed in constant memory. Each object row is
+    "size flags mode count exp_name [ino name]", optionally followed by its
+    fences and an "Attached Devices:" list, one device per indented line.
+    """
+    count = total = 0
+    # Keyed by the raw bytes while parsing; decoded once at the end
+    exporters = {}
+    devices = {}
+    size = 0
+    attached = False
+    for line in lines:
+        if not line[:1].isspace():
+            fields = line.split(None, 5)
+            if len(fields) >= 5 and fields[0].isdigit():
+                size = int(fields[0])
+                entry = exporters.get(fields[4])
+                if entry is None:
+                    entry = exporters[fields[4]] = [0, 0]
+                entry[0] += 1
+                entry[1] += size
+                count += 1
+                total += size
+            attached = False
+            continue
+        text = line.strip()
+        if text == b"Attached Devices:":
+            attached = True
+        elif attached and text and not text.startswith(b"Total"):
+            devices[text] = devices.get(text, 0) + size
+        else:
+            attached = False
+    return (count, total, {name.decode(errors="replace"): entry for name, entry in exporters.items()},
+            {name.decode(errors="replace"): size for name, size in devices.items()})
+
+def read_dmabuf_sysfs():
+    """The same totals from the per-buffer directories of CONFIG_DMABUF_SYSFS_STATS; no device list."""
+    count = total = 0
+    exporters = {}
+    with os.scandir(host_path(DMABUF_SYSFS)) as entries:
+        for entry in entries:
+            try:
+                with open(os.path.join(entry.path, "size"), "rb") as f:
+                    size = int(f.read())
+                with open(os.path.join(entry.path, "exporter_name"), "rb") as f:
+                    exporter = f.read().strip().decode(errors="replace")
+            except (OSError, ValueError):
+                # Freed while we were listing
+                continue
+            entry = exporters.get(exporter)
+            if entry is None:
+                entry = exporters[exporter] = [0, 0]
+            entry[0] += 1
+            entry[1] += size
+            count += 1
+            total += size
+    return count, total, exporters, {}
+
+def read_dmabuf_processes():
+    """Return {pid: (comm, bytes, buffers)} for processes holding DMA-buf file descriptors.
+
+    A buffer's fd links to "/dmabuf:<name>" and its inode size is the buffer
+    size; a buffer held through several fds of one process counts once.
+    Needs root to see other users' descriptors.
+    """
+    processes = {}
+    for name in os.listdir(host_path("/proc")):
+        if not name.isdigit():
+            continue
+        fd_dir = host_path(f"/proc/{name}/fd")
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        buffers = {}
+        for fd in fds:
+            path = f"{fd_dir}/{fd}"
+            try:
+                if not os.readlink(path).startswith("/dmabuf:"):
+                    continue
+                st = os.stat(path)
+            except OSError:
+                continue
+            buffers[st.st_ino] = st.st_size
+        if buffers:
+            try:
+                with open(host_path(f"/proc/{name}/comm"), "rb") as f:
+                    comm = f.read().strip().decode(errors="replace")
+            except OSError:
+                comm = "?"
+            processes[int(name)] = (comm, sum(buffers.values()), len(buffers))
+    return processes
+
+def read_rknpu_memory():
+    """Return (used, total) bytes of the RKNPU memory manager, or None without debugfs."""
+    result = None
+    try:
+        # The drm_mm dump lists every node before its summary, so stream it
+        with open(host_path(RKNPU_MM), "rb") as f:
+            for line in f:
+                match = RKNPU_MM_RE.search(line)
+                if match:
+                    result = (int(match.group(2)), int(match.group(1)))
+    except OSError:
+        return None
+    return result
+
+# How the DMA-buf panel is shown; main() changes it. rows=0 also skips the per-process fd scan.
+DMABUF_VIEW = {"rows": 5}
+
+def read_dmabuf():
+    """Return (CMA total kB, CMA free kB, buffers, bytes, {exporter: (buffers, bytes)},
+    {device: bytes}, [(pid, comm, bytes, buffers)] largest first, RKNPU (used, total) or None).
+
+    Buffers and bytes are None when neither bufinfo nor the sysfs stats are readable.
+    """
+    try:
+        meminfo = read_meminfo()
+    except OSError:
+        meminfo = {}
+    cma_total, cma_free = meminfo.get("CmaTotal"), meminfo.get("CmaFree")
+    try:
+        with open(host_path(DMABUF_BUFINFO), "rb") as f:
+            count, total, exporters, devices = parse_bufinfo(f)
+    except OSError:
+        try:
+            count, total, exporters, devices = read_dmabuf_sysfs()
+        except OSError:
+            count = total = None
+            exporters, devices = {}, {}
+    processes = []
+    if DMABUF_VIEW["rows"] > 0 and count:
+        try:
+            by_pid = read_dmabuf_processes()
+        except OSError:
+            by_pid = {}
+        processes = sorted(((pid, comm, size, buffers) for pid, (comm, size, buffers) in by_pid.items()),
+                           key=lambda p: p[2], reverse=True)[:DMABUF_VIEW["rows"]]
+    exporters = {name: tuple(entry) for name, entry in exporters.items()}
+    return cma_total, cma_free, count, total, exporters, devices, processes, read_rknpu_memory()
+
+# hwmon directory -> (inode, hwmon name, chip name). A device that registers
+# the same hwmonN again gets a new directory and so a new inode.
+hwmon_chip_names = {}
+
+def _hwmon_chip_name(hwmon_dir, name):
+    """Chip name of an hwmon device, resolved once per device; see _resolve_hwmon_chip_name()."""
+    try:
+        inode = os.stat(host_path(hwmon_dir)).st_ino
+    except OSError:
+        return _resolve_hwmon_chip_name(hwmon_dir, name)
+    cached = hwmon_chip_names.get(hwmon_dir)
+    if cached is None or cached[:2] != (inode, name):
+        cached = hwmon_chip_names[hwmon_dir] = (inode, name, _resolve_hwmon_chip_name(hwmon_dir, name))
+    return cached[2]
+
+def _resolve_hwmon_chip_name(hwmon_dir, name):
+    """Build the chip name `sensors` prints, e.g. soc_thermal-virtual-0 or nvme-pci-0100."""
+    device = host_path(os.path.join(hwmon_dir, "device"))
+    # Class devices such as nvme0 sit on top of the bus device; walk down to it.
+    for _ in range(3):
+        if not os.path.exists(device):
+            return f"{name}-virtual-0"
+        subsystem = os.path.basename(os.path.realpath(os.path.join(device, "subsystem")))
+        if subsystem in ("pci", "platform", "of_platform", "i2c", "spi"):
+            break
+        device = os.path.join(device, "device")
+    else:
+        return f"{name}-virtual-0"
+    dev_name = os.path.basename(os.path.realpath(device))
+    if subsystem == "pci":
+        m = re.match(r'([0-9a-f]+):([0-9a-f]+):([0-9a-f]+)\.([0-9a-f]+)$', dev_name)
+        if m:
+            domain, bus, slot, fn = (int(x, 16) for x in m.groups())
+            return f"{name}-pci-{(domain << 16) + (bus << 8) + (slot << 3) + fn:04x}"
+    elif subsystem == "i2c":
+        m = re.match(r'(\d+)-([0-9a-f]+)$', dev_name)
+        if m:
+            return f"{name}-i2c-{int(m.group(1))}-{int(m.group(2), 16):02x}"
+    elif subsystem in ("platform", "of_platform"):
+        m = re.match(r'[a-z0-9_]+\.(\d+)$', dev_name)
+        return f"{name}-isa-{int(m.group(1)) if m else 0:04x}"
+    return f"{name}-virtual-0"
+
+def _read_temp_sensors():
+    """Yield (chip name, millidegrees) for the first temperature input of every sensor chip.
+
+    Mirrors the `temp1:`/`Composite:` lines of `sensors`, reading /sys/class/hwmon and
+    falling back to /sys/class/thermal when no hwmon devices are registered.
+    """
+    hwmon_root = "/sys/class/hwmon"
+    try:
+        hwmons = sorted(os.listdir(host_path(hwmon_root)), key=lambda d: int(re.sub(r'\D', '', d) or 0))
+    except OSError:
+        hwmons = []
+    found = False
+    for entry in hwmons:
+        hwmon_dir = os.path.join(hwmon_root, entry)
+        try:
+            name = sysfs.read_text(os.path.join(hwmon_dir, "name")).strip()
+            millideg = sysfs.read_int(os.path.join(hwmon_dir, "temp1_input"))
+        except (OSError, ValueError):
+            continue
+        try:
+            label = sysfs.read_text(os.path.join(hwmon_dir, "temp1_label")).strip()
+        except OSError:
+            label = None
+        if label not in (None, "Composite"):
+            continue
+        found = True
+        yield _hwmon_chip_name(hwmon_dir, name), millideg
+    if found:
+        return
+    thermal_root = "/sys/class/thermal"
+    try:
+        zones = sorted((d for d in os.listdir(host_path(thermal_root)) if d.startswith("thermal_zone")),
+                       key=lambda d: int(d[len("thermal_zone"):]))
+    except (OSError, ValueError):
+        zones = []
+    for zone in zones:
+        try:
+            name = sysfs.read_text(os.path.join(thermal_root, zone, "type")).strip()
+            millideg = sysfs.read_int(os.path.join(thermal_root, zone, "temp"))
+        except (OSError, ValueError):
+            continue
+        yield f"{name}-virtual-0", millideg
+
+def read_temperatures():
+    """
+    Read every sensor chip's first temperature (the reading `sensors` prints as "temp1:"
+    or "Composite:") and return a list of (chip name, °C).
+    """
+    readings = []
+    try:
+        for sensor_name, millideg in _read_temp_sensors():
+            # `sensors` rounds to one decimal and the integer part is what gets displayed
+            readings.append((sensor_name, int(round(millideg / 1000, 1))))
+    except Exception:
+        pass
+    return readings
+
+def format_temperatures(readings):
+    temp_items = []
+    for sensor_name, temp_val in readings:
+        attr = level_attr("temp", temp_val, 'temp_green')
+        formatted = f"{sensor_name:<30} {temp_val:2d}°C"
+        temp_items.append((attr, formatted))
+    if not temp_items:
+        temp_items = [("default", "No temperature data.")]
+    return temp_items
+
+# /proc/net/dev counters per interface: 8 receive columns, then 8 transmit columns
+NET_DEV_FIELDS = 16
+NET_RX_BYTES, NET_RX_PACKETS, NET_RX_ERRS, NET_RX_DROP, NET_RX_MULTICAST = 0, 1, 2, 3, 7
+NET_TX_BYTES, NET_TX_PACKETS, NET_TX_ERRS, NET_TX_DROP = 8, 9, 10, 11
+
+# Per-second rates reported for each interface, in this order
+NET_RATE_FIELDS = ("rx_mbps", "tx_mbps", "rx_pps", "tx_pps", "rx_errors", "tx_errors",
+                   "rx_dropped", "tx_dropped", "multicast")
+
+# A counter that went backwards is taken as a 32-bit wrap only if the wrapped
+# difference is below this; otherwise the interface was reset (ip link down/up,
+# driver reload), which is the usual case with 64-bit statistics
+NET_WRAP_MARGIN = 1 << 28
+
+NET_DEFAULT_INCLUDE = ("*",)
+NET_DEFAULT_EXCLUDE = ("lo", "veth*")
+
+class NetDevStat:
+    """Rates from /proc/net/dev for every interface, parsed in a single pass.
+
+    Each interface's 16 counters are kept in an array('Q'). A counter that
+    goes backwards wrapped at 2**32 if it was just below that (drivers with
+    32-bit statistics), otherwise it was reset and the new value is the delta.
+    Interfaces are selected with include/exclude globs; the decision is
+    cached per interface name.
+    """
+
+    def __init__(self, include=NET_DEFAULT_INCLUDE, exclude=NET_DEFAULT_EXCLUDE):
+        self.set_filter(include, exclude)
+        self.prev = {}
+        self.prev_time = None
+
+    def set_filter(self, include, exclude):
+        self.include = tuple(include)
+        self.exclude = tuple(exclude)
+        self.selected = {}
+
+    def is_selected(self, ifname):
+        selected = self.selected.get(ifname)
+        if selected is None:
+            import fnmatch
+            selected = self.selected[ifname] = (
+                any(fnmatch.fnmatchcase(ifname, pattern) for pattern in self.include)
+                and not any(fnmatch.fnmatchcase(ifname, pattern) for pattern in self.exclude))
+        return selected
+
+    def parse(self, data):
+        counters = {}
+        for line in data.split(b"\n")[2:]:
+            name, sep, rest = line.partition(b":")
+            if not sep:
+                continue
+            ifname = name.strip().decode()
+            if not self.is_selected(ifname):
+                continue
+            fields = rest.split()
+            if len(fields) >= NET_DEV_FIELDS:
+                counters[ifname] = array.array("Q", map(int, fields[:NET_DEV_FIELDS]))
+        return counters
+
+    @staticmethod
+    def _delta(cur, old):
+        if cur >= old:
+            return cur - old
+        wrapped = cur + (1 << 32) - old
+        if 0 < wrapped <= NET_WRAP_MARGIN:
+            return wrapped
+        return cur
+
+    def update(self, data, now):
+        """Return {ifname: rates in NET_RATE_FIELDS order}."""
+        counters = self.parse(data)
+        prev, self.prev = self.prev, counters
+        prev_time, self.prev_time = self.prev_time, now
+        dt = now - prev_time if prev_time is not None else 0.0
+        results = {}
+        for ifname, cur in counters.items():
+            old = prev.get(ifname)
+            if old is None or dt <= 0:
+                results[ifname] = (0.0,) * len(NET_RATE_FIELDS)
+                continue
+            d = [self._delta(c, o) for c, o in zip(cur, old)]
+            results[ifname] = (
+                d[NET_RX_BYTES] * 8 / (1e6 * dt),
+                d[NET_TX_BYTES] * 8 / (1e6 * dt),
+                d[NET_RX_PACKETS] / dt,
+                d[NET_TX_PACKETS] / dt,
+                d[NET_RX_ERRS] / dt,
+                d[NET_TX_ERRS] / dt,
+                d[NET_RX_DROP] / dt,
+                d[NET_TX_DROP] / dt,
+                d[NET_RX_MULTICAST] / dt,
+            )
+        return results
+
+net_stat = NetDevStat()
+
+def get_network_traffic():
+    try:
+        return net_stat.update(sysfs.read("/proc/net/dev"), time.monotonic())
+    except OSError:
+        return {}
+
+def format_size_df(size):
+    """Format a size in bytes like `df -h` does (powers of 1024, rounded up)."""
+    if size < 1024:
+        return str(size)
+    value = float(size)
+    for unit in "KMGTPE":
+        value /= 1024
+        if value < 10:
+            rounded = math.ceil(value * 10) / 10
+            if rounded < 10:
+                return f"{rounded:.1f}{unit}"
+            return f"{int(rounded)}{unit}"
+        if math.ceil(value) < 1024:
+            return f"{math.ceil(value)}{unit}"
+    return f"{math.ceil(value)}E"
+
+def _find_mount_point(path):
+    path = os.path.realpath(path)
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+def read_fstab_usage():
+    """Return (fstab mount, mount point, total, used, free bytes) per /etc/fstab entry.
+
+    Entries that cannot be queried (swap, "none", missing mounts) have None values.
+    """
+    mountpoints = []
+    try:
+        with open(host_path("/etc/fstab"), "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                fields = line.split()
+                if len(fields) < 2:
+                    continue
+                mount = fields[1]
+                if mount not in mountpoints:
+                    mountpoints.append(mount)
+    except Exception:
+        mountpoints = []
+    usage = []
+    for m in mountpoints:
+        try:
+            if not m.startswith("/"):
+                raise ValueError(m)
+            st = os.statvfs(host_path(m))
+            # Mount points of a synthetic root cannot be resolved; show the fstab entry
+            mp = _find_mount_point(m) if FS_ROOT == "/" else m
+            usage.append((m, mp, st.f_blocks * st.f_frsize,
+                          (st.f_blocks - st.f_bfree) * st.f_frsize, st.f_bavail * st.f_frsize))
+        except Exception:
+            usage.append((m, None, None, None, None))
+    return usage
+
+def format_fstab_usage(usage):
+    usage_lines = []
+    header = f"{'Mount Point':<20} {'Total':>8} {'Used':>8} {'Free':>8}"
+    usage_lines.append(header)
+    for m, mp, total, used, free in usage:
+        if mp is None:
+            usage_lines.append(f"{m}: No info")
+            continue
+        total, used, free = format_size_df(total), format_size_df(used), format_size_df(free)
+        usage_lines.append(f"{mp:<20} {total:>8} {used:>8} {free:>8}")
+    return usage_lines
+
+def list_whole_disks():
+    """Return the names in /sys/block with a backing device (NVMe, USB, eMMC/SD, SATA)."""
+    try:
+        names = sorted(os.listdir(host_path("/sys/block")))
+    except OSError:
+        return []
+    # Whole disks have a backing device; loop, zram and ram devices do not
+    return [name for name in names if os.path.exists(host_path(f"/sys/block/{name}/device"))]
+
+def list_block_disks():
+    """Return (nvme_devices, usb_devices) from /sys/block, like `lsblk -dno NAME,TYPE,TRAN`."""
+    nvme_devices = []
+    usb_devices = []
+    for name in list_whole_disks():
+        if name.startswith("nvme"):
+            nvme_devices.append(name)
+        elif "/usb" in os.path.realpath(host_path(f"/sys/block/{name}")):
+            usb_devices.append(name)
+    return nvme_devices, usb_devices
+
+def read_block_model(dev):
+    try:
+        return sysfs.read_text(f"/sys/block/{dev}/device/model").strip() or "Unknown"
+    except Exception:
+        return "Unknown"
+
+def read_block_serial(dev):
+    try:
+        return sysfs.read_text(f"/sys/block/{dev}/device/serial").strip() or None
+    except Exception:
+        return None
+
+# struct nvme_admin_cmd from <linux/nvme_ioctl.h> and NVME_IOCTL_ADMIN_CMD
+NVME_ADMIN_CMD = struct.Struct("<BBHIIIQQII6III")
+NVME_IOCTL_ADMIN_CMD = 0xC0484E41
+NVME_ADMIN_GET_LOG_PAGE = 0x02
+NVME_LOG_SMART = 0x02
+NVME_SMART_LOG_SIZE = 512
+
+def read_nvme_smart_log(dev):
+    """Fetch the NVMe SMART / health log page with an admin ioctl, as `nvme smart-log` does.
+
+    Returns (temperature °C, percentage used, power-on hours). Under a synthetic
+    root the device node is a plain file holding the raw log page.
+    """
+    import ctypes
+    import fcntl
+    if FS_ROOT != "/":
+        with open(host_path(f"/dev/{dev}"), "rb") as f:
+            return parse_nvme_smart_log(f.read(NVME_SMART_LOG_SIZE))
+    data = ctypes.create_string_buffer(NVME_SMART_LOG_SIZE)
+    numd = NVME_SMART_LOG_SIZE // 4 - 1
+    cmd = bytearray(NVME_ADMIN_CMD.pack(
+        NVME_ADMIN_GET_LOG_PAGE, 0, 0, 0xFFFFFFFF, 0, 0, 0, ctypes.addressof(data), 0,
+        NVME_SMART_LOG_SIZE, (numd << 16) | NVME_LOG_SMART, 0, 0, 0, 0, 0, 0, 0,
+    ))
+    fd = os.open(f"/dev/{dev}", os.O_RDONLY)
+    try:
+        fcntl.ioctl(fd, NVME_IOCTL_ADMIN_CMD, cmd, True)
+    finally:
+        os.close(fd)
+    return parse_nvme_smart_log(data.raw)
+
+def parse_nvme_smart_log(raw):
+    temp_kelvin = int.from_bytes(raw[1:3], "little")
+    percentage_used = raw[5]
+    power_on_hours = int.from_bytes(raw[128:144], "little")
+    return temp_kelvin - 273, percentage_used, power_on_hours
+
+SMARTCTL_TIMEOUT = 10
+# Seconds SMART health/temperature/hours are reused before a disk is queried again
+SMART_TTL = 300.0
+
+def parse_smartctl(output):
+    """Parse `smartctl -j -i -H -A` output into {model, serial, temp, hours, health}.
+
+    smartctl builds without JSON support print the text report instead, which
+    is parsed for the same fields. Fields that are not reported are missing.
+    """
+    import json
+    text = output.decode("utf-8", "replace")
+    record = {}
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict):
+        if data.get("model_name"):
+            record["model"] = data["model_name"]
+        if data.get("serial_number"):
+            record["serial"] = data["serial_number"]
+        if "passed" in data.get("smart_status", {}):
+            record["health"] = "PASSED" if data["smart_status"]["passed"] else "FAILED"
+        if data.get("temperature", {}).get("current") is not None:
+            record["temp"] = data["temperature"]["current"]
+        if data.get("power_on_time", {}).get("hours") is not None:
+            record["hours"] = data["power_on_time"]["hours"]
+        return record
+    for line in text.splitlines():
+        fields = line.split()
+        try:
+            if "overall-health" in line and ":" in line:
+                record["health"] = line.rsplit(":", 1)[1].strip() or None
+            elif line.startswith("Serial Number:"):
+                record["serial"] = line.split(":", 1)[1].strip()
+            elif line.startswith(("Device Model:", "Product:")):
+                record["model"] = line.split(":", 1)[1].strip()
+            elif len(fields) > 9 and fields[1] == "Temperature_Celsius":
+                record["temp"] = int(fields[9])
+            elif len(fields) > 9 and fields[1] == "Power_On_Hours":
+                record["hours"] = int(fields[9])
+        except ValueError:
+            pass
+    return record
+
+class StorageCache:
+    """NVMe/USB disk records, refreshed from SMART at most once per TTL.
+
+    Model and serial are read once per device: from sysfs for NVMe and from
+    the first smartctl report for USB. Health, temperature and hours are
+    reused for `ttl` seconds, so the glacial tier no longer keeps drives out of
+    their low-power states; smartctl is also told not to spin up a disk in
+    standby. The cache is only invalidated when /sys/block changes: a new
+    listing, or a disk whose diskseq (or device number) differs, i.e. hotplug.
+    """
+
+    def __init__(self, ttl=SMART_TTL):
+        self.ttl = ttl
+        self.names = None
+        self.nvme = []
+        self.usb = []
+        # dev -> {"id": identity, "model", "serial", "temp", "hours", "health", "checked": monotonic time}
+        self.records = {}
+
+    @staticmethod
+    def identity(dev):
+        # diskseq increases for every disk the kernel sees; older kernels only
+        # have the device number, which a disk re-plugged between polls may reuse
+        for name in ("diskseq", "dev"):
+            try:
+                return sysfs.read_text(f"/sys/block/{dev}/{name}").strip()
+            except OSError:
+                pass
+        return None
+
+    def _refresh_devices(self):
+        try:
+            names = frozenset(os.listdir(host_path("/sys/block")))
+        except OSError:
+            names = frozenset()
+        if names != self.names:
+            self.names = names
+            self.nvme, self.usb = list_block_disks()
+        for dev in self.nvme + self.usb:
+            ident = self.identity(dev)
+            record = self.records.get(dev)
+            if record is None or record["id"] != ident:
+                serial = read_block_serial(dev) if dev in self.nvme else None
+                self.records[dev] = {"id": ident, "model": read_block_model(dev), "serial": serial,
+                                     "temp": None, "hours": None, "health": None, "checked": None}
+        for dev in [dev for dev in self.records if dev not in self.nvme and dev not in self.usb]:
+            del self.records[dev]
+
+    def _query(self, dev, record):
+        if dev in self.nvme:
+            try:
+                record["temp"], record["health"], record["hours"] = read_nvme_smart_log(dev)
+            except Exception:
+                pass
+            return
+        # USB bridges need SAT pass-through, so SMART comes from one smartctl run
+        try:
+            output = COMMAND_RUNNER(["smartctl", "-j", "-i", "-H", "-A", "-n", "standby", f"/dev/{dev}"],
+                                    timeout=SMARTCTL_TIMEOUT)
+        except Exception:
+            return
+        parsed = parse_smartctl(output)
+        # A disk in standby reports nothing; keep what we had
+        for key in ("temp", "hours", "health"):
+            if key in parsed:
+                record[key] = parsed[key]
+        # Identity comes from the first report that has it; until then the
+        # model is the bridge's sysfs string
+        if record["serial"] is None and parsed.get("serial"):
+            record["serial"] = parsed["serial"]
+            if parsed.get("model"):
+                record["model"] = parsed["model"]
+
+    def read(self):
+        self._refresh_devices()
+        now = time.monotonic()
+        for dev in self.nvme + self.usb:
+            record = self.records[dev]
+            if record["checked"] is None or now - record["checked"] >= self.ttl:
+                record["checked"] = now
+                self._query(dev, record)
+
+        def disk(dev):
+            record = self.records[dev]
+            return {"dev": dev, "model": record["model"], "serial": record["serial"],
+                    "temp": record["temp"], "hours": record["hours"], "health": record["health"]}
+        return [disk(dev) for dev in self.nvme], [disk(dev) for dev in self.usb]
+
+storage_cache = StorageCache()
+
+def read_storage_info():
+    """Return (nvme disks, usb disks) as lists of dicts with dev, model, serial, temp, hours and health.
+
+    temp (°C) and hours are None when SMART data is unavailable. NVMe health is
+    the percentage used; USB health is smartctl's overall assessment.
+    """
+    return storage_cache.read()
+
+def format_storage_info(storage):
+    def describe(disk):
+        temp = "N/A" if disk["temp"] is None else disk["temp"]
+        hours = "N/A" if disk["hours"] is None else f"{disk['hours']}"
+        return f"{disk['dev']} - {disk['model']} | Temp: {temp}°C | Hours: {hours}"
+    nvme_disks, usb_disks = storage
+    return [describe(d) for d in nvme_disks], [describe(d) for d in usb_disks]
+
+# /proc/diskstats columns after major, minor and name
+DISK_READS, DISK_READ_SECTORS, DISK_READ_MS = 0, 2, 3
+DISK_WRITES, DISK_WRITE_SECTORS, DISK_WRITE_MS = 4, 6, 7
+DISK_IO_MS = 9
+DISK_STAT_FIELDS = 11
+
+# Rates reported for each block device, in this order
+DISK_RATE_FIELDS = ("read_mbps", "write_mbps", "reads_per_second", "writes_per_second",
+                    "read_await_ms", "write_await_ms", "util_percent")
+
+class DiskStat:
+    """I/O rates per block device from one read of /proc/diskstats per tick.
+
+    Whole disks (those with a backing device) are shown; partitions are
+    collapsed into their disk unless `partitions` is set, and loop/zram/ram
+    devices are hidden unless `virtual` is set. The disk list is re-read
+    from /sys/block only when the set of names in diskstats changes.
+    """
+
+    def __init__(self, partitions=False, virtual=False):
+        self.partitions = partitions
+        self.virtual = virtual
+        self.names = None
+        self.disks = set()
+        self.prev = {}
+        self.prev_time = None
+
+    def _shown(self, name):
+        if name in self.disks:
+            return True
+        if self.partitions and any(re.fullmatch(rf"{re.escape(disk)}p?\d+", name) for disk in self.disks):
+            return True
+        return self.virtual and name.startswith(("loop", "zram", "ram"))
+
+    def update(self, data, now):
+        """Return {device: rates in DISK_RATE_FIELDS order}."""
+        counters = {}
+        for line in data.split(b"\n"):
+            fields = line.split()
+            if len(fields) >= 3 + DISK_STAT_FIELDS:
+                counters[fields[2].decode()] = array.array("Q", map(int, fields[3:3 + DISK_STAT_FIELDS]))
+        names = frozenset(counters)
+        if names != self.names:
+            self.names = names
+            self.disks = set(list_whole_disks())
+        prev, self.prev = self.prev, counters
+        prev_time, self.prev_time = self.prev_time, now
+        dt = now - prev_time if prev_time is not None else 0.0
+        results = {}
+        for name in sorted(counters):
+            if not self._shown(name):
+                continue
+            cur, old = counters[name], prev.get(name)
+            if old is None or dt <= 0:
+                results[name] = (0.0,) * len(DISK_RATE_FIELDS)
+                continue
+            # A device that went away and came back starts from zero again
+            d = [c - o if c >= o else c for c, o in zip(cur, old)]
+            reads, writes = d[DISK_READS], d[DISK_WRITES]
+            results[name] = (
+                d[DISK_READ_SECTORS] * 512 / 1e6 / dt,
+                d[DISK_WRITE_SECTORS] * 512 / 1e6 / dt,
+                reads / dt,
+                writes / dt,
+                d[DISK_READ_MS] / reads if reads else 0.0,
+                d[DISK_WRITE_MS] / writes if writes else 0.0,
+                min(100.0, d[DISK_IO_MS] / (dt * 10)),
+            )
+        return results
+
+disk_stat = DiskStat()
+
+def read_disk_io():
+    try:
+        return disk_stat.update(sysfs.read("/proc/diskstats"), time.monotonic())
+    except OSError:
+        return {}
+
+# cgroup path components of container runtimes, with the 64-hex container id
+CONTAINER_CGROUP_RE = re.compile(rb"(?:docker|libpod|cri-containerd|crio)-([0-9a-f]{64})\.scope|/docker/([0-9a-f]{64})")
+DOCKER_CONTAINERS_DIR = "/var/lib/docker/containers"
+
+def resolve_container_name(container_id):
+    """Docker's name for a container id, from its config; the short id when unknown."""
+    try:
+        import json
+        with open(host_path(f"{DOCKER_CONTAINERS_DIR}/{container_id}/config.v2.json")) as f:
+            return json.load(f).get("Name", "").lstrip("/") or container_id[:12]
+    except (OSError, ValueError):
+        return container_id[:12]
+
+class ProcessTable:
+    """Incremental scanner of /proc/[pid]/stat for a top-like process list.
+
+    Static fields (comm, cmdline, start time, cgroup, container) are read once
+    per PID. The stat file of each PID is kept open, up to max_fds of them,
+    so a rescan costs one pread per process. max_fds (fd_budget() by default)
+    is shared with the handles SysfsReader holds, about seven per container
+    for instance; processes past it are read with open/read/close. A read
+    on a descriptor whose
+    task has exited fails with ESRCH, which is also how PID reuse shows up,
+    and the start time is compared as a second check. RSS comes from the same
+    stat line (field 24, as in statm), so one file per process is enough.
+    """
+
+    def __init__(self, max_fds=None):
+        self.max_fds = min(fd_budget(), 4096) if max_fds is None else max_fds
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_kib = os.sysconf("SC_PAGE_SIZE") // 1024
+        # pid -> [fd or None, start time, comm, cmdline, cgroup, container, previous cpu ticks]
+        self.entries = {}
+        self.open_fds = 0
+        self.last_scan = None
+        self.container_names = {}
+
+    def close(self):
+        for entry in self.entries.values():
+            if entry[0] is not None:
+                os.close(entry[0])
+        self.entries = {}
+        self.open_fds = 0
+        self.last_scan = None
+
+    def _drop(self, pid):
+        entry = self.entries.pop(pid)
+        if entry[0] is not None:
+            os.close(entry[0])
+            self.open_fds -= 1
+
+    def _read_stat(self, pid, entry):
+        fd = entry[0] if entry is not None else None
+        if fd is not None:
+            return os.pread(fd, 4096, 0)
+        fd = os.open(host_path(f"/proc/{pid}/stat"), os.O_RDONLY)
+        try:
+            return os.read(fd, 4096)
+        finally:
+            os.close(fd)
+
+    def _read_static(self, pid):
+        try:
+            with open(host_path(f"/proc/{pid}/cmdline"), "rb") as f:
+                cmdline = f.read(512).rstrip(b"\0").replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            cmdline = ""
+        try:
+            with open(host_path(f"/proc/{pid}/cgroup"), "rb") as f:
+                cgroup = f.read().splitlines()[-1].split(b":", 2)[2]
+        except (OSError, IndexError):
+            cgroup = b""
+        match = CONTAINER_CGROUP_RE.search(cgroup)
+        container = self.container_name((match.group(1) or match.group(2)).decode()) if match else ""
+        return cmdline, cgroup.decode(errors="replace"), container
+
+    def container_name(self, container_id):
+        """Docker's name for a container id, cached; the short id when unknown."""
+        name = self.container_names.get(container_id)
+        if name is None:
+            name = self.container_names[container_id] = resolve_container_name(container_id)
+        return name
+
+    def scan(self):
+        """Return [(pid, comm, cmdline, cpu %, rss kB, container, cgroup)] for every process."""
+        now = time.monotonic()
+        elapsed = now - self.last_scan if self.last_scan is not None else 0.0
+        first_scan = self.last_scan is None
+        self.last_scan = now
+        pids = [int(name) for name in os.listdir(host_path("/proc")) if name.isdigit()]
+        seen = set(pids)
+        for pid in [pid for pid in self.entries if pid not in seen]:
+            self._drop(pid)
+
+        scale = 100.0 / (elapsed * self.clock_ticks) if elapsed > 0 else 0.0
+        processes = []
+        for pid in pids:
+            entry = self.entries.get(pid)
+            try:
+                data = self._read_stat(pid, entry)
+            except OSError:
+                if entry is None:
+                    continue
+                # The task behind the cached descriptor is gone; the PID may be reused
+                self._drop(pid)
+                entry = None
+                try:
+                    data = self._read_stat(pid, None)
+                except OSError:
+                    continue
+            head, _, rest = data.rpartition(b")")
+            fields = rest.split(None, 22)
+            if len(fields) < 22:
+                continue
+            ticks = int(fields[11]) + int(fields[12])
+            start = int(fields[19])
+            if entry is not None and entry[1] != start:
+                self._drop(pid)
+                entry = None
+            if entry is None:
+                fd = None
+                # sysfs handles count against the same budget and take priority
+                if self.open_fds + len(sysfs.handles) < self.max_fds:
+                    try:
+                        fd = os.open(host_path(f"/proc/{pid}/stat"), os.O_RDONLY)
+                        self.open_fds += 1
+                    except OSError:
+                        pass
+                comm = head.partition(b"(")[2].decode(errors="replace")
+                cmdline, cgroup, container = self._read_static(pid)
+                # A process not seen by the previous scan started after it
+                entry = self.entries[pid] = [fd, start, comm, cmdline, cgroup, container, 0 if not first_scan else ticks]
+            cpu = (ticks - entry[6]) * scale
+            entry[6] = ticks
+            processes.append((pid, entry[2], entry[3], cpu, int(fields[21]) * self.page_kib, entry[5], entry[4]))
+        return processes
+
+process_table = ProcessTable()
+
+def read_processes():
+    try:
+        return process_table.scan()
+    except OSError:
+        return []
+
+# How the process panel is shown; main() and the 's' key change it
+PROCESS_VIEW = {"sort": "cpu", "filter": None, "rows": 10}
+
+def process_matches(process, pattern):
+    """True if the container name, cgroup path or command matches the glob pattern."""
+    import fnmatch
+    _, comm, _, _, _, container, cgroup = process
+    return any(fnmatch.fnmatchcase(value, pattern) for value in (container, cgroup, comm))
+
+def format_processes(processes, sort="cpu", pattern=None, rows=10):
+    """Return (header, [(cpu %, line)]) for the top `rows` processes."""
+    if pattern:
+        processes = [p for p in processes if process_matches(p, pattern)]
+    index = 3 if sort == "cpu" else 4
+    top = sorted(processes, key=lambda p: p[index], reverse=True)[:rows]
+    header = f"{'PID':>7} {'CPU%':>6} {'RSS':>6}  {'CONTAINER':<14} COMMAND"
+    lines = []
+    for pid, comm, cmdline, cpu, rss, container, _ in top:
+        lines.append((cpu, f"{pid:>7} {cpu:6.1f} {format_size_binary(rss):>6}  {container[:14]:<14} "
+                           f"{(cmdline or f'[{comm}]')[:60]}"))
+    return header, lines
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# cgroup v2 directories whose children are container scopes: Docker and Podman
+# under systemd, and Docker's cgroupfs driver
+CONTAINER_CGROUP_PARENTS = ("system.slice", "machine.slice", "docker")
+# Pressure resources, in the order of the pressure fields in a container sample
+PSI_RESOURCES = ("cpu", "memory", "io")
+
+class ContainerStat:
+    """Per-container CPU, memory, pressure and I/O read straight from cgroup v2.
+
+    Container scopes are found by listing CONTAINER_CGROUP_PARENTS, and the
+    container name is resolved once per cgroup id (the directory's inode, which
+    a restarted container does not keep). Every counter file is kept open in
+    the SysfsReader, so a container costs six preads per update; handles of
+    removed cgroups are closed. CPU, pressure and I/O are rates over the
+    time since the previous update, so a container's first update reports
+    zero for them. Values whose file is missing are reported as None.
+    """
+
+    # Only cpu.stat is always there: the memory files need the memory
+    # controller (memory.peak also 5.19), the pressure files PSI support and
+    # io.stat the io controller enabled for the container
+    OPTIONAL_FILES = ("memory.current", "memory.peak", "cpu.pressure", "memory.pressure", "io.pressure", "io.stat")
+    FILES = ("cpu.stat",) + OPTIONAL_FILES
+
+    def __init__(self):
+        # cgroup path -> [cgroup id, name, optional files found missing, previous counters, previous time]
+        self.cgroups = {}
+
+    def _discover(self):
+        found = {}
+        for parent in CONTAINER_CGROUP_PARENTS:
+            try:
+                entries = os.scandir(host_path(f"{CGROUP_ROOT}/{parent}"))
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    match = CONTAINER_CGROUP_RE.search(f"/{parent}/{entry.name}".encode())
+                    if match and entry.is_dir(follow_symlinks=False):
+                        found[f"{CGROUP_ROOT}/{parent}/{entry.name}"] = (
+                            entry.inode(), (match.group(1) or match.group(2)).decode())
+        for path in [path for path, state in self.cgroups.items() if found.get(path, (None,))[0] != state[0]]:
+            self._forget(path)
+        for path, (cgroup_id, container_id) in found.items():
+            if path not in self.cgroups:
+                self.cgroups[path] = [cgroup_id, resolve_container_name(container_id), set(), None, None]
+
+    def _forget(self, path):
+        del self.cgroups[path]
+        for name in self.FILES:
+            sysfs.close(f"{path}/{name}")
+
+    @staticmethod
+    def _optional(path, name, missing):
+        """Contents of an OPTIONAL_FILES file, or None once it turned out to be missing."""
+        if name in missing:
+            return None
+        try:
+            return sysfs.read(f"{path}/{name}")
+        except OSError:
+            missing.add(name)
+            return None
+
+    @classmethod
+    def _counters(cls, path, missing):
+        """(usage µs, memory bytes, peak bytes, stall µs per PSI resource, read bytes, written bytes).
+
+        Everything but usage is None when its file is missing, and
+        the file's name is added to `missing` so it is not tried again.
+        """
+        usage = 0
+        for line in sysfs.read(f"{path}/cpu.stat").splitlines():
+            if line.startswith(b"usage_usec "):
+                usage = int(line.split()[1])
+                break
+        memory, peak = (int(data) if data is not None else None
+                        for data in (cls._optional(path, name, missing) for name in ("memory.current", "memory.peak")))
+        stalls = []
+        for resource in PSI_RESOURCES:
+            data = cls._optional(path, f"{resource}.pressure", missing)
+            # "some avg10=0.00 avg60=0.00 avg300=0.00 total=123"; total is µs stalled
+            stalls.append(int(data.split(b"\n", 1)[0].rpartition(b"=")[2]) if data is not None else None)
+        read_bytes = written = None
+        data = cls._optional(path, "io.stat", missing)
+        if data is not None:
+            read_bytes = written = 0
+            for line in data.splitlines():
+                for field in line.split()[1:]:
+                    key, _, value = field.partition(b"=")
+                    if key == b"rbytes":
+                        read_bytes += int(value)
+                    elif key == b"wbytes":
+                        written += int(value)
+        return usage, memory, peak, stalls, read_bytes, written
+
+    def update(self):
+        """Return {name: (CPU % of one core, memory bytes, peak bytes,
+        CPU/memory/IO pressure %, read MB/s, write MB/s)}; see _counters() for None."""
+        self._discover()
+        now = time.monotonic()
+        containers = {}
+        for path, state in list(self.cgroups.items()):
+            try:
+                counters = self._counters(path, state[2])
+            except (OSError, ValueError, IndexError):
+                # Removed between the listing and the read
+                self._forget(path)
+                continue
+            usage, memory, peak, stalls, read_bytes, written = counters
+            previous, elapsed = state[3], now - state[4] if state[4] is not None else 0.0
+            state[3], state[4] = counters, now
+            if previous is None or elapsed <= 0:
+                previous, scale = counters, 0.0
+            else:
+                scale = 100 / (elapsed * 1e6)
+            cpu = (usage - previous[0]) * scale
+            pressure = tuple((stall - old) * scale if stall is not None and old is not None else None
+                             for stall, old in zip(stalls, previous[3]))
+            read_mb = write_mb = None
+            if read_bytes is not None and previous[4] is not None:
+                read_mb = (read_bytes - previous[4]) * scale / 100
+                write_mb = (written - previous[5]) * scale / 100
+            containers[state[1]] = (cpu, memory, peak) + pressure + (read_mb, write_mb)
+        return containers
+
+container_stat = ContainerStat()
+
+def read_containers():
+    return container_stat.update()
+
+CONTAINER_FIELDS = ("cpu_percent", "memory_bytes", "memory_peak_bytes", "cpu_pressure_percent",
+                    "memory_pressure_percent", "io_pressure_percent", "read_mb_s", "write_mb_s")
+
+# How the container panel is shown; main() changes it
+CONTAINER_VIEW = {"rows": 10}
+
+def configure(root=None, runner=None, plugins=None):
+    """Point the collectors at another filesystem root and/or command runner.
+
+    runner(argv, timeout=None) must return the command's stdout as bytes and
+    plugins replaces the list of collector plugin specs. Cached handles and
+    delta state are reset, since they belong to the old root.
+    """
+    global FS_ROOT, COMMAND_RUNNER, cpu_stat, net_stat, disk_stat, process_table, frequency_limits, storage_cache
+    global dvfs_stat, container_stat, plugin_plan
+    if root is not None:
+        FS_ROOT = os.path.abspath(root)
+    if runner is not None:
+        COMMAND_RUNNER = runner
+    sysfs.close()
+    hwmon_chip_names.clear()
+    cpu_stat = CpuStat()
+    process_table.close()
+    process_table = ProcessTable()
+    frequency_limits = FrequencyLimits()
+    plugin_plan = PluginPlan(plugin_plan.specs if plugins is None else plugins)
+    dvfs_stat.close()
+    dvfs_stat = DvfsStat(dvfs_stat.sampler_hz)
+    container_stat = ContainerStat()
+    net_stat = NetDevStat(net_stat.include, net_stat.exclude)
+    disk_stat = DiskStat(disk_stat.partitions, disk_stat.virtual)
+    storage_cache = StorageCache(storage_cache.ttl)
+
+# Refresh tiers in seconds. Every collector belongs to one tier and its last
+# value is reused by build_dashboard() until the tier interval has elapsed.
+REFRESH_TIERS = {"fast": 0.5, "slow": 2.0, "glacial": 30.0}
+
+COLLECTORS = {
+    "device": (read_device_info, "glacial"),
+    "cpu": (get_cpu_info, "fast"),
+    "gpu": (get_gpu_info, "fast"),
+    "npu": (read_npu_info, "fast"),
+    "rga": (read_rga_info, "fast"),
+    # VPU/RKVDEC/RKVENC/ISP and user plugins; shares the gpu/npu/rga plan run
+    "plugins": (read_plugins, "fast"),
+    "freqlimits": (read_frequency_limits, "slow"),
+    # Residency and transition counters cover the whole interval, so slow is enough
+    "dvfs": (read_dvfs, "slow"),
+    "ram": (read_memory, "slow"),
+    # bufinfo can be megabytes with many models loaded, so not on the fast tier
+    "dmabuf": (read_dmabuf, "slow"),
+    "procs": (read_processes, "slow"),
+    "containers": (read_containers, "slow"),
+    "temps": (read_temperatures, "slow"),
+    "net": (get_network_traffic, "fast"),
+    "diskio": (read_disk_io, "fast"),
+    "fstab": (read_fstab_usage, "glacial"),
+    # Cheap between SMART queries, which StorageCache spaces out by SMART_TTL
+    "storage": (read_storage_info, "slow"),
+}
+
+# Value shown for a collector until its first run completes
+COLLECTOR_DEFAULTS = {
+    "device": ("N/A", "N/A", None, "N/A"),
+    "cpu": ({}, {}, {"cores": {}, "clusters": []}),
+    "gpu": (0, 0),
+    "npu": ([], 0),
+    "rga": [],
+    "plugins": {},
+    "freqlimits": {},
+    "dvfs": {},
+    "ram": (None, None, None, None),
+    "dmabuf": (None, None, None, None, {}, {}, [], None),
+    "procs": [],
+    "containers": {},
+    "temps": [],
+    "net": {},
+    "diskio": {},
+    "fstab": [],
+    "storage": ([], []),
+}
+
+# Collectors that report rates from two reads; their first call only primes them
+DELTA_COLLECTORS = ("cpu", "plugins", "dvfs", "net", "diskio", "procs", "containers")
+# Seconds between those two reads when a first sample is needed right away
+PRIME_WINDOW = 0.25
+
+# Seconds a collector may run before its section is marked stale
+COLLECTOR_TIMEOUTS = {"storage": 20.0, "fstab": 10.0}
+DEFAULT_COLLECTOR_TIMEOUT = 2.0
+
+class CollectorScheduler:
+    """Runs each collector at its tier interval and caches the last value.
+
+    refresh() runs due collectors inline. After start() they run on a pool of
+    daemon worker threads instead: poll() queues due collectors and the notify
+    callback fires whenever a result lands, so a stalled collector (a SMART
+    query on a sleeping disk) never blocks the caller.
+    """
+
+    # Alarms never fire exactly on time, so allow a little slack before a
+    # collector is considered due; otherwise a 0.5 s tier would skip ticks.
+    SLACK = 0.05
+
+    def __init__(self, collectors=None, tiers=None, timeouts=None):
+        self.collectors = dict(COLLECTORS if collectors is None else collectors)
+        self.tiers = dict(REFRESH_TIERS if tiers is None else tiers)
+        self.timeouts = dict(COLLECTOR_TIMEOUTS if timeouts is None else timeouts)
+        self.values = {}
+        # When each collector was last started, first started, and last
+        # returned a value; staleness is measured from the last success, so a
+        # collector that keeps failing goes stale even though it is still polled
+        self.last_run = {}
+        self.first_run = {}
+        self.last_success = {}
+        self.in_flight = {}
+        self.lock = threading.Lock()
+        self.queue = None
+        self.notify = None
+        # Called with (collector name, value) whenever a collector produces a result
+        self.listeners = []
+        # (collector or listener, collector name) pairs whose failure was logged
+        self.failures = set()
+        # Optional Profiler that gets the run time of every collector call
+        self.profiler = None
+
+    def interval(self, name):
+        return self.tiers[self.collectors[name][1]]
+
+    def timeout(self, name):
+        return self.timeouts.get(name, DEFAULT_COLLECTOR_TIMEOUT)
+
+    def is_due(self, name, now):
+        if name not in self.last_run:
+            return True
+        return now - self.last_run[name] >= self.interval(name) * (1 - self.SLACK)
+
+    def _log_failure(self, what, name):
+        # A collector or listener failing on every run would flood the log;
+        # the traceback is logged once per pair
+        if (what, name) in self.failures:
+            log.debug("%s failed on %s", what, name, exc_info=True)
+        else:
+            self.failures.add((what, name))
+            log.exception("%s failed on %s", what, name)
+
+    def _collect(self, name, now):
+        """Run a collector in the caller's thread and store its value; failures are logged."""
+        self.last_run[name] = now
+        self.first_run.setdefault(name, now)
+        try:
+            value = self._run(name, self.collectors[name][0])
+        except Exception:
+            self._log_failure("collector", name)
+            return
+        self.values[name] = value
+        self.last_success[name] = time.monotonic()
+        self._publish(name, value)
+
+    def _sample(self):
+        # Collectors that have not produced a value yet show their default
+        return {name: self.values.get(name, COLLECTOR_DEFAULTS.get(name)) for name in self.collectors}
+
+    def refresh(self, skip=()):
+        now = time.monotonic()
+        for name in self.collectors:
+            if name not in skip and self.is_due(name, now):
+                self._collect(name, now)
+        return self._sample()
+
+    def prime(self, window=None, skip=()):
+        """Run every collector not in `skip` once, with delta-based ones measured over a short window.
+
+        Delta collectors report zeros on their first call, so they are called
+        once more after `window` seconds (less whatever the other collectors
+        took). Used by the one-shot and streaming modes to get a real first sample.
+        """
+        window = PRIME_WINDOW if window is None else window
+        start = time.monotonic()
+        self.refresh(skip)
+        time.sleep(max(0.0, window - (time.monotonic() - start)))
+        now = time.monotonic()
+        for name in DELTA_COLLECTORS:
+            if name in self.collectors and name not in skip:
+                self._collect(name, now)
+        return self._sample()
+
+    def _run(self, name, func):
+        if self.profiler is None:
+            return func()
+        start = time.perf_counter_ns()
+        try:
+            return func()
+        finally:
+            self.profiler.record(name, time.perf_counter_ns() - start)
+
+    def _publish(self, name, value):
+        for listener in self.listeners:
+            try:
+                listener(name, value)
+            except Exception:
+                self._log_failure(f"listener {getattr(listener, '__qualname__', repr(listener))}", name)
+
+    def start(self, notify=None, workers=4):
+        self.notify = notify
+        self.queue = queue.Queue()
+        for _ in range(workers):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def poll(self):
+        now = time.monotonic()
+        with self.lock:
+            for name in self.collectors:
+                if name not in self.in_flight and self.is_due(name, now):
+                    self.last_run[name] = now
+                    self.first_run.setdefault(name, now)
+                    self.in_flight[name] = now
+                    self.queue.put(name)
+
+    def _worker(self):
+        while True:
+            name = self.queue.get()
+            try:
+                value = self._run(name, self.collectors[name][0])
+            except Exception:
+                self._log_failure("collector", name)
+                value = None
+            with self.lock:
+                if value is not None:
+                    self.values[name] = value
+                    self.last_success[name] = time.monotonic()
+                del self.in_flight[name]
+            if value is not None:
+                self._publish(name, value)
+            if self.notify is not None:
+                try:
+                    self.notify()
+                except Exception:
+                    pass
+
+    def snapshot(self):
+        """Return the latest completed value of every collector and the names of stale ones."""
+        now = time.monotonic()
+        stale = set()
+        with self.lock:
+            sample = self._sample()
+            for name in self.collectors:
+                started = self.in_flight.get(name)
+                if started is not None and now - started > self.timeout(name):
+                    stale.add(name)
+                elif now - self.last_success.get(name, self.first_run.get(name, now)) > \
+                        self.interval(name) + self.timeout(name):
+                    stale.add(name)
+        return sample, stale
+
+scheduler = CollectorScheduler()
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+class RingBuffer:
+    """Fixed-capacity ring of floats in a preallocated array; appends never grow it."""
+
+    __slots__ = ("data", "head", "count")
+
+    def __init__(self, capacity):
+        self.data = array.array("f", bytes(4 * max(1, capacity)))
+        self.head = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, value):
+        data = self.data
+        data[self.head] = value
+        self.head = (self.head + 1) % len(data)
+        if self.count < len(data):
+            self.count += 1
+
+    def values(self):
+        """Return the stored values, oldest first."""
+        data = self.data
+        if self.count < len(data):
+            return data[:self.count]
+        return data[self.head:] + data[:self.head]
+
+def sparkline(values, width, low=None, high=None):
+    """Render values as block characters, one per bucket of the window.
+
+    Each character shows the bucket maximum so short spikes stay visible.
+    """
+    if not len(values):
+        return " " * width
+    low = min(values) if low is None else low
+    high = max(values) if high is None else high
+    if len(values) > width:
+        step = len(values) / width
+        values = [max(values[int(i * step):max(int(i * step) + 1, int((i + 1) * step))]) for i in range(width)]
+    span = high - low
+    top = len(SPARK_CHARS) - 1
+    chars = [
+        SPARK_CHARS[max(0, min(top, int((v - low) / span * top + 0.5)))] if span > 0 else SPARK_CHARS[0]
+        for v in values
+    ]
+    return "".join(chars).ljust(width)
+
+class HistorySeries:
+    """One metric's history as a ring of equal time slots covering `length` seconds.
+
+    Each slot keeps the min, max, sum and count of the samples that fell in
+    it, so the ring spans the same time however often the metric is
+    sampled: several samples share a slot at a fast rate, and at a slow
+    rate empty slots repeat the last value. Memory is fixed and a sample
+    costs O(1).
+    """
+
+    __slots__ = ("slot_length", "mins", "maxs", "sums", "counts", "slot", "slot_start")
+
+    def __init__(self, length, slots):
+        slots = max(1, slots)
+        self.slot_length = length / slots
+        self.mins = array.array("f", bytes(4 * slots))
+        self.maxs = array.array("f", bytes(4 * slots))
+        self.sums = array.array("d", bytes(8 * slots))
+        self.counts = array.array("I", bytes(4 * slots))
+        self.slot = 0
+        self.slot_start = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _advance(self, now):
+        if self.slot_start is None:
+            self.slot_start = now
+            return
+        steps = int((now - self.slot_start) / self.slot_length)
+        if steps <= 0:
+            return
+        for _ in range(min(steps, len(self.counts))):
+            self.slot = (self.slot + 1) % len(self.counts)
+            self.counts[self.slot] = 0
+            self.sums[self.slot] = 0.0
+        self.slot_start += steps * self.slot_length
+
+    def add(self, value, now):
+        self._advance(now)
+        slot = self.slot
+        if self.counts[slot]:
+            self.mins[slot] = min(self.mins[slot], value)
+            self.maxs[slot] = max(self.maxs[slot], value)
+        else:
+            self.mins[slot] = self.maxs[slot] = value
+        self.sums[slot] += value
+        self.counts[slot] += 1
+
+    def window(self, now):
+        """Return (slot maxima oldest first, min, avg, max), or None without samples."""
+        self._advance(now)
+        counts = self.counts
+        if not any(counts):
+            return None
+        start = (self.slot + 1) % len(counts)
+        order = list(range(start, len(counts))) + list(range(start))
+        values = []
+        last = None
+        lo, hi = math.inf, -math.inf
+        for slot in order:
+            if counts[slot]:
+                last = self.maxs[slot]
+                lo = min(lo, self.mins[slot])
+                hi = max(hi, last)
+            if last is not None:
+                values.append(last)
+        return values, lo, sum(self.sums) / sum(counts), hi
+
+# Collectors kept in history and the prefix of their metric keys
+HISTORY_PREFIXES = {"cpu": "cpu.", "gpu": "gpu", "npu": "npu.", "rga": "rga.", "temps": "temp.", "net": "net.",
+                    "diskio": "disk."}
+
+class MetricHistory:
+    """Rolling per-metric history covering the last `seconds`, fed from collector results.
+
+    Each metric gets a HistorySeries with one slot per refresh interval of its
+    collector's tier. Slots are time-based, so the window stays `seconds` long
+    when the adaptive refresh rate speeds the fast tier up or slows it down.
+    Metrics that disappear from a collector (an interface removed, a sensor
+    gone) are dropped, so memory stays bounded by the current metric count.
+    Worker threads feed it concurrently with the UI drawing it, hence the lock.
+    """
+
+    def __init__(self, seconds, intervals):
+        self.seconds = seconds
+        # intervals(collector name) -> refresh interval in seconds
+        self.intervals = intervals
+        self.buffers = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def metrics(name, value):
+        """Yield (metric key, value) for a collector result.
+
+        History keeps the collectors in HISTORY_PREFIXES; alert rules see all of them.
+        """
+        if name == "cpu":
+            for core, load in value[0].items():
+                yield f"cpu.{core}", load
+        elif name == "gpu":
+            yield "gpu", value[0]
+        elif name == "npu":
+            for core, load in enumerate(value[0]):
+                yield f"npu.{core}", load
+        elif name == "rga":
+            for core, load in enumerate(value):
+                yield f"rga.{core}", load
+        elif name == "temps":
+            for sensor, temp in value:
+                yield f"temp.{sensor}", temp
+        elif name == "net":
+            for ifname, rates in value.items():
+                yield f"net.{ifname}.rx", rates[0]
+                yield f"net.{ifname}.tx", rates[1]
+                # Replayed recordings only have the two bit rates
+                if len(rates) > 2:
+                    yield f"net.{ifname}.pps", rates[2] + rates[3]
+                    yield f"net.{ifname}.errors", rates[4] + rates[5]
+                    yield f"net.{ifname}.dropped", rates[6] + rates[7]
+        elif name == "diskio":
+            for device, rates in value.items():
+                yield f"disk.{device}.read", rates[0]
+                yield f"disk.{device}.write", rates[1]
+                yield f"disk.{device}.util", rates[6]
+        elif name == "ram":
+            if value[0] is not None and value[1]:
+                yield "ram", value[0] * 100 / value[1]
+        elif name == "freqlimits":
+            # Share of the hardware maximum the domain may currently run at
+            for domain, (_, cap, hw_max) in value.items():
+                if hw_max:
+                    yield f"throttle.{domain}", cap * 100 / hw_max
+        elif name == "plugins":
+            for plugin, metrics in value.items():
+                for metric, metric_value in metrics.items():
+                    if isinstance(metric_value, list):
+                        for index, item in enumerate(metric_value):
+                            yield f"{plugin}.{metric}.{index}", item
+                    else:
+                        yield f"{plugin}.{metric}", metric_value
+        elif name == "dmabuf":
+            cma_total, cma_free, _, total, exporters, _, _, rknpu = value
+            if cma_total:
+                yield "cma", (cma_total - cma_free) * 100 / cma_total
+            if total is not None:
+                yield "dmabuf.total", total / (1 << 20)
+                for exporter, (_, size) in exporters.items():
+                    yield f"dmabuf.exporter.{exporter}", size / (1 << 20)
+            if rknpu is not None and rknpu[1]:
+                yield "rknpu.memory", rknpu[0] * 100 / rknpu[1]
+        elif name == "containers":
+            for container, (cpu, memory, _, psi_cpu, psi_memory, psi_io, _, _) in value.items():
+                yield f"container.{container}.cpu", cpu
+                if memory is not None:
+                    yield f"container.{container}.memory", memory / (1 << 20)
+                for resource, psi in zip(PSI_RESOURCES, (psi_cpu, psi_memory, psi_io)):
+                    if psi is not None:
+                        yield f"container.{container}.pressure.{resource}", psi
+        elif name == "dvfs":
+            for domain, (states, transitions, _, _, _) in value.items():
+                yield f"dvfs.{domain}.mhz", sum(mhz * share for mhz, share in states) / 100
+                yield f"dvfs.{domain}.transitions", transitions
+
+    def feed(self, name, value):
+        prefix = HISTORY_PREFIXES.get(name)
+        if prefix is None:
+            return
+        seen = set()
+        capacity = max(1, math.ceil(self.seconds / self.intervals(name)))
+        now = time.monotonic()
+        with self.lock:
+            for key, metric in self.metrics(name, value):
+                seen.add(key)
+                series = self.buffers.get(key)
+                if series is None or len(series) != capacity:
+                    series = self.buffers[key] = HistorySeries(self.seconds, capacity)
+                series.add(metric, now)
+            for key in [k for k in self.buffers if k.startswith(prefix) and k not in seen]:
+                del self.buffers[key]
+
+    def line(self, key, label, width=24, unit="%", low=0.0, high=100.0, precision=0):
+        """Dashboard line with a sparkline and min/avg/max, or None without data."""
+        with self.lock:
+            series = self.buffers.get(key)
+            window = series.window(time.monotonic()) if series is not None else None
+        if window is None:
+            return None
+        values, lo, avg, hi = window
+        spark = sparkline(values, width, low, high)
+        w = 3 if precision == 0 else 6
+        return ("freq", f"{label:<14} {spark} min {lo:{w}.{precision}f}{unit} avg {avg:{w}.{precision}f}{unit} "
+                        f"max {hi:{w}.{precision}f}{unit}")
+
+# Windows of the load statistics, and the ring slots each window is split into
+STATS_WINDOWS = {"10s": 10.0, "1m": 60.0, "15m": 900.0}
+STATS_SLOTS = 10
+# Load metrics are percentages, so a 1%-wide histogram is an exact-enough quantile sketch
+STATS_BINS = 101
+STATS_COLLECTORS = ("cpu", "gpu", "npu", "rga")
+STATS_FIELDS = ("mean", "ewma", "min", "max", "p50", "p95", "p99")
+
+class SlidingWindow:
+    """Count, sum, min/max and a percent histogram over roughly the last `length` seconds.
+
+    The window is a ring of `slots` sub-windows. A sample only touches the
+    current slot and the running totals; a slot's histogram is subtracted
+    from the totals when the ring moves past it, so memory is fixed and the
+    cost per sample is O(1). The EWMA uses the window length as its time
+    constant.
+    """
+
+    __slots__ = ("length", "slot_length", "counts", "sums", "mins", "maxs", "hists", "total", "count", "sum",
+                 "slot", "slot_start", "ewma", "last")
+
+    def __init__(self, length, slots=STATS_SLOTS):
+        self.length = length
+        self.slot_length = length / slots
+        self.counts = [0] * slots
+        self.sums = [0.0] * slots
+        self.mins = [math.inf] * slots
+        self.maxs = [-math.inf] * slots
+        self.hists = [array.array("I", bytes(4 * STATS_BINS)) for _ in range(slots)]
+        self.total = array.array("I", bytes(4 * STATS_BINS))
+        self.count = 0
+        self.sum = 0.0
+        self.slot = 0
+        self.slot_start = None
+        self.ewma = None
+        self.last = None
+
+    def _advance(self, now):
+        if self.slot_start is None:
+            self.slot_start = now
+            return
+        steps = int((now - self.slot_start) / self.slot_length)
+        if steps <= 0:
+            return
+        for _ in range(min(steps, len(self.counts))):
+            self.slot = (self.slot + 1) % len(self.counts)
+            self._clear(self.slot)
+        self.slot_start += steps * self.slot_length
+
+    def _clear(self, slot):
+        if self.counts[slot]:
+            hist = self.hists[slot]
+            total = self.total
+            for index, n in enumerate(hist):
+                if n:
+                    total[index] -= n
+                    hist[index] = 0
+            self.count -= self.counts[slot]
+            self.sum -= self.sums[slot]
+        self.counts[slot] = 0
+        self.sums[slot] = 0.0
+        self.mins[slot] = math.inf
+        self.maxs[slot] = -math.inf
+
+    def add(self, value, now):
+        self._advance(now)
+        slot = self.slot
+        self.counts[slot] += 1
+        self.sums[slot] += value
+        if value < self.mins[slot]:
+            self.mins[slot] = value
+        if value > self.maxs[slot]:
+            self.maxs[slot] = value
+        index = min(STATS_BINS - 1, max(0, int(value + 0.5)))
+        self.hists[slot][index] += 1
+        self.total[index] += 1
+        self.count += 1
+        self.sum += value
+        if self.ewma is None:
+            self.ewma = value
+        else:
+            self.ewma += (value - self.ewma) * (1 - math.exp(-(now - self.last) / self.length))
+        self.last = now
+
+    def quantile(self, fraction):
+        rank = max(1, math.ceil(self.count * fraction))
+        seen = 0
+        for index, n in enumerate(self.total):
+            seen += n
+            if seen >= rank:
+                return float(index)
+        return float(STATS_BINS - 1)
+
+    def summary(self, now):
+        """Return {mean, ewma, min, max, p50, p95, p99, count}, or None without samples."""
+        self._advance(now)
+        if not self.count:
+            return None
+        return {
+            "mean": self.sum / self.count,
+            "ewma": self.ewma,
+            "min": min(self.mins),
+            "max": max(self.maxs),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "count": self.count,
+        }
+
+class WindowedStats:
+    """Load statistics per CPU core, GPU, NPU core and RGA core over every STATS_WINDOWS window.
+
+    Fed as a scheduler listener, like MetricHistory, and drops metrics whose
+    core disappears. `window` is the one the panel shows and, when
+    `color_by` names a statistic, the one the load colours come from.
+    """
+
+    def __init__(self, windows=None):
+        self.windows = dict(STATS_WINDOWS if windows is None else windows)
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.visible = False
+        self.window = "1m"
+        self.color_by = None
+
+    def feed(self, name, value):
+        if name not in STATS_COLLECTORS:
+            return
+        now = time.monotonic()
+        prefix = HISTORY_PREFIXES[name]
+        seen = set()
+        with self.lock:
+            for key, metric in MetricHistory.metrics(name, value):
+                seen.add(key)
+                windows = self.metrics.get(key)
+                if windows is None:
+                    windows = self.metrics[key] = {label: SlidingWindow(length)
+                                                   for label, length in self.windows.items()}
+                for window in windows.values():
+                    window.add(metric, now)
+            for key in [k for k in self.metrics if k.startswith(prefix) and k not in seen]:
+                del self.metrics[key]
+
+    def summary(self, key, window=None):
+        with self.lock:
+            windows = self.metrics.get(key)
+            if windows is None:
+                return None
+            return windows[window or self.window].summary(time.monotonic())
+
+    def color_value(self, key, value):
+        """The value the load colour of `key` is based on: the instant one unless color_by is set."""
+        if self.color_by is None:
+            return value
+        summary = self.summary(key)
+        return value if summary is None else summary[self.color_by]
+
+    def cycle_window(self):
+        labels = list(self.windows)
+        self.window = labels[(labels.index(self.window) + 1) % len(labels)]
+
+    def lines(self):
+        """Dashboard lines for the statistics panel."""
+        order = {"cpu": 0, "gpu": 1, "npu": 2, "rga": 3}
+        with self.lock:
+            keys = list(self.metrics)
+        keys.sort(key=lambda k: (order.get(k.partition(".")[0], 9), int(k.partition(".")[2] or 0)))
+        title = f"📈 Load statistics ({self.window} window"
+        if self.color_by is not None:
+            title += f", colours by {self.color_by}"
+        lines = [("title", title + "):"),
+                 ("default", f"{'':<14} " + " ".join(f"{field:>5}" for field in STATS_FIELDS) + f" {'n':>6}")]
+        for key in keys:
+            summary = self.summary(key)
+            if summary is None:
+                continue
+            lines.append([
+                ("default", f"{key:<14} "),
+                (level_attr("load", summary["mean"]), f"{summary['mean']:5.1f}"),
+                ("default", " " + " ".join(f"{summary[field]:5.1f}" for field in STATS_FIELDS[1:])
+                            + f" {summary['count']:6d}"),
+            ])
+        return lines
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sequence, or 0.0 when empty."""
+    if not len(values):
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def read_self_cpu():
+    """User plus system CPU seconds used by myrktop so far, or None."""
+    # myrktop's own process, so never below --root
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            # Fields after the parenthesised comm; utime and stime are 14 and 15
+            fields = f.read().rsplit(b")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return None
+
+class Profiler:
+    """Self-instrumentation: collector and render timings, tick jitter and own CPU/RSS.
+
+    Durations are kept in milliseconds in a RingBuffer per name, so p50/p99
+    roll over the last `samples` runs. Worker threads record concurrently
+    with the UI reading, hence the lock.
+    """
+
+    def __init__(self, samples=512):
+        self.samples = samples
+        self.timings = {}
+        self.lock = threading.Lock()
+        self.visible = False
+        self.last_tick = None
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.last_cpu = None
+        self.cpu_percent = 0.0
+        self.rss_kib = 0
+        self.max_rss_kib = 0
+
+    def record(self, name, ns):
+        with self.lock:
+            buf = self.timings.get(name)
+            if buf is None:
+                buf = self.timings[name] = RingBuffer(self.samples)
+            buf.append(ns / 1e6)
+
+    def tick(self, interval):
+        """Call once per UI tick; records how late the tick fired and samples own usage."""
+        now = time.monotonic()
+        if self.last_tick is not None:
+            self.record("tick jitter", (now - self.last_tick - interval) * 1e9)
+        self.last_tick = now
+        self.sample_self(now)
+
+    def sample_self(self, now):
+        cpu = read_self_cpu()
+        try:
+            with open("/proc/self/statm", "rb") as f:
+                rss_pages = int(f.read().split()[1])
+        except (OSError, IndexError, ValueError):
+            return
+        if cpu is None:
+            return
+        if self.last_cpu is not None and now > self.last_cpu[0]:
+            self.cpu_percent = (cpu - self.last_cpu[1]) / (now - self.last_cpu[0]) * 100
+        self.last_cpu = (now, cpu)
+        self.rss_kib = rss_pages * self.page_size // 1024
+        self.max_rss_kib = max(self.max_rss_kib, self.rss_kib)
+
+    def summary(self):
+        """Return {name: {last, p50, p99, max, mean (ms), count}} for every timed name."""
+        with self.lock:
+            buffers = {name: (buf.data[(buf.head - 1) % len(buf.data)], buf.values())
+                       for name, buf in self.timings.items()}
+        result = {}
+        for name, (last, values) in buffers.items():
+            result[name] = {
+                "last_ms": last,
+                "p50_ms": percentile(values, 0.5),
+                "p99_ms": percentile(values, 0.99),
+                "max_ms": max(values),
+                "mean_ms": sum(values) / len(values),
+                "count": len(values),
+            }
+        return result
+
+    def report(self):
+        """Everything the panel shows, as a JSON-serialisable dict."""
+        return {
+            "timings": self.summary(),
+            "self": {"cpu_percent": self.cpu_percent, "rss_kib": self.rss_kib, "max_rss_kib": self.max_rss_kib},
+        }
+
+    def dump(self, path):
+        import json
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+            f.write("\n")
+
+    def lines(self):
+        """Dashboard lines for the profile panel."""
+        lines = [("title", "⏱️  Profile (ms, rolling):"),
+                 ("default", f"{'':<14} {'last':>8} {'p50':>8} {'p99':>8} {'max':>8} {'n':>5}")]
+        for name, stats in self.summary().items():
+            attr = "temp_red" if name != "tick jitter" and stats["p99_ms"] >= 100 else "default"
+            lines.append((attr, f"{name:<14} {stats['last_ms']:8.2f} {stats['p50_ms']:8.2f} "
+                                f"{stats['p99_ms']:8.2f} {stats['max_ms']:8.2f} {stats['count']:5d}"))
+        lines.append(("default", f"myrktop CPU {self.cpu_percent:5.1f}%  RSS {format_size_binary(self.rss_kib)} "
+                                 f"(max {format_size_binary(self.max_rss_kib)})"))
+        return lines
+
+# Bounds of the adaptive fast-tier interval, in seconds
+ADAPTIVE_MIN = 0.1
+ADAPTIVE_MAX = 3.0
+# myrktop's own CPU use, in percent of one core, that the adaptive rate stays under
+CPU_BUDGET = 5.0
+# Load change between two samples (percentage points) that speeds sampling up,
+# and below which it backs off
+ADAPTIVE_BUSY_CHANGE = 10.0
+ADAPTIVE_IDLE_CHANGE = 3.0
+# Own CPU is measured over at least this many seconds; clock ticks are coarse
+BUDGET_WINDOW = 2.0
+
+class AdaptiveRate:
+    """Fast-tier interval driven by how quickly loads change and by myrktop's own cost.
+
+    Fed CPU, GPU and NPU results as a scheduler listener. A load change of
+    ADAPTIVE_BUSY_CHANGE points halves the interval at once; while loads are
+    stable it grows by a quarter per tick, up to `maximum`. Own CPU time from
+    /proc/self/stat sets a floor on top: the interval is stretched in
+    proportion when myrktop uses more than `budget` percent of a core.
+    pin() fixes the interval, ignoring both, until unpin().
+    """
+
+    def __init__(self, initial, minimum=ADAPTIVE_MIN, maximum=ADAPTIVE_MAX, budget=CPU_BUDGET):
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self.budget = budget
+        self.interval = self.clamp(initial)
+        self.pinned = None
+        self.floor = self.minimum
+        self.loads = {}
+        self.change = 0.0
+        self.cpu_percent = 0.0
+        self.window = None
+        self.ticks = 0
+
+    def clamp(self, interval):
+        return min(self.maximum, max(self.minimum, interval))
+
+    def feed(self, name, value):
+        if name == "cpu":
+            # The mean over cores: a single core is too coarse at 100 ms (one clock tick is 10%)
+            loads = value[0].values()
+            metrics = [("cpu", sum(loads) / len(loads))] if loads else []
+        elif name in ("gpu", "npu"):
+            metrics = MetricHistory.metrics(name, value)
+        else:
+            return
+        change = self.change
+        for key, load in metrics:
+            previous = self.loads.get(key)
+            if previous is not None:
+                change = max(change, abs(load - previous))
+            self.loads[key] = load
+        self.change = change
+
+    def update(self):
+        """Call once per tick; returns the interval until the next tick."""
+        self._measure_budget(time.monotonic())
+        change, self.change = self.change, 0.0
+        if self.pinned is not None:
+            return self.pinned
+        if change >= ADAPTIVE_BUSY_CHANGE:
+            self.interval = self.interval / 2
+        elif change < ADAPTIVE_IDLE_CHANGE:
+            self.interval = self.interval * 1.25
+        self.interval = self.clamp(max(self.interval, self.floor))
+        return self.interval
+
+    def _measure_budget(self, now):
+        cpu = read_self_cpu()
+        if cpu is None:
+            return
+        self.ticks += 1
+        if self.window is None:
+            self.window = (now, cpu, self.ticks)
+            return
+        start, start_cpu, start_ticks = self.window
+        elapsed = now - start
+        if elapsed < BUDGET_WINDOW:
+            return
+        self.cpu_percent = (cpu - start_cpu) / elapsed * 100
+        self.window = (now, cpu, self.ticks)
+        if self.budget > 0:
+            # Cost is roughly proportional to the tick rate, so scale the mean
+            # interval of the window by how far over (or under) budget it was
+            mean_interval = elapsed / (self.ticks - start_ticks)
+            self.floor = self.clamp(mean_interval * self.cpu_percent / self.budget)
+
+    def pin(self, interval):
+        self.pinned = self.clamp(interval)
+        return self.pinned
+
+    def unpin(self):
+        self.pinned = None
+
+    def current(self):
+        return self.pinned if self.pinned is not None else self.interval
+
+    def describe(self):
+        mode = "pinned" if self.pinned is not None else "auto"
+        budget = f" of {self.budget:g}%" if self.budget > 0 else ""
+        return f"Refresh {self.current():.2f}s {mode}, own CPU {self.cpu_percent:.1f}%{budget}"
+
+ALERT_RULE_RE = re.compile(
+    r"^\s*(?P<pattern>\S+?)\s*(?P<op>>=|<=|>|<)\s*(?P<threshold>-?\d+(?:\.\d+)?)"
+    r"(?:\s+clear\s+(?P<clear>-?\d+(?:\.\d+)?))?(?:\s+for\s+(?P<duration>\d+(?:\.\d+)?)s?)?"
+    r"(?P<when_hot>\s+when\s+hot)?\s*$")
+
+ALERT_OPS = {
+    ">=": lambda a, b: a >= b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    "<": lambda a, b: a < b,
+}
+
+# Sustained critical temperature, and throttling: a frequency cap below the
+# hardware maximum while the board is hot
+DEFAULT_ALERT_RULES = (
+    f"temp.* >= {THRESHOLDS['temp'][1]} clear {THRESHOLDS['temp'][1] - 5} for 5",
+    "throttle.* < 100 clear 100 for 2 when hot",
+)
+
+class AlertRule:
+    """Threshold on the metrics matching a glob, e.g. "npu.* >= 80 clear 60 for 30".
+
+    The rule fires once the condition has held for `for` seconds and resolves
+    when the value crosses the `clear` level (default: the threshold itself),
+    so a value hovering around the threshold does not flap. "when hot" also
+    requires the hottest sensor to be at the critical temperature.
+    """
 
-def get_cpu_info():
-    cpu_loads = {}
-    core_count = os.cpu_count()
-    global prev_cpu
-    for i in range(core_count):
-        try:
-            with open("/proc/stat", "r") as f:
-                lines = f.readlines()
-            line = next((l for l in lines if l.startswith(f"cpu{i} ")), None)
-            if not line:
-                continue
-            parts = line.split()
-            user = int(parts[1])
-            nice = int(parts[2])
-            system = int(parts[3])
-            idle = int(parts[4])
-            iowait = int(parts[5])
-            irq = int(parts[6])
-            softirq = int(parts[7])
-            steal = int(parts[8]) if len(parts) > 8 else 0
-            total = user + nice + system + idle + iowait + irq + softirq + steal
-        except Exception:
-            continue
+    def __init__(self, text):
+        match = ALERT_RULE_RE.match(text)
+        if match is None:
+            raise ValueError(f"invalid alert rule {text!r}, expected e.g. 'temp.* >= 75 clear 70 for 10'")
+        self.text = " ".join(text.split())
+        self.pattern = match["pattern"]
+        self.op = match["op"]
+        self.threshold = float(match["threshold"])
+        self.clear = float(match["clear"]) if match["clear"] is not None else self.threshold
+        self.duration = float(match["duration"] or 0)
+        self.when_hot = match["when_hot"] is not None
+        self.compare = ALERT_OPS[self.op]
+        # Resolved once the value is on the other side of the clear level
+        self.cleared = ALERT_OPS[{">=": "<", ">": "<=", "<=": ">", "<": ">="}[self.op]]
+
+class AlertEngine:
+    """Evaluates alert rules on every collector result, as a scheduler listener.
+
+    Work per metric sample is a dict lookup of the rules matching its key
+    (cached on first sight) and a comparison per rule. Transitions are appended
+    to the log file and kept for the dashboard status line. A metric that a
+    collector stops reporting (a removed container, say) ends its alerts with
+    a GONE event.
+    """
+
+    def __init__(self, rules, log_path=None, echo=None):
+        self.rules = [AlertRule(rule) if isinstance(rule, str) else rule for rule in rules]
+        self.log = open(log_path, "a", buffering=1) if log_path else None
+        # echo(line) is called with every event line, e.g. to print it in headless modes
+        self.echo = echo
+        self.rules_for = {}
+        # (rule index, metric key) -> [pending since, active since, last value]
+        self.state = {}
+        self.active = {}
+        # collector name -> keys with rules it reported last time
+        self.reported = {}
+        self.events = []
+        self.hot = False
+        self.lock = threading.Lock()
+
+    def _rules(self, key):
+        import fnmatch
+        rules = self.rules_for.get(key)
+        if rules is None:
+            rules = self.rules_for[key] = [i for i, rule in enumerate(self.rules)
+                                           if fnmatch.fnmatchcase(key, rule.pattern)]
+        return rules
+
+    def feed(self, name, value):
+        now = time.monotonic()
+        with self.lock:
+            if name == "temps" and value:
+                warning, critical = THRESHOLDS["temp"]
+                hottest = max(temp for _, temp in value)
+                self.hot = hottest >= critical or (self.hot and hottest >= warning)
+            reported = set()
+            for key, metric in MetricHistory.metrics(name, value):
+                rules = self._rules(key)
+                if rules:
+                    reported.add(key)
+                for index in rules:
+                    self._check(index, key, metric, now)
+            for key in self.reported.get(name, set()) - reported:
+                self._forget(key)
+            self.reported[name] = reported
+
+    def _forget(self, key):
+        for index in self.rules_for.pop(key):
+            state = self.state.pop((index, key), None)
+            if self.active.pop((index, key), None) is not None:
+                self._event("GONE", self.rules[index], key, state[2])
+
+    def _check(self, index, key, value, now):
+        rule = self.rules[index]
+        state = self.state.get((index, key))
+        if state is None:
+            state = self.state[(index, key)] = [None, None, value]
+        state[2] = value
+        if state[1] is None:
+            if rule.compare(value, rule.threshold) and (self.hot or not rule.when_hot):
+                if state[0] is None:
+                    state[0] = now
+                if now - state[0] >= rule.duration:
+                    state[1] = now
+                    self.active[(index, key)] = state
+                    self._event("FIRING", rule, key, value)
+            else:
+                state[0] = None
+        elif rule.cleared(value, rule.clear) or (rule.when_hot and not self.hot):
+            state[0] = state[1] = None
+            del self.active[(index, key)]
+            self._event("RESOLVED", rule, key, value)
 
-        if i in prev_cpu:
-            prev_total, prev_idle = prev_cpu[i]
-            diff_total = total - prev_total
-            diff_idle = idle - prev_idle
-            load = (100 * (diff_total - diff_idle)) // diff_total if diff_total > 0 else 0
+    def _event(self, kind, rule, key, value):
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        line = f"{stamp} {kind} {key}={value:.1f} rule: {rule.text}"
+        self.events.append(line)
+        del self.events[:-50]
+        if self.log is not None:
+            self.log.write(line + "\n")
+        if self.echo is not None:
+            self.echo(line)
+
+    def status_line(self):
+        """Dashboard status line: active alerts with their current value and age."""
+        now = time.monotonic()
+        with self.lock:
+            active = [(self.rules[index], key, state[2], now - state[1])
+                      for (index, key), state in self.active.items()]
+        if not active:
+            return ("good", "✅ No active alerts")
+        parts = [f"{key} {value:.0f} {rule.op} {rule.threshold:g} ({age:.0f}s)" for rule, key, value, age in active]
+        return ("temp_red", f"⚠️  {len(active)} active: " + ", ".join(parts))
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+
+# Collectors whose values are stored by --record
+RECORDED_COLLECTORS = ("cpu", "gpu", "npu", "rga", "temps", "net")
+
+RING_MAGIC = b"MYRKTOP\x01"
+RING_VERSION = 1
+# magic, version, header size, record size, capacity, samples written, layout length
+RING_HEADER = struct.Struct("<8sIIIIQI")
+RING_COUNT_OFFSET = 24
+RING_HEADER_SIZE = 4096
+RING_NO_TEMP = -32768
+
+def ring_layout(sample):
+    """Describe the fixed record layout for a recorder from its first sample."""
+    cpu_loads, _, _ = sample["cpu"]
+    device_info, npu_version, _, _ = read_device_info()
+    return {
+        "cores": max(cpu_loads, default=-1) + 1,
+        "npu": len(sample["npu"][0]),
+        "rga": len(sample["rga"]),
+        "temps": [name for name, _ in sample["temps"]],
+        "net": sorted(sample["net"]),
+        "device": device_info,
+        "npu_version": npu_version,
+    }
+
+class RingFile:
+    """Fixed-width binary samples in a preallocated, memory-mapped ring file.
+
+    The file is a RING_HEADER_SIZE header (the layout is stored as JSON so a
+    replay knows the core count, sensor and interface names) followed by
+    `capacity` records. Once full, the oldest record is overwritten. Values
+    that appear after recording started (a new interface, say) are dropped.
+    """
+
+    def __init__(self, path, layout=None, max_bytes=16 << 20):
+        import json
+        import mmap
+        self.path = path
+        writable = layout is not None
+        existing = os.path.exists(path)
+        if existing:
+            # Anything that is not a complete recording is refused, never overwritten
+            stored = self._read_layout(path)
+            if writable and stored != layout:
+                raise ValueError(f"{path} was recorded with a different layout; use another file")
+            self.layout = stored
+        elif not writable:
+            raise ValueError(f"{path} is not a myrktop recording")
         else:
-            load = 0
-        cpu_loads[i] = load
-        prev_cpu[i] = (total, idle)
+            self.layout = layout
+        self.record = self._record_struct(self.layout)
+        if not existing:
+            layout_json = json.dumps(self.layout).encode("utf-8")
+            if RING_HEADER.size + len(layout_json) > RING_HEADER_SIZE:
+                raise ValueError("too many sensors/interfaces to record")
+            capacity = max(1, (max_bytes - RING_HEADER_SIZE) // self.record.size)
+            fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+            try:
+                size = RING_HEADER_SIZE + capacity * self.record.size
+                os.ftruncate(fd, size)
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                except (AttributeError, OSError):
+                    pass
+                os.pwrite(fd, RING_HEADER.pack(RING_MAGIC, RING_VERSION, RING_HEADER_SIZE, self.record.size,
+                                               capacity, 0, len(layout_json)) + layout_json, 0)
+            finally:
+                os.close(fd)
+        self.file = open(path, "r+b" if writable else "rb")
+        access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=access)
+        _, _, _, _, self.capacity, self.count, _ = RING_HEADER.unpack_from(self.mm)
+        # Reused for every append so recording does not allocate per sample
+        self.values = [0] * self._field_count(self.layout)
+        self.temp_index = {name: i for i, name in enumerate(self.layout["temps"])}
+        self.net_index = {name: i for i, name in enumerate(self.layout["net"])}
 
-    cpu_freqs = {}
-    for i in range(core_count):
+    @classmethod
+    def _read_layout(cls, path):
+        """Return the layout stored in an existing file; ValueError if it is not a recording."""
+        import json
+        with open(path, "rb") as f:
+            header = f.read(RING_HEADER_SIZE)
+            size = os.fstat(f.fileno()).st_size
+        if len(header) < RING_HEADER_SIZE or RING_HEADER.unpack_from(header)[:2] != (RING_MAGIC, RING_VERSION):
+            raise ValueError(f"{path} is not a myrktop recording")
+        _, _, header_size, record_size, capacity, _, layout_len = RING_HEADER.unpack_from(header)
         try:
-            with open(f"/sys/devices/system/cpu/cpu{i}/cpufreq/scaling_cur_freq", "r") as f:
-                freq_str = f.read().strip()
-            freq = int(freq_str) // 1000  # Convert kHz to MHz
-        except Exception:
-            freq = 0
-        cpu_freqs[i] = freq
-    return cpu_loads, cpu_freqs
+            layout = json.loads(header[RING_HEADER.size:RING_HEADER.size + layout_len])
+            valid = (header_size == RING_HEADER_SIZE and capacity > 0
+                     and cls._record_struct(layout).size == record_size
+                     and size >= RING_HEADER_SIZE + capacity * record_size)
+        except (ValueError, TypeError, KeyError, struct.error):
+            valid = False
+        if not valid:
+            raise ValueError(f"{path} is a damaged myrktop recording")
+        return layout
 
+    @staticmethod
+    def _record_struct(layout):
+        n = layout["cores"]
+        return struct.Struct(
+            f"<d{n}B{n}HBH{layout['npu']}BH{layout['rga']}B{len(layout['temps'])}h{2 * len(layout['net'])}f"
+        )
 
+    @staticmethod
+    def _field_count(layout):
+        return 1 + 2 * layout["cores"] + 2 + layout["npu"] + 1 + layout["rga"] + len(layout["temps"]) \
+            + 2 * len(layout["net"])
 
-def get_gpu_info():
-    try:
-        with open("/sys/class/devfreq/fb000000.gpu/load", "r") as f:
-            raw_line = f.read().strip()  # e.g., "0@300000000Hz"
-        # Split using '@' or space (same as -F'[@ ]' in AWK)
-        fields = re.split(r'[@ ]+', raw_line)
-        # The first field is the GPU load (as a number)
-        load_str = fields[0]
-        # If there's a trailing '%' remove it (not needed for your case)
-        if load_str.endswith('%'):
-            load_str = load_str[:-1]
-        gpu_load = int(load_str)
-    except Exception:
-        gpu_load = 0
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, sample, timestamp):
+        layout = self.layout
+        v = self.values
+        v[0] = timestamp
+        pos = 1
+        cpu_loads, cpu_freqs, _ = sample["cpu"]
+        cores = layout["cores"]
+        for i in range(cores):
+            v[pos + i] = min(cpu_loads.get(i, 0), 255)
+            v[pos + cores + i] = min(cpu_freqs.get(i, 0), 65535)
+        pos += 2 * cores
+        gpu_load, gpu_freq = sample["gpu"]
+        v[pos] = min(gpu_load, 255)
+        v[pos + 1] = min(gpu_freq, 65535)
+        pos += 2
+        npu_loads = sample["npu"][0]
+        for i in range(layout["npu"]):
+            v[pos + i] = min(npu_loads[i], 255) if i < len(npu_loads) else 0
+        pos += layout["npu"]
+        v[pos] = min(sample["npu"][1], 65535)
+        pos += 1
+        rga_loads = sample["rga"]
+        for i in range(layout["rga"]):
+            v[pos + i] = min(rga_loads[i], 255) if i < len(rga_loads) else 0
+        pos += layout["rga"]
+        ntemps = len(layout["temps"])
+        for i in range(ntemps):
+            v[pos + i] = RING_NO_TEMP
+        for name, temp in sample["temps"]:
+            i = self.temp_index.get(name)
+            if i is not None:
+                v[pos + i] = max(-32767, min(temp, 32767))
+        pos += ntemps
+        for i in range(2 * len(layout["net"])):
+            v[pos + i] = 0.0
+        for ifname, (rx_rate, tx_rate, *_) in sample["net"].items():
+            i = self.net_index.get(ifname)
+            if i is not None:
+                v[pos + 2 * i] = rx_rate
+                v[pos + 2 * i + 1] = tx_rate
+        slot = self.count % self.capacity
+        self.record.pack_into(self.mm, RING_HEADER_SIZE + slot * self.record.size, *v)
+        # Publish the sample only after its record is complete
+        self.count += 1
+        struct.pack_into("<Q", self.mm, RING_COUNT_OFFSET, self.count)
+
+    def read(self, index):
+        """Return (timestamp, sample) for record `index`, 0 being the oldest kept."""
+        start = max(0, self.count - self.capacity)
+        slot = (start + index) % self.capacity
+        v = self.record.unpack_from(self.mm, RING_HEADER_SIZE + slot * self.record.size)
+        layout = self.layout
+        cores = layout["cores"]
+        pos = 1
+        cpu_loads = {i: v[pos + i] for i in range(cores)}
+        cpu_freqs = {i: v[pos + cores + i] for i in range(cores)}
+        pos += 2 * cores
+        gpu = (v[pos], v[pos + 1])
+        pos += 2
+        npu_loads = v[pos:pos + layout["npu"]]
+        pos += layout["npu"]
+        npu = (list(npu_loads), v[pos])
+        pos += 1
+        rga = list(v[pos:pos + layout["rga"]])
+        pos += layout["rga"]
+        temps = [(name, v[pos + i]) for i, name in enumerate(layout["temps"]) if v[pos + i] != RING_NO_TEMP]
+        pos += len(layout["temps"])
+        net = {ifname: (v[pos + 2 * i], v[pos + 2 * i + 1]) for i, ifname in enumerate(layout["net"])}
+        sample = dict(COLLECTOR_DEFAULTS)
+        sample.update({
+            "device": (layout["device"], layout["npu_version"], None, "N/A"),
+            "cpu": (cpu_loads, cpu_freqs, {"cores": {}, "clusters": []}),
+            "gpu": gpu,
+            "npu": npu,
+            "rga": rga,
+            "temps": temps,
+            "net": net,
+        })
+        return v[0], sample
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
 
+def run_recorder(path, max_bytes, interval, alerts=None):
+    """Headless --record loop: sample the recorded collectors and append to the ring file."""
+    names = RECORDED_COLLECTORS + (("freqlimits",) if alerts is not None else ())
+    rec_scheduler = CollectorScheduler({name: COLLECTORS[name] for name in names}, tiers=scheduler.tiers)
+    if alerts is not None:
+        rec_scheduler.listeners.append(alerts.feed)
+    # The first pass only primes delta-based collectors and fixes the layout
+    ring = RingFile(path, ring_layout(rec_scheduler.refresh()), max_bytes)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    next_tick = time.monotonic()
     try:
-        with open("/sys/class/devfreq/fb000000.gpu/cur_freq", "r") as f:
-            gpu_freq_str = f.read().strip()
-        # Convert Hz to MHz
-        gpu_freq = int(gpu_freq_str) // 1000000
-    except Exception:
-        gpu_freq = 0
+        while True:
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+            ring.append(rec_scheduler.refresh(), time.time())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
 
-    return gpu_load, gpu_freq
+class ReplaySource:
+    """Feeds recorded samples to DashboardWidget and handles the scrubbing keys."""
 
+    STEP_KEYS = {"left": -1, "right": 1, "page up": -120, "page down": 120}
 
+    def __init__(self, ring):
+        self.ring = ring
+        self.position = 0
+        self.playing = True
 
-def get_npu_info():
-    try:
-        with open("/sys/kernel/debug/rknpu/load", "r") as f:
-            data = f.read()
-        percents = re.findall(r'(\d+)%', data)
-        if percents:
-            npu_load = " ".join([p + "%" for p in percents])
+    def __call__(self):
+        if not len(self.ring):
+            return dict(COLLECTOR_DEFAULTS), set(RECORDED_COLLECTORS)
+        return self.ring.read(self.position)[1], set()
+
+    def advance(self):
+        if self.playing and self.position < len(self.ring) - 1:
+            self.position += 1
+            return True
+        return False
+
+    def handle_key(self, key):
+        if key == " ":
+            self.playing = not self.playing
+        elif key in self.STEP_KEYS:
+            self.playing = False
+            self.position = max(0, min(len(self.ring) - 1, self.position + self.STEP_KEYS[key]))
+        elif key == "home":
+            self.position = 0
+        elif key == "end":
+            self.position = max(0, len(self.ring) - 1)
         else:
-            npu_load = "0% 0% 0%"
-    except Exception:
-        npu_load = "0% 0% 0%"
+            return False
+        return True
+
+    def footer(self):
+        if not len(self.ring):
+            return f"Replay {self.ring.path}: no samples. Press 'q' to exit."
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.ring.read(self.position)[0]))
+        state = "▶" if self.playing else "⏸"
+        return (f"Replay {timestamp} [{self.position + 1}/{len(self.ring)}] {state}  "
+                "←/→ step, PgUp/PgDn ±120, Home/End, space play/pause, 'q' exit.")
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_openmetrics(sample):
+    """Render a sample (collector name -> value) in the OpenMetrics text format."""
+    out = []
+
+    def family(name, help_text, samples):
+        if not samples:
+            return
+        out.append(f"# TYPE {name} gauge")
+        out.append(f"# HELP {name} {help_text}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            if labels:
+                label_text = ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items())
+                out.append(f"{name}{{{label_text}}} {value}")
+            else:
+                out.append(f"{name} {value}")
+
+    device_info, npu_version, uptime, docker_status = sample["device"]
+    family("myrktop_device_info", "Board compatible string and NPU driver version.",
+           [({"compatible": device_info, "npu_version": npu_version}, 1)])
+    family("myrktop_uptime_seconds", "System uptime.", [({}, uptime)])
+    family("myrktop_docker_active", "Whether the docker service is running.",
+           [({}, int(docker_status == "active"))])
+
+    cpu_loads, cpu_freqs, cpu_times = sample["cpu"]
+    family("myrktop_cpu_load_percent", "Per-core CPU load.",
+           [({"core": core}, load) for core, load in sorted(cpu_loads.items())])
+    family("myrktop_cpu_frequency_hertz", "Per-core CPU frequency.",
+           [({"core": core}, freq * 1000000) for core, freq in sorted(cpu_freqs.items())])
+    family("myrktop_cpu_time_percent", "Per-core share of CPU time by mode.",
+           [({"core": core, "mode": mode}, round(value, 2))
+            for core, times in sorted(cpu_times["cores"].items()) for mode, value in times.items()])
+    family("myrktop_cpu_cluster_time_percent", "Per-cluster share of CPU time by mode.",
+           [({"cluster": label, "mode": mode}, round(value, 2))
+            for label, _, times in cpu_times["clusters"] for mode, value in times.items()])
+
+    gpu_load, gpu_freq = sample["gpu"]
+    family("myrktop_gpu_load_percent", "GPU load.", [({}, gpu_load)])
+    family("myrktop_gpu_frequency_hertz", "GPU frequency.", [({}, gpu_freq * 1000000)])
+    npu_loads, npu_freq = sample["npu"]
+    family("myrktop_npu_load_percent", "Per-core NPU load.",
+           [({"core": core}, load) for core, load in enumerate(npu_loads)])
+    family("myrktop_npu_frequency_hertz", "NPU frequency.", [({}, npu_freq * 1000000)])
+    family("myrktop_rga_load_percent", "Per-core RGA load.",
+           [({"core": core}, load) for core, load in enumerate(sample["rga"])])
+
+    dvfs = sorted(sample.get("dvfs", {}).items())
+    family("myrktop_dvfs_time_in_state_percent", "Share of the last interval spent at each frequency.",
+           [({"domain": domain, "frequency_hertz": str(mhz * 1000000)}, round(share, 2))
+            for domain, value in dvfs for mhz, share in value[0]])
+    family("myrktop_dvfs_transitions_per_second", "Frequency transitions per second.",
+           [({"domain": domain}, round(value[1], 2)) for domain, value in dvfs])
+    for index, direction in ((2, "higher"), (3, "lower")):
+        family(f"myrktop_dvfs_transitions_{'up' if index == 2 else 'down'}_per_second",
+               f"Transitions to a {direction} frequency per second.",
+               [({"domain": domain}, round(value[index], 2)) for domain, value in dvfs if value[index] is not None])
+
+    ram_used, ram_total, swap_used, swap_total = sample["ram"]
+    family("myrktop_memory_used_bytes", "RAM in use (total minus available).",
+           [({}, None if ram_used is None else ram_used * 1024)])
+    family("myrktop_memory_total_bytes", "Total RAM.", [({}, None if ram_total is None else ram_total * 1024)])
+    family("myrktop_swap_used_bytes", "Swap in use.", [({}, None if swap_used is None else swap_used * 1024)])
+    family("myrktop_swap_total_bytes", "Total swap.", [({}, None if swap_total is None else swap_total * 1024)])
+
+    family("myrktop_plugin_value", "Metrics of sysfs collector plugins (VPU, RKVDEC, RKVENC, ISP, user plugins).",
+           [({"plugin": plugin, "metric": key.partition(".")[2]}, round(metric, 3))
+            for plugin, metrics in sorted(sample.get("plugins", {}).items())
+            for key, metric in MetricHistory.metrics("plugins", {plugin: metrics})])
+
+    cma_total, cma_free, _, _, exporters, devices, processes, rknpu = sample.get(
+        "dmabuf", COLLECTOR_DEFAULTS["dmabuf"])
+    family("myrktop_cma_total_bytes", "Contiguous memory allocator pool size.",
+           [({}, None if cma_total is None else cma_total * 1024)])
+    family("myrktop_cma_free_bytes", "Free memory in the contiguous memory allocator pool.",
+           [({}, None if cma_free is None else cma_free * 1024)])
+    family("myrktop_dmabuf_bytes", "DMA-buf memory by exporter.",
+           [({"exporter": exporter}, size) for exporter, (_, size) in sorted(exporters.items())])
+    family("myrktop_dmabuf_buffers", "DMA-buf buffers by exporter.",
+           [({"exporter": exporter}, n) for exporter, (n, _) in sorted(exporters.items())])
+    family("myrktop_dmabuf_attached_bytes", "DMA-buf memory attached to each device.",
+           [({"device": device}, size) for device, size in sorted(devices.items())])
+    family("myrktop_dmabuf_process_bytes", "DMA-buf memory held through file descriptors, largest processes.",
+           [({"pid": str(pid), "comm": comm}, size) for pid, comm, size, _ in processes])
+    if rknpu is not None:
+        family("myrktop_rknpu_memory_used_bytes", "RKNPU memory manager usage.", [({}, rknpu[0])])
+        family("myrktop_rknpu_memory_total_bytes", "RKNPU memory manager size.", [({}, rknpu[1])])
+
+    containers = sorted(sample.get("containers", {}).items())
+    family("myrktop_container_cpu_percent", "Container CPU use in percent of one core.",
+           [({"container": name}, round(stats[0], 2)) for name, stats in containers])
+    family("myrktop_container_memory_bytes", "Container memory use (memory.current).",
+           [({"container": name}, stats[1]) for name, stats in containers])
+    family("myrktop_container_memory_peak_bytes", "Container peak memory use (memory.peak).",
+           [({"container": name}, stats[2]) for name, stats in containers])
+    family("myrktop_container_pressure_percent", "Share of time some container task stalled on a resource.",
+           [({"container": name, "resource": resource}, round(stats[3 + index], 2))
+            for name, stats in containers for index, resource in enumerate(PSI_RESOURCES)
+            if stats[3 + index] is not None])
+    family("myrktop_container_read_bytes_per_second", "Container block I/O read rate.",
+           [({"container": name}, round(stats[6] * 1e6)) for name, stats in containers if stats[6] is not None])
+    family("myrktop_container_written_bytes_per_second", "Container block I/O write rate.",
+           [({"container": name}, round(stats[7] * 1e6)) for name, stats in containers if stats[7] is not None])
+
+    family("myrktop_temperature_celsius", "Sensor chip temperature.",
+           [({"sensor": name}, temp) for name, temp in sample["temps"]])
+
+    net = sorted(sample["net"].items())
+    family("myrktop_network_receive_bits_per_second", "Network receive rate.",
+           [({"interface": ifname}, round(rates[0] * 1e6)) for ifname, rates in net])
+    family("myrktop_network_transmit_bits_per_second", "Network transmit rate.",
+           [({"interface": ifname}, round(rates[1] * 1e6)) for ifname, rates in net])
+    for index, field, help_text in ((2, "receive_packets", "Packets received"),
+                                    (3, "transmit_packets", "Packets transmitted"),
+                                    (4, "receive_errors", "Receive errors"),
+                                    (5, "transmit_errors", "Transmit errors"),
+                                    (6, "receive_dropped", "Received packets dropped"),
+                                    (7, "transmit_dropped", "Transmitted packets dropped"),
+                                    (8, "receive_multicast", "Multicast packets received")):
+        family(f"myrktop_network_{field}_per_second", f"{help_text} per second.",
+               [({"interface": ifname}, round(rates[index], 2)) for ifname, rates in net if len(rates) > index])
+
+    disk_io = sorted(sample.get("diskio", {}).items())
+    for index, field, help_text, scale in ((0, "read_bytes_per_second", "Bytes read per second.", 1e6),
+                                           (1, "written_bytes_per_second", "Bytes written per second.", 1e6),
+                                           (2, "reads_per_second", "Read requests completed per second.", 1),
+                                           (3, "writes_per_second", "Write requests completed per second.", 1),
+                                           (4, "read_await_seconds", "Average time per completed read.", 1e-3),
+                                           (5, "write_await_seconds", "Average time per completed write.", 1e-3),
+                                           (6, "io_utilization_percent", "Share of time with I/O in flight.", 1)):
+        family(f"myrktop_disk_{field}", help_text,
+               [({"device": device}, round(rates[index] * scale, 6)) for device, rates in disk_io])
+
+    mounted = [entry for entry in sample["fstab"] if entry[1] is not None]
+    family("myrktop_filesystem_size_bytes", "Size of filesystems listed in /etc/fstab.",
+           [({"mountpoint": mp}, total) for _, mp, total, _, _ in mounted])
+    family("myrktop_filesystem_used_bytes", "Used space of filesystems listed in /etc/fstab.",
+           [({"mountpoint": mp}, used) for _, mp, _, used, _ in mounted])
+    family("myrktop_filesystem_avail_bytes", "Space available to users on filesystems listed in /etc/fstab.",
+           [({"mountpoint": mp}, free) for _, mp, _, _, free in mounted])
+
+    nvme_disks, usb_disks = sample["storage"]
+    disks = [("nvme", d) for d in nvme_disks] + [("usb", d) for d in usb_disks]
+    family("myrktop_disk_temperature_celsius", "Disk temperature from SMART.",
+           [({"device": d["dev"], "model": d["model"], "transport": tran}, d["temp"]) for tran, d in disks])
+    family("myrktop_disk_power_on_hours", "Disk power-on hours from SMART.",
+           [({"device": d["dev"], "model": d["model"], "transport": tran}, d["hours"]) for tran, d in disks])
+    family("myrktop_disk_percentage_used", "NVMe endurance used, as reported by the drive.",
+           [({"device": d["dev"], "model": d["model"]}, d["health"]) for d in nvme_disks])
+    out.append("# EOF")
+    return "\n".join(out) + "\n"
+
+# Collectors format_openmetrics() has no families for, which --serve skips
+EXPORTER_SKIPPED = ("procs", "freqlimits")
+
+class MetricsSampler:
+    """Samples the collectors on demand, but each at most once per minimum interval.
+
+    Scrapes are serialized on a lock, so any number of concurrent scrapers cost
+    the same sysfs/SMART load as one.
+    """
+
+    def __init__(self, min_interval, collectors=None):
+        self.min_interval = min_interval
+        tiers = {tier: max(interval, min_interval) for tier, interval in scheduler.tiers.items()}
+        self.scheduler = CollectorScheduler(collectors, tiers=tiers)
+        self.lock = threading.Lock()
+
+    def sample(self):
+        with self.lock:
+            return dict(self.scheduler.refresh())
+
+def run_exporter(port, bind, min_interval, alerts=None):
+    """Headless --serve loop: expose the collectors as OpenMetrics on /metrics."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    # Frequency caps are not exported, but the throttling alert rules need them
+    skipped = ("procs",) if alerts is not None else EXPORTER_SKIPPED
+    sampler = MetricsSampler(min_interval, {name: spec for name, spec in COLLECTORS.items() if name not in skipped})
+    if alerts is not None:
+        sampler.scheduler.listeners.append(alerts.feed)
+
+        # Alerts must not depend on someone scraping, so keep sampling in the background
+        def sample_forever():
+            while True:
+                sampler.sample()
+                time.sleep(min_interval)
+
+        threading.Thread(target=sample_forever, daemon=True).start()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split("?", 1)[0]
+            if path == "/metrics":
+                body = format_openmetrics(sampler.sample()).encode("utf-8")
+                content_type = OPENMETRICS_CONTENT_TYPE
+                status = 200
+            elif path == "/":
+                body = b'<html><body><a href="/metrics">Metrics</a></body></html>\n'
+                content_type = "text/html; charset=utf-8"
+                status = 200
+            else:
+                body = b"Not found\n"
+                content_type = "text/plain; charset=utf-8"
+                status = 404
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((bind, port), MetricsHandler)
+    server.daemon_threads = True
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     try:
-        with open("/sys/class/devfreq/fdab0000.npu/cur_freq", "r") as f:
-            npu_freq_str = f.read().strip()
-        npu_freq = int(npu_freq_str) // 1000000
-    except Exception:
-        npu_freq = 0
-    return npu_load, npu_freq
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def sample_to_json(sample, timestamp=None):
+    """Turn a sample into a self-describing dict for --once --json and --stream."""
+    out = {"timestamp": round(time.time() if timestamp is None else timestamp, 3)}
+    for name, value in sample.items():
+        if name == "device":
+            compatible, npu_version, uptime, docker = value
+            value = {"compatible": compatible, "npu_version": npu_version, "uptime_seconds": uptime,
+                     "docker": docker}
+        elif name == "cpu":
+            loads, freqs, times = value
+            value = {
+                "cores": {str(core): {"load": load, "freq_mhz": freqs.get(core), "times": times["cores"].get(core)}
+                          for core, load in sorted(loads.items())},
+                "clusters": [{"label": label, "cores": cores, "times": cluster_times}
+                             for label, cores, cluster_times in times["clusters"]],
+            }
+        elif name == "gpu":
+            value = {"load": value[0], "freq_mhz": value[1]}
+        elif name == "npu":
+            value = {"loads": list(value[0]), "freq_mhz": value[1]}
+        elif name == "rga":
+            value = {"loads": list(value)}
+        elif name == "freqlimits":
+            value = {domain: {"cur_mhz": cur, "max_mhz": cap, "hw_max_mhz": hw_max}
+                     for domain, (cur, cap, hw_max) in value.items()}
+        elif name == "dvfs":
+            value = {domain: {"time_in_state_percent": {str(mhz): share for mhz, share in states},
+                              "transitions_per_s": transitions, "up_per_s": up, "down_per_s": down,
+                              "source": source}
+                     for domain, (states, transitions, up, down, source) in value.items()}
+        elif name == "ram":
+            value = dict(zip(("ram_used_kib", "ram_total_kib", "swap_used_kib", "swap_total_kib"), value))
+        elif name == "procs":
+            top = sorted(value, key=lambda p: p[3], reverse=True)[:max(PROCESS_VIEW["rows"], 1)]
+            value = [dict(zip(("pid", "comm", "cmdline", "cpu_percent", "rss_kib", "container", "cgroup"), p))
+                     for p in top]
+        elif name == "containers":
+            value = {container: dict(zip(CONTAINER_FIELDS, stats)) for container, stats in value.items()}
+        elif name == "dmabuf":
+            cma_total, cma_free, count, total, exporters, devices, processes, rknpu = value
+            value = {
+                "cma_total_kib": cma_total, "cma_free_kib": cma_free, "buffers": count, "bytes": total,
+                "exporters": {exporter: {"buffers": n, "bytes": size} for exporter, (n, size) in exporters.items()},
+                "attached_bytes": devices,
+                "processes": [dict(zip(("pid", "comm", "bytes", "buffers"), p)) for p in processes],
+                "rknpu": None if rknpu is None else {"used_bytes": rknpu[0], "total_bytes": rknpu[1]},
+            }
+        elif name == "temps":
+            value = dict(value)
+        elif name == "net":
+            value = {ifname: dict(zip(NET_RATE_FIELDS, rates)) for ifname, rates in value.items()}
+        elif name == "diskio":
+            value = {device: dict(zip(DISK_RATE_FIELDS, rates)) for device, rates in value.items()}
+        elif name == "fstab":
+            value = [dict(zip(("device", "mountpoint", "size_bytes", "used_bytes", "avail_bytes"), entry))
+                     for entry in value]
+        elif name == "storage":
+            value = {"nvme": value[0], "usb": value[1]}
+        # Full precision: consumers compute with these, unlike the --agent wire format
+        out[name] = compact_value(value, digits=None)
+    return out
 
-def get_rga_info():
+# Collectors --once leaves out unless --full: SMART queries and the /proc and
+# cgroup walks cost more than all the others together
+ONCE_SKIPPED = ("storage", "procs", "containers", "dmabuf")
+
+def run_once(as_json, full=False):
+    """--once: print one primed sample, as JSON or as the dashboard text, and exit."""
+    skip = () if full else ONCE_SKIPPED
+    sample = scheduler.prime(skip=skip)
+    if as_json:
+        import json
+        # Failed collectors are left out rather than reported with their defaults
+        sample = {name: value for name, value in sample.items() if name in scheduler.last_success}
+        json.dump(sample_to_json(sample), sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+        return
+    sample = {name: value for name, value in sample.items() if name not in skip}
+    for line in build_dashboard(sample):
+        markup = line if isinstance(line, list) else [line]
+        print("".join(text for _, text in markup))
+
+def run_stream(interval, alerts=None):
+    """--stream ndjson: print one JSON sample per line every `interval` seconds."""
+    import json
+    # Fast collectors must be due on every line, or lines would repeat values
+    scheduler.tiers["fast"] = min(scheduler.tiers["fast"], interval)
+    if alerts is not None:
+        scheduler.listeners.append(alerts.feed)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    sample = scheduler.prime()
+    next_tick = time.monotonic()
     try:
-        with open("/sys/kernel/debug/rkrga/load", "r") as f:
-            data = f.read()
-        rga_values = re.findall(r'load = (\d+)%', data)
-        if rga_values:
-            rga_values = " ".join([v + "%" for v in rga_values[:3]])
-        else:
-            rga_values = "0% 0% 0%"
-    except Exception:
-        rga_values = "0% 0% 0%"
-    return rga_values
-
-def get_ram_swap_info():
-    try:
-        free_output = subprocess.check_output("free -h", shell=True).decode("utf-8")
-        lines = free_output.splitlines()
-        ram_line = next((l for l in lines if l.startswith("Mem:")), None)
-        swap_line = next((l for l in lines if l.startswith("Swap:")), None)
-        if ram_line:
-            parts = ram_line.split()
-            ram_total = parts[1]
-            ram_used = parts[2]
-        else:
-            ram_total = ram_used = "N/A"
-        if swap_line:
-            parts = swap_line.split()
-            swap_total = parts[1]
-            swap_used = parts[2]
-        else:
-            swap_total = swap_used = "N/A"
-    except Exception:
-        ram_used, ram_total, swap_used, swap_total = "N/A", "N/A", "N/A", "N/A"
-    return ram_used, ram_total, swap_used, swap_total
+        while True:
+            sys.stdout.write(json.dumps(sample_to_json(sample), separators=(",", ":"), ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+            sample = scheduler.refresh()
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+
+AGENT_PORT = 9102
+AGENT_PROTOCOL = 1
+# An agent drops deltas for a viewer whose unsent output exceeds this and
+# sends it a full sample once it has caught up
+AGENT_MAX_BACKLOG = 1 << 20
+# Messages are single JSON lines; a full sample is well below this
+AGENT_LINE_LIMIT = 1 << 22
+
+def compact_value(value, digits=1):
+    """Make a collector value JSON-ready: tuples become lists, floats are rounded to `digits` decimals.
 
-def get_temperatures():
+    digits=None keeps floats as they are.
     """
-    Process the output of 'sensors' so that any line containing keywords like "thermal",
-    "nvme" or "gpu" sets the sensor name, and any subsequent line containing "temp1:" or "Composite:" 
-    uses that sensor name when displaying the reading. The numeric temperature is extracted
-    using a substring approach similar to your original AWK code.
+    if isinstance(value, float):
+        return value if digits is None else round(value, digits)
+    if isinstance(value, (list, tuple)):
+        return [compact_value(v, digits) for v in value]
+    if isinstance(value, dict):
+        return {k: compact_value(v, digits) for k, v in value.items()}
+    return value
+
+def encode_sample(sample):
+    """Collector values as sent by --agent; the process list is cut to its top rows."""
+    encoded = {}
+    for name, value in sample.items():
+        if name == "procs":
+            rows = max(PROCESS_VIEW["rows"], 1)
+            top = set()
+            for index in (3, 4):
+                top.update(p[0] for p in sorted(value, key=lambda p: p[index], reverse=True)[:rows])
+            value = [p for p in value if p[0] in top]
+        encoded[name] = compact_value(value)
+    # JSON turns the integer core numbers into strings, so compare the wire form
+    import json
+    return {name: json.loads(json.dumps(value)) for name, value in encoded.items()}
+
+def decode_sample(values):
+    """Undo the JSON key conversion of encode_sample() where the dashboard needs ints."""
+    cpu = values.get("cpu")
+    if cpu is not None:
+        loads, freqs, times = cpu
+        values["cpu"] = (
+            {int(core): load for core, load in loads.items()},
+            {int(core): freq for core, freq in freqs.items()},
+            {"cores": {int(core): t for core, t in times["cores"].items()}, "clusters": times["clusters"]},
+        )
+    return values
+
+class AgentClient:
+    """One connected viewer and the values it has already been sent."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.sent = None
+
+    def send(self, encoded, stale, ts):
+        import json
+        if self.writer.transport.get_write_buffer_size() > AGENT_MAX_BACKLOG:
+            # The viewer is not keeping up; resync with a full sample later
+            self.sent = None
+            return
+        full = self.sent is None
+        if full:
+            changed = encoded
+        else:
+            changed = {name: value for name, value in encoded.items() if self.sent.get(name) != value}
+        self.sent = encoded
+        message = {"t": round(ts, 3), "d": changed, "s": sorted(stale)}
+        if full:
+            message["full"] = True
+        self.writer.write(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+
+def run_agent(port, bind, interval, workers, alerts=None):
+    """Headless --agent loop: stream delta-encoded samples to every connected --fleet viewer.
+
+    Collectors are polled once per tick no matter how many viewers there are,
+    and not at all while nobody is connected (unless alerts are evaluated). Each message carries only the
+    collectors whose value changed since that viewer's previous message.
     """
-    try:
-        output = subprocess.check_output("sensors", shell=True, stderr=subprocess.DEVNULL).decode("utf-8")
-        lines = output.splitlines()
-        temp_items = []
-        current_name = None
-        for line in lines:
-            # If the line doesn't contain a colon and has only one field, assume it's a sensor name
-            if ":" not in line and len(line.split()) == 1:
-                current_name = line.strip()
-                continue
-            # If the line starts with "temp1:" or "Composite:" then process it
-            if line.startswith("temp1:") or line.startswith("Composite:"):
-                fields = line.split()
-                if len(fields) < 2:
-                    continue
-                raw_temp = fields[1]  # e.g., "+34.2°C"
-                if len(raw_temp) >= 5:
-                    # Extract substring from index 1 to len(raw_temp)-4 (mimics AWK's substr($2,2,length($2)-5))
-                    temp_str = raw_temp[1:len(raw_temp)-4]
-                    try:
-                        temp_val = int(float(temp_str))
-                    except Exception:
-                        temp_val = 0
-                    if temp_val >= 70:
-                        attr = 'temp_red'
-                    elif temp_val >= 60:
-                        attr = 'temp_yellow'
-                    else:
-                        attr = 'temp_green'
-                    sensor_name = current_name if current_name is not None else fields[0]
-                    formatted = f"{sensor_name:<30} {temp_val:2d}°C"
-                    temp_items.append((attr, formatted))
-                else:
-                    temp_items.append(("default", line))
-            else:
+    import asyncio
+    import json
+    import socket
+
+    hello = json.dumps({"host": socket.gethostname(), "protocol": AGENT_PROTOCOL}).encode() + b"\n"
+
+    async def serve():
+        clients = set()
+        # SIGTERM (systemd stop) ends the loop below and closes the server
+        # instead of unwinding through asyncio.run with a traceback
+        stop = asyncio.Event()
+        handlers = set()
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+        async def handle(reader, writer):
+            client = AgentClient(writer)
+            clients.add(client)
+            handlers.add(asyncio.current_task())
+            writer.write(hello)
+            try:
+                # Viewers never send anything; this returns when they disconnect
+                await reader.read()
+            except ConnectionError:
                 pass
-        if not temp_items:
-            temp_items = [("default", "No temperature data.")]
-    except Exception:
-        temp_items = [("default", "No temperature data.")]
-    return temp_items
+            finally:
+                clients.discard(client)
+                handlers.discard(asyncio.current_task())
+                writer.close()
 
-def get_network_traffic():
-    global prev_stats, prev_net_time
-    
-    # Khởi tạo cấu trúc lưu trữ
-    current_stats = {}
-    try:
-        with open("/proc/net/dev", "r") as f:
-            lines = f.readlines()
-        
-        # Tìm tất cả interface eth0 và enP*
-        interfaces = []
-        for line in lines:
-            if ":" in line:
-                ifname = line.split(":")[0].strip()
-                if ifname == "eth0" or ifname.startswith("enP"):
-                    interfaces.append(ifname)
-        
-        # Lấy thông số cho từng interface
-        for ifname in interfaces:
-            line = next((l for l in lines if f"{ifname}:" in l), None)
-            if line:
-                parts = line.split()
-                rx = int(parts[1])
-                tx = int(parts[9])
-                current_stats[ifname] = {'rx': rx, 'tx': tx}
-                
-    except Exception:
-        pass  # Xử lý lỗi nếu cần
-    
-    current_time = time.time()
-    
-    # Khởi tạo kết quả trả về
-    results = {}
-    
-    if prev_net_time is None:
-        # Lần đầu chạy, chỉ lưu giá trị hiện tại
-        prev_stats = current_stats
-        prev_net_time = current_time
-        for ifname in current_stats:
-            results[ifname] = (0.0, 0.0)  # Down 0, Up 0
-    else:
-        # Tính toán tốc độ
-        dt = current_time - prev_net_time
-        if dt > 0:
-            # Tính cho các interface hiện có
-            for ifname in current_stats:
-                if ifname in prev_stats:
-                    rx_rate = (current_stats[ifname]['rx'] - prev_stats[ifname]['rx']) * 8 / (1e6 * dt)
-                    tx_rate = (current_stats[ifname]['tx'] - prev_stats[ifname]['tx']) * 8 / (1e6 * dt)
-                else:
-                    rx_rate = tx_rate = 0.0
-                results[ifname] = (rx_rate, tx_rate)
-            
-            # Cập nhật giá trị cũ
-            prev_stats = current_stats
-            prev_net_time = current_time
-    
-    return results
-
-def get_fstab_disk_usage():
-    mountpoints = []
-    try:
-        with open("/etc/fstab", "r") as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith("#"):
+        server = await asyncio.start_server(handle, bind, port)
+        if alerts is not None:
+            scheduler.listeners.append(alerts.feed)
+        scheduler.start(workers=workers)
+        next_tick = time.monotonic()
+        async with server:
+            while True:
+                next_tick += interval
+                try:
+                    await asyncio.wait_for(stop.wait(), max(0.0, next_tick - time.monotonic()))
+                    break
+                except asyncio.TimeoutError:
+                    pass
+                if not clients and alerts is None:
                     continue
-                fields = line.split()
-                if len(fields) < 2:
-                    continue
-                mount = fields[1]
-                if mount not in mountpoints:
-                    mountpoints.append(mount)
-    except Exception:
-        mountpoints = []
-    usage_lines = []
-    header = f"{'Mount Point':<20} {'Total':>8} {'Used':>8} {'Free':>8}"
-    usage_lines.append(header)
-    for m in mountpoints:
-        try:
-            df_output = subprocess.check_output(f"df -h {m}", shell=True, stderr=subprocess.DEVNULL).decode("utf-8")
-            df_lines = df_output.splitlines()
-            if len(df_lines) >= 2:
-                parts = df_lines[1].split()
-                if len(parts) >= 6:
-                    mp = parts[5]
-                    total = parts[1]
-                    used = parts[2]
-                    free = parts[3]
-                    line_usage = f"{mp:<20} {total:>8} {used:>8} {free:>8}"
-                    usage_lines.append(line_usage)
-                else:
-                    usage_lines.append(f"{m}: No info")
-        except Exception:
-            usage_lines.append(f"{m}: No info")
-    if not usage_lines:
-        usage_lines = ["No disk usage info from /etc/fstab."]
-    return usage_lines
+                scheduler.poll()
+                sample, stale = scheduler.snapshot()
+                encoded = encode_sample(sample)
+                now = time.time()
+                for client in list(clients):
+                    client.send(encoded, stale, now)
+            # Disconnect viewers and let their handlers return, rather than
+            # having asyncio.run cancel them
+            for client in list(clients):
+                client.writer.close()
+            await asyncio.gather(*handlers, return_exceptions=True)
 
-def get_storage_info():
-    nvme_devices = []
-    usb_devices = []
-    try:
-        lsblk_output = subprocess.check_output("lsblk -dno NAME,TYPE", shell=True).decode("utf-8")
-        for line in lsblk_output.splitlines():
-            parts = line.split()
-            if len(parts) >= 2:
-                name, typ = parts[0], parts[1]
-                if typ == "disk" and name.startswith("nvme"):
-                    nvme_devices.append(name)
-    except Exception:
-        pass
     try:
-        lsblk_usb = subprocess.check_output("lsblk -dno NAME,TRAN", shell=True).decode("utf-8")
-        for line in lsblk_usb.splitlines():
-            parts = line.split()
-            if len(parts) >= 2:
-                name, tran = parts[0], parts[1]
-                if tran == "usb":
-                    usb_devices.append(name)
-    except Exception:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
         pass
 
-    nvme_info = []
-    for dev in nvme_devices:
-        try:
-            model = subprocess.check_output(
-                f"nvme id-ctrl /dev/{dev} | grep 'Model Number'", shell=True, stderr=subprocess.DEVNULL
-            ).decode("utf-8").split(":")[1].strip()
-        except Exception:
-            model = "Unknown"
-        try:
-            health = subprocess.check_output(
-                f"nvme smart-log /dev/{dev} | grep 'percentage_used'", shell=True, stderr=subprocess.DEVNULL
-            ).decode("utf-8").split()[2].replace("%", "").strip()
-        except Exception:
-            health = "0"
-        try:
-            temp = subprocess.check_output(
-                f"nvme smart-log /dev/{dev} | grep 'temperature'", shell=True, stderr=subprocess.DEVNULL
-            ).decode("utf-8").split()[2].strip()
-        except Exception:
-            temp = "N/A"
-        try:
-            power_hours = subprocess.check_output(
-                f"nvme smart-log /dev/{dev} | grep 'power_on_hours'", shell=True, stderr=subprocess.DEVNULL
-            ).decode("utf-8").split()[2].strip()
-        except Exception:
-            power_hours = "N/A"
-        nvme_info.append(f"{dev} - {model} | Temp: {temp}°C | Hours: {power_hours}")
-    
-    usb_info = []
-    for dev in usb_devices:
-        try:
-            model = subprocess.check_output(
-                f"lsblk -dno MODEL /dev/{dev}", shell=True, stderr=subprocess.DEVNULL
-            ).decode("utf-8").strip()
-        except Exception:
-            model = "Unknown"
-        try:
-            health_out = subprocess.check_output(
-                f"smartctl -H /dev/{dev}", shell=True, stderr=subprocess.DEVNULL
-            ).decode("utf-8")
-            health_match = re.search(r':\s*(\S+)', health_out)
-            health = health_match.group(1) if health_match else "Unknown"
-        except Exception:
-            health = "Unknown"
-        try:
-            temp_out = subprocess.check_output(
-                f"smartctl -A /dev/{dev} | grep 'Temperature_Celsius'", shell=True, stderr=subprocess.DEVNULL
-            ).decode("utf-8").split()[9]
-            temp = temp_out
-        except Exception:
-            temp = "N/A"
-        try:
-            power_hours_out = subprocess.check_output(
-                f"smartctl -A /dev/{dev} | grep 'Power_On_Hours'", shell=True, stderr=subprocess.DEVNULL
-            ).decode("utf-8").split()[9]
-            power_hours = power_hours_out
-        except Exception:
-            power_hours = "N/A"
-        usb_info.append(f"{dev} - {model} | Temp: {temp}°C | Hours: {power_hours}")
-    return nvme_info, usb_info
+class FleetBoard:
+    """Connection to one --agent and the latest sample it reported.
+
+    run() is a coroutine that reconnects with exponential backoff, so a
+    viewer follows any number of boards from a single event loop thread.
+    """
+
+    def __init__(self, address, stale_after=2.0):
+        host, sep, port = address.rpartition(":")
+        if not sep or ":" in host:
+            host, port = address, ""
+        self.host = host
+        self.port = int(port) if port else AGENT_PORT
+        self.name = address
+        # Host name the agent reports about itself
+        self.hostname = None
+        self.values = {}
+        self.stale = set()
+        self.connected = False
+        self.error = "connecting"
+        self.last_message = None
+        self.stale_after = stale_after
+        # Set whenever the summary row may have changed
+        self.updated = False
+
+    async def run(self):
+        import asyncio
+        import json
+        backoff = 1.0
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, limit=AGENT_LINE_LIMIT), 10)
+            except (OSError, asyncio.TimeoutError) as e:
+                self.error = getattr(e, "strerror", None) or "timeout"
+                self.updated = True
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            try:
+                hello = json.loads(await reader.readline())
+                self.hostname = hello.get("host")
+                self.connected = True
+                self.error = None
+                backoff = 1.0
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    message = json.loads(line)
+                    values = decode_sample(message["d"])
+                    if message.get("full"):
+                        self.values = values
+                    else:
+                        self.values.update(values)
+                    self.stale = set(message["s"])
+                    self.last_message = time.monotonic()
+                    self.updated = True
+            except (OSError, ValueError, KeyError, asyncio.LimitOverrunError) as e:
+                self.error = str(e) or type(e).__name__
+            finally:
+                writer.close()
+            if self.connected:
+                self.connected = False
+                self.error = self.error or "disconnected"
+            self.updated = True
+            await asyncio.sleep(backoff)
+
+    def is_stale(self):
+        return (not self.connected or self.last_message is None
+                or time.monotonic() - self.last_message > self.stale_after)
+
+    def snapshot(self):
+        """DashboardWidget source for the drill-down view."""
+        sample = dict(COLLECTOR_DEFAULTS)
+        sample.update(self.values)
+        if self.is_stale():
+            return sample, set(COLLECTORS)
+        return sample, self.stale
+
+def fleet_summary(board):
+    """Return (attr, summary row text) for one board of the fleet table."""
+    if not board.values:
+        return "bad", f"{board.name:<20} {board.error or 'waiting'}"
+    sample = board.values
+    cpu_loads = sample.get("cpu", COLLECTOR_DEFAULTS["cpu"])[0]
+    cpu_avg = sum(cpu_loads.values()) / len(cpu_loads) if cpu_loads else 0
+    cpu_max = max(cpu_loads.values(), default=0)
+    gpu_load = sample.get("gpu", COLLECTOR_DEFAULTS["gpu"])[0]
+    npu_loads = sample.get("npu", COLLECTOR_DEFAULTS["npu"])[0]
+    npu_avg = sum(npu_loads) / len(npu_loads) if npu_loads else 0
+    temps = sample.get("temps", [])
+    hottest = max((temp for _, temp in temps), default=None)
+    net = sample.get("net", {})
+    rx = sum(rates[0] for rates in net.values())
+    tx = sum(rates[1] for rates in net.values())
+    hot_text = f"{hottest:4.0f}°C" if hottest is not None else "   N/A"
+    text = (f"{board.name:<20} {cpu_avg:4.0f}% {cpu_max:4.0f}% {gpu_load:4.0f}% {npu_avg:4.0f}% "
+            f"{hot_text} {rx:9.2f} {tx:9.2f}")
+    if board.is_stale():
+        return "bad", text + "  (stale)"
+    attrs = {level_attr("load", max(cpu_max, gpu_load, npu_avg)), level_attr("temp", hottest or 0)}
+    for attr in ("temp_red", "temp_yellow"):
+        if attr in attrs:
+            return attr, text
+    return "default", text
+
+FLEET_HEADER = f"{'Board':<20} {'CPU':>5} {'max':>5} {'GPU':>5} {'NPU':>5} {'Hot':>6} {'Rx Mbps':>9} {'Tx Mbps':>9}"
+
+STALE_MARK = ("bad", " (stale)")
+
+def mark_stale(item, is_stale):
+    """Append a stale marker to a dashboard line (plain tuple or markup list)."""
+    if not is_stale:
+        return item
+    if isinstance(item, list):
+        return item + [STALE_MARK]
+    return [item, STALE_MARK]
+
+def cpu_times_markup(label, times):
+    iowait = times["iowait"]
+    iow_attr = level_attr("iowait", iowait)
+    return [
+        ("default", f"{label:<14} usr {times['user']:3.0f}% sys {times['system']:3.0f}% "),
+        (iow_attr, f"iow {iowait:3.0f}%"),
+        ("default", f" irq {times['irq']:3.0f}% sirq {times['softirq']:3.0f}% st {times['steal']:3.0f}%"),
+    ]
+
+def build_sections(sample=None, stale=(), footer=None, history=None, profiler=None, alerts=None, stats=None):
+    """Build the dashboard as [(section key, [lines])] so a renderer can key rows by section.
 
-def build_dashboard():
+    With a MetricHistory, panels also get sparklines with min/avg/max over its window.
+    A visible Profiler adds its timing panel above the footer, an AlertEngine
+    its status line below the title. WindowedStats adds its panel when visible
+    and can base the load colours on a windowed statistic.
+    """
+    if sample is None:
+        sample = scheduler.refresh()
     lines = []
+    sections = []
     sep = "─" * 50
 
+    def section(key):
+        sections.append((key, len(lines)))
+
+    def load_attr(key, value):
+        if stats is not None:
+            value = stats.color_value(key, value)
+        return level_attr("load", value)
+
+    def loads_markup(prefix, loads):
+        # One colour per core, so an idle core next to a busy one is visible
+        if not loads:
+            return [("default", format_loads(loads))]
+        markup = []
+        for core, load in enumerate(loads):
+            markup.append((load_attr(f"{prefix}.{core}", load), f"{load}%"))
+            markup.append(("default", " "))
+        return markup[:-1]
+
+    def add_history(key, label, **kwargs):
+        if history is not None:
+            line = history.line(key, label, **kwargs)
+            if line is not None:
+                lines.append(line)
+
     # Header
+    section("header")
     lines.append(("header", sep))
     title = "🔥 System Monitor"
     lines.append(("header", title))
+    if alerts is not None:
+        lines.append(alerts.status_line())
     lines.append(("header", sep))
 
     # Device Info
-    device_info, npu_version, uptime, docker_status = get_device_info()
-    lines.append(("default", f"Device: {device_info}"))
+    section("device")
+    device_info, npu_version, uptime, docker_status = format_device_info(sample["device"])
+    lines.append(mark_stale(("default", f"Device: {device_info}"), "device" in stale))
     lines.append(("default", f"NPU Version: {npu_version}"))
     lines.append(("default", f"System Uptime: {uptime}"))
     if docker_status == "active":
@@ -417,23 +3910,14 @@ def build_dashboard():
     lines.append(("header", sep))
 
     # CPU Info - build as markup list for colored load percentages and green bold frequencies
-    cpu_loads, cpu_freqs = get_cpu_info()
-    lines.append(("title", "📊 CPU Usage & Frequency:"))
+    section("cpu")
+    cpu_loads, cpu_freqs, cpu_times = sample["cpu"]
+    lines.append(mark_stale(("title", "📊 CPU Usage & Frequency:"), "cpu" in stale))
     cores = sorted(cpu_loads.keys())
     for i in range(0, len(cores), 2):
         if i+1 < len(cores):
-            if cpu_loads[cores[i]] >= 80:
-                attr1 = 'temp_red'
-            elif cpu_loads[cores[i]] >= 60:
-                attr1 = 'temp_yellow'
-            else:
-                attr1 = 'default'
-            if cpu_loads[cores[i+1]] >= 80:
-                attr2 = 'temp_red'
-            elif cpu_loads[cores[i+1]] >= 60:
-                attr2 = 'temp_yellow'
-            else:
-                attr2 = 'default'
+            attr1 = load_attr(f"cpu.{cores[i]}", cpu_loads[cores[i]])
+            attr2 = load_attr(f"cpu.{cores[i+1]}", cpu_loads[cores[i+1]])
             markup = [
                 ("default", f"Core {cores[i]}: "),
                 (attr1, f"{cpu_loads[cores[i]]:3d}%"),
@@ -446,12 +3930,7 @@ def build_dashboard():
             ]
             lines.append(markup)
         else:
-            if cpu_loads[cores[i]] >= 70:
-                attr1 = 'temp_red'
-            elif cpu_loads[cores[i]] >= 60:
-                attr1 = 'temp_yellow'
-            else:
-                attr1 = 'default'
+            attr1 = load_attr(f"cpu.{cores[i]}", cpu_loads[cores[i]])
             markup = [
                 ("default", f"Core {cores[i]}: "),
                 (attr1, f"{cpu_loads[cores[i]]:3d}%"),
@@ -459,112 +3938,267 @@ def build_dashboard():
                 ("freq", f"{cpu_freqs[cores[i]]:4d}MHz")
             ]
             lines.append(markup)
+
+    for core in cores:
+        add_history(f"cpu.{core}", f"Core {core}")
+
+    # CPU time breakdown per cluster and per core
+    if cpu_times["clusters"]:
+        lines.append(("title", "⏱️  CPU Time Breakdown:"))
+        for label, _, times in cpu_times["clusters"]:
+            lines.append(cpu_times_markup(label, times))
+        for core, times in sorted(cpu_times["cores"].items()):
+            lines.append(cpu_times_markup(f"Core {core}", times))
     lines.append(("header", sep))
 
     # GPU Info - apply same rules to GPU load and frequency
-    gpu_load, gpu_freq = get_gpu_info()
-    if gpu_load >= 80:
-        gpu_attr = 'temp_red'
-    elif gpu_load >= 60:
-        gpu_attr = 'temp_yellow'
-    else:
-        gpu_attr = 'default'
+    section("gpu")
+    gpu_load, gpu_freq = sample["gpu"]
+    gpu_attr = load_attr("gpu", gpu_load)
     gpu_markup = [
         ("title", "🎮 GPU Load: "),
         (gpu_attr, f"{gpu_load:3d}%"),
         ("default", "   "),
         ("freq", f"{gpu_freq:4d} MHz")
     ]
-    lines.append(gpu_markup)
+    lines.append(mark_stale(gpu_markup, "gpu" in stale))
+    add_history("gpu", "GPU")
     lines.append(("header", sep))
 
     # NPU Info - apply same rules to NPU load and frequency
-    npu_load, npu_freq = get_npu_info()
-    try:
-        npu_numeric = int(re.search(r'(\d+)%', npu_load).group(1))
-    except Exception:
-        npu_numeric = 0
-    if npu_numeric >= 80:
-        npu_attr = 'temp_red'
-    elif npu_numeric >= 60:
-        npu_attr = 'temp_yellow'
-    else:
-        npu_attr = 'default'
-    npu_markup = [
-        ("title", "🧠 NPU Load: "),
-        (npu_attr, f"{npu_load}"),
+    section("npu")
+    npu_loads, npu_freq = sample["npu"]
+    npu_markup = [("title", "🧠 NPU Load: ")] + loads_markup("npu", npu_loads) + [
         ("default", "   "),
         ("freq", f"{npu_freq:4d} MHz")
     ]
-    lines.append(npu_markup)
+    lines.append(mark_stale(npu_markup, "npu" in stale))
+    for core in range(len(npu_loads)):
+        add_history(f"npu.{core}", f"NPU core {core}")
     lines.append(("header", sep))
 
     # RGA Info - apply same rules for load (no frequency available)
-    rga_info = get_rga_info()
-    try:
-        rga_numeric = int(re.search(r'(\d+)%', rga_info).group(1))
-    except Exception:
-        rga_numeric = 0
-    if rga_numeric >= 80:
-        rga_attr = 'temp_red'
-    elif rga_numeric >= 60:
-        rga_attr = 'temp_yellow'
-    else:
-        rga_attr = 'default'
-    rga_markup = [
-        ("title", "🖼️  RGA Load: "),
-        (rga_attr, f"{rga_info}")
-    ]
-    lines.append(rga_markup)
+    section("rga")
+    rga_loads = sample["rga"]
+    rga_markup = [("title", "🖼️  RGA Load: ")] + loads_markup("rga", rga_loads)
+    lines.append(mark_stale(rga_markup, "rga" in stale))
+    for core in range(len(rga_loads)):
+        add_history(f"rga.{core}", f"RGA core {core}")
     lines.append(("header", sep))
 
+    # Plugin blocks: video codecs, ISP and user plugins
+    plugins = sample.get("plugins")
+    if plugins:
+        section("plugins")
+        lines.append(mark_stale(("title", "🎬 Multimedia & Plugins:"), "plugins" in stale))
+        titles = plugin_plan.titles()
+        units = plugin_plan.units()
+        for plugin, metrics in plugins.items():
+            markup = [("default", f"{titles.get(plugin, plugin)[:10]:<10}")]
+            for metric, value in metrics.items():
+                unit = units.get((plugin, metric), "")
+                markup.append(("default", f"  {metric}"))
+                for index, item in enumerate(value if isinstance(value, list) else [value]):
+                    key = f"{plugin}.{metric}.{index}" if isinstance(value, list) else f"{plugin}.{metric}"
+                    attr = load_attr(key, item) if unit == "%" else "default"
+                    markup.append(("default", " "))
+                    markup.append((attr, f"{item:.0f}{unit}"))
+            lines.append(markup)
+        lines.append(("header", sep))
+
+    # DVFS residency and transitions
+    dvfs = sample.get("dvfs")
+    if dvfs:
+        section("dvfs")
+        lines.append(mark_stale(("title", "🎚️  DVFS (time in state per OPP, low to high):"), "dvfs" in stale))
+        for domain, (states, transitions, up, down, source) in dvfs.items():
+            if not states:
+                continue
+            spark = sparkline([share for _, share in states], len(states), 0.0, 100.0)
+            avg = sum(mhz * share for mhz, share in states) / 100
+            top_mhz, top_share = max(states, key=lambda state: state[1])
+            direction = f" (↑{up:.1f} ↓{down:.1f})" if up is not None and down is not None else ""
+            lines.append([
+                ("default", f"{domain:<6} "),
+                ("freq", spark),
+                ("default", f" {states[0][0]}-{states[-1][0]}MHz avg {avg:4.0f}MHz "
+                            f"most {top_mhz}MHz {top_share:3.0f}% | {transitions:5.1f} trans/s{direction}"
+                            f"{' (sampled)' if source == 'sampled' else ''}"),
+            ])
+        lines.append(("header", sep))
+
     # RAM & Swap Info
-    ram_used, ram_total, swap_used, swap_total = get_ram_swap_info()
-    lines.append(("title", "🖥️  RAM & Swap Usage:"))
+    section("ram")
+    ram_used, ram_total, swap_used, swap_total = format_memory(sample["ram"])
+    lines.append(mark_stale(("title", "🖥️  RAM & Swap Usage:"), "ram" in stale))
     lines.append(("default", f"RAM Used: {ram_used} / {ram_total}"))
     lines.append(("default", f"Swap Used: {swap_used} / {swap_total}"))
     lines.append(("header", sep))
 
+    # CMA and DMA-buf
+    dmabuf = sample.get("dmabuf")
+    if dmabuf and (dmabuf[0] or dmabuf[2] is not None or dmabuf[7] is not None):
+        section("dmabuf")
+        cma_total, cma_free, count, total, exporters, devices, dmabuf_procs, rknpu = dmabuf
+        lines.append(mark_stale(("title", "🧩 CMA & DMA-buf:"), "dmabuf" in stale))
+        if cma_total:
+            cma_used = cma_total - cma_free
+            lines.append([
+                ("default", "CMA Used: "),
+                (level_attr("load", cma_used * 100 / cma_total),
+                 f"{format_size_binary(cma_used)} / {format_size_binary(cma_total)}"),
+            ])
+        if rknpu is not None and rknpu[1]:
+            lines.append([
+                ("default", "RKNPU Memory: "),
+                (level_attr("load", rknpu[0] * 100 / rknpu[1]),
+                 f"{format_size_binary(rknpu[0] // 1024)} / {format_size_binary(rknpu[1] // 1024)}"),
+            ])
+        if total is not None:
+            lines.append(("default", f"DMA-buf: {format_size_binary(total // 1024)} in {count} buffers"))
+            rows = max(DMABUF_VIEW["rows"], 1)
+            for exporter, (n, size) in sorted(exporters.items(), key=lambda item: item[1][1], reverse=True)[:rows]:
+                lines.append(("default", f"  exporter {exporter[:24]:<24} {format_size_binary(size // 1024):>7} "
+                                         f"{n:6d} bufs"))
+            for device, size in sorted(devices.items(), key=lambda item: item[1], reverse=True)[:rows]:
+                lines.append(("default", f"  attached {device[:24]:<24} {format_size_binary(size // 1024):>7}"))
+            for pid, comm, size, n in dmabuf_procs:
+                lines.append(("default", f"  {pid:>7} {comm[:15]:<15}   {format_size_binary(size // 1024):>7} "
+                                         f"{n:6d} bufs"))
+        lines.append(("header", sep))
+
+    # Processes
+    processes = sample.get("procs")
+    if processes and PROCESS_VIEW["rows"] > 0:
+        section("procs")
+        header, proc_lines = format_processes(processes, PROCESS_VIEW["sort"], PROCESS_VIEW["filter"],
+                                              PROCESS_VIEW["rows"])
+        title = f"⚙️  Processes (by {PROCESS_VIEW['sort'].upper()}, {len(processes)} total"
+        if PROCESS_VIEW["filter"]:
+            title += f", matching {PROCESS_VIEW['filter']}"
+        lines.append(mark_stale(("title", title + "):"), "procs" in stale))
+        lines.append(("default", header))
+        for cpu, text in proc_lines:
+            lines.append((level_attr("load", cpu), text))
+        lines.append(("header", sep))
+
+    # Containers
+    containers = sample.get("containers")
+    if containers and CONTAINER_VIEW["rows"] > 0:
+        section("containers")
+        lines.append(mark_stale(("title", f"🐳 Containers (by CPU, {len(containers)} total):"), "containers" in stale))
+        lines.append(("default", f"{'CONTAINER':<20} {'CPU%':>6} {'MEM':>7} {'PEAK':>7} "
+                                 f"{'PSI cpu':>7} {'mem':>5} {'io':>5} {'Read MB/s':>9} {'Write MB/s':>10}"))
+        top = sorted(containers.items(), key=lambda item: item[1][0], reverse=True)[:CONTAINER_VIEW["rows"]]
+        for name, (cpu, memory, peak, psi_cpu, psi_memory, psi_io, read_mb, write_mb) in top:
+            memory_text = format_size_binary(memory // 1024) if memory is not None else "-"
+            peak_text = format_size_binary(peak // 1024) if peak is not None else "N/A"
+            psi = [value for value in (psi_cpu, psi_memory, psi_io) if value is not None]
+            psi_cpu, psi_memory, psi_io = (f"{value:.1f}%" if value is not None else "-"
+                                           for value in (psi_cpu, psi_memory, psi_io))
+            io_text = f" {read_mb:9.2f} {write_mb:10.2f}" if read_mb is not None else f" {'-':>9} {'-':>10}"
+            lines.append([
+                ("default", f"{name[:20]:<20} "),
+                (level_attr("load", cpu), f"{cpu:6.1f}"),
+                ("default", f" {memory_text:>7} {peak_text:>7} "),
+                (level_attr("iowait", max(psi, default=0)), f"{psi_cpu:>7} {psi_memory:>5} {psi_io:>5}"),
+                ("default", io_text),
+            ])
+        lines.append(("header", sep))
+
     # Temperatures
-    temp_items = get_temperatures()
-    lines.append(("title", "🌡️  Temperatures:"))
+    section("temps")
+    temp_items = format_temperatures(sample["temps"])
+    lines.append(mark_stale(("title", "🌡️  Temperatures:"), "temps" in stale))
     for attr, text in temp_items:
         lines.append((attr, text))
+    for name, _ in sample["temps"]:
+        add_history(f"temp.{name}", name[:14], unit="°C", low=None, high=None)
     lines.append(("header", sep))
 
     # Network Traffic
-    net_stats = get_network_traffic()
-    for ifname, (rx_rate, tx_rate) in net_stats.items():
-        lines.append(("title", f"🌐 Net ({ifname}): Down {rx_rate:.2f} Mbps | Up {tx_rate:.2f} Mbps"))
+    section("net")
+    net_stats = sample["net"]
+    for ifname, rates in net_stats.items():
+        rx_rate, tx_rate = rates[0], rates[1]
+        lines.append(mark_stale(("title", f"🌐 Net ({ifname}): Down {rx_rate:.2f} Mbps | Up {tx_rate:.2f} Mbps"), "net" in stale))
+        if len(rates) > 2:
+            _, _, rx_pps, tx_pps, rx_errs, tx_errs, rx_drop, tx_drop, multicast = rates
+            problem_attr = 'temp_red' if rx_errs + tx_errs + rx_drop + tx_drop > 0 else 'default'
+            lines.append([
+                ("default", f"  pkt/s rx {rx_pps:8.0f} tx {tx_pps:8.0f} | mcast {multicast:6.0f} | "),
+                (problem_attr, f"err {rx_errs:.0f}/{tx_errs:.0f} drop {rx_drop:.0f}/{tx_drop:.0f}"),
+            ])
+        add_history(f"net.{ifname}.rx", "  Down", unit="", low=0.0, high=None, precision=2)
+        add_history(f"net.{ifname}.tx", "  Up", unit="", low=0.0, high=None, precision=2)
     lines.append(("header", sep))
 
+    # Block device I/O
+    disk_io = sample.get("diskio")
+    if disk_io:
+        section("diskio")
+        lines.append(mark_stale(("title", "💽 Disk I/O:"), "diskio" in stale))
+        lines.append(("default", f"{'Device':<14} {'Read MB/s':>9} {'Write MB/s':>10} {'r/s':>7} {'w/s':>7} "
+                                 f"{'r_await':>8} {'w_await':>8} {'util':>5}"))
+        for device, (read_mb, write_mb, reads, writes, r_await, w_await, util) in disk_io.items():
+            lines.append([
+                ("default", f"{device:<14} {read_mb:9.2f} {write_mb:10.2f} {reads:7.0f} {writes:7.0f} "
+                            f"{r_await:6.1f}ms {w_await:6.1f}ms "),
+                (level_attr("load", util), f"{util:4.0f}%"),
+            ])
+            add_history(f"disk.{device}.read", "  Read MB/s", unit="", low=0.0, high=None, precision=2)
+            add_history(f"disk.{device}.write", "  Write MB/s", unit="", low=0.0, high=None, precision=2)
+            add_history(f"disk.{device}.util", "  Util")
+        lines.append(("header", sep))
+
     # Disk Usage (from /etc/fstab)
-    disk_lines = get_fstab_disk_usage()
-    lines.append(("title", "💾 Storage Usage (/etc/fstab):"))
+    section("fstab")
+    disk_lines = format_fstab_usage(sample["fstab"])
+    lines.append(mark_stale(("title", "💾 Storage Usage (/etc/fstab):"), "fstab" in stale))
     for d in disk_lines:
         lines.append(("default", d))
     lines.append(("header", sep))
 
-    # Storage Info
-    nvme_info, usb_info = get_storage_info()
-    lines.append(("title", "💿 NVMe & USB Storage Info:"))
-    if nvme_info:
-        lines.append(("good", "NVMe Devices:"))
-        for info in nvme_info:
-            lines.append(("default", info))
-    else:
-        lines.append(("bad", "No NVMe devices detected."))
-    if usb_info:
-        lines.append(("good", "USB Storage Devices:"))
-        for info in usb_info:
-            lines.append(("default", info))
-    else:
-        lines.append(("bad", "No USB storage devices detected."))
-    lines.append(("header", sep))
+    # Storage Info, left out by --once unless --full
+    if sample.get("storage") is not None:
+        section("storage")
+        nvme_info, usb_info = format_storage_info(sample["storage"])
+        lines.append(mark_stale(("title", "💿 NVMe & USB Storage Info:"), "storage" in stale))
+        if nvme_info:
+            lines.append(("good", "NVMe Devices:"))
+            for info in nvme_info:
+                lines.append(("default", info))
+        else:
+            lines.append(("bad", "No NVMe devices detected."))
+        if usb_info:
+            lines.append(("good", "USB Storage Devices:"))
+            for info in usb_info:
+                lines.append(("default", info))
+        else:
+            lines.append(("bad", "No USB storage devices detected."))
+        lines.append(("header", sep))
+
+    # Profile
+    if profiler is not None and profiler.visible:
+        section("profile")
+        lines.extend(profiler.lines())
+        lines.append(("header", sep))
+
+    # Windowed load statistics
+    if stats is not None and stats.visible:
+        section("stats")
+        lines.extend(stats.lines())
+        lines.append(("header", sep))
 
     # Footer
-    lines.append(("footer", "Press 'q' to exit. Use arrows or mouse to scroll."))
-    return lines
+    section("footer")
+    lines.append(("footer", footer or "Press 'q' to exit. Use arrows or mouse to scroll."))
+    ends = [start for _, start in sections[1:]] + [len(lines)]
+    return [(key, lines[start:end]) for (key, start), end in zip(sections, ends)]
+
+def build_dashboard(sample=None, stale=(), footer=None, history=None, profiler=None, alerts=None, stats=None):
+    return [line for _, lines in build_sections(sample, stale, footer, history, profiler, alerts, stats)
+            for line in lines]
 
 palette = [
     ('header', 'dark blue,bold', ''),
@@ -576,44 +4210,464 @@ palette = [
     ('temp_yellow', 'yellow,bold', ''),
     ('temp_green', 'light green,bold', ''),
     ('freq', 'light green,bold', ''),
-    ('footer', 'dark gray,bold', '')
+    ('footer', 'dark gray,bold', ''),
+    ('selected', 'black,bold', 'light gray'),
 ]
 
-class DashboardWidget(urwid.ListBox):
-    def __init__(self):
+# Collector results that arrive within this many seconds share one render
+RENDER_COALESCE = 0.05
+
+class DashboardWidget:
+    """Scrollable dashboard; `listbox` is the urwid widget handed to the MainLoop.
+
+    Rows are keyed by (section, row index) and their Text widgets are kept
+    between updates: only rows whose markup changed get set_text(), and the
+    walker is only touched when rows appear or disappear. Focus stays on the
+    same widget, so the scroll position is kept without any restoring.
+    schedule_update() batches the renders asked for by finishing collectors.
+    """
+
+    def __init__(self, source=None, footer=None, history=None, profiler=None, alerts=None, stats=None):
+        import urwid
+        # source() returns (sample, stale collector names); footer() the footer text
+        self.source = source or scheduler.snapshot
+        self.footer = footer
+        self.history = history
+        self.profiler = profiler
+        self.alerts = alerts
+        self.stats = stats
+        self.rows = {}
+        self.keys = []
+        # (main loop, alarm handle) of the render schedule_update() set up
+        self.pending = None
         self.walker = urwid.SimpleListWalker([])
-        super().__init__(self.walker)
+        self.listbox = urwid.ListBox(self.walker)
+        self.update_content()
+
+    def schedule_update(self, loop, delay=RENDER_COALESCE):
+        """Render once within `delay` seconds, however often this is called until then."""
+        if self.pending is None:
+            self.pending = (loop, loop.set_alarm_in(delay, self._scheduled_update))
+
+    def _scheduled_update(self, loop, data):
+        self.pending = None
         self.update_content()
 
     def update_content(self):
-        # Save current focus position (scroll offset)
-        focus_widget, focus_pos = self.get_focus()
-        if focus_pos is None:
-            focus_pos = 0
-        new_items = []
-        for item in build_dashboard():
-            if isinstance(item, list):
-                new_items.append(urwid.Text(item))
-            else:
-                new_items.append(urwid.Text(item))
-        self.walker[:] = new_items
-        # Restore focus if possible
-        if focus_pos < len(new_items):
-            self.set_focus(focus_pos)
+        if self.pending is not None:
+            # This render covers the scheduled one
+            loop, handle = self.pending
+            loop.remove_alarm(handle)
+            self.pending = None
+        if self.profiler is None:
+            self._update_content()
+            return
+        start = time.perf_counter_ns()
+        self._update_content()
+        self.profiler.record("render", time.perf_counter_ns() - start)
+
+    def _update_content(self):
+        import urwid
+        sample, stale = self.source()
+        footer = self.footer() if self.footer else None
+        keys = []
+        rows = {}
+        for section_key, lines in build_sections(sample, stale, footer, self.history, self.profiler,
+                                                  self.alerts, self.stats):
+            for index, markup in enumerate(lines):
+                key = (section_key, index)
+                keys.append(key)
+                row = self.rows.get(key)
+                if row is None:
+                    row = [markup, urwid.Text(markup)]
+                elif row[0] != markup:
+                    row[0] = markup
+                    row[1].set_text(markup)
+                rows[key] = row
+        self.rows = rows
+        if keys != self.keys:
+            focused = self.keys[self.walker.focus] if self.keys else None
+            self.walker[:] = [rows[key][1] for key in keys]
+            self.keys = keys
+            # Keep the focus (and so the scroll position) on the same row
+            if focused in rows:
+                self.walker.set_focus(keys.index(focused))
 
-def periodic_update(loop, widget):
+def periodic_update(loop, args):
+    widget, rate = args
+    start = time.monotonic()
+    if widget.profiler is not None:
+        widget.profiler.tick(scheduler.tiers["fast"])
+    scheduler.poll()
+    # Re-render even without new results so stale markers appear on time
     widget.update_content()
-    loop.set_alarm_in(0.5, periodic_update, widget)
+    if rate is not None:
+        scheduler.tiers["fast"] = rate.update()
+    # Count this tick's own work against the interval so ticks do not drift
+    delay = max(0.0, scheduler.tiers["fast"] - (time.monotonic() - start))
+    loop.set_alarm_in(delay, periodic_update, args)
+
+def replay_update(loop, args):
+    widget, replay = args
+    if replay.advance():
+        widget.update_content()
+    loop.set_alarm_in(scheduler.tiers["fast"], replay_update, args)
 
 def unhandled_input(key):
+    import urwid
     if key in ('q', 'Q'):
         raise urwid.ExitMainLoop()
 
-def main():
-    dashboard = DashboardWidget()
-    loop = urwid.MainLoop(dashboard, palette, handle_mouse=True, unhandled_input=unhandled_input)
-    loop.set_alarm_in(0.5, periodic_update, dashboard)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="System monitor for Rockchip RK3588 boards.")
+    parser.add_argument("--fast", type=float, default=REFRESH_TIERS["fast"], metavar="SEC",
+                        help="refresh interval for CPU/GPU/NPU/RGA/network/disk I/O (default: %(default)s)")
+    parser.add_argument("--slow", type=float, default=REFRESH_TIERS["slow"], metavar="SEC",
+                        help="refresh interval for temperatures, RAM, processes and disk hotplug (default: %(default)s)")
+    parser.add_argument("--glacial", type=float, default=REFRESH_TIERS["glacial"], metavar="SEC",
+                        help="refresh interval for device info and fstab usage (default: %(default)s)")
+    parser.add_argument("--smart-ttl", type=float, default=SMART_TTL, metavar="SEC",
+                        help="reuse SMART temperature/health/hours for this long; disk hotplug always "
+                             "refreshes (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4, metavar="N",
+                        help="background collector threads (default: %(default)s)")
+    parser.add_argument("--root", metavar="DIR",
+                        help="read /proc, /sys, /etc and /dev below DIR, e.g. a copy of a board's tree")
+    parser.add_argument("--fixed-rate", action="store_true",
+                        help="refresh the dashboard every --fast seconds instead of adapting to activity")
+    parser.add_argument("--min-refresh", type=float, default=ADAPTIVE_MIN, metavar="SEC",
+                        help="shortest adaptive refresh interval, used while loads change quickly "
+                             "(default: %(default)s)")
+    parser.add_argument("--max-refresh", type=float, default=ADAPTIVE_MAX, metavar="SEC",
+                        help="longest adaptive refresh interval, used while loads are stable (default: %(default)s)")
+    parser.add_argument("--cpu-budget", type=float, default=CPU_BUDGET, metavar="PCT",
+                        help="slow the adaptive refresh down whenever myrktop itself uses more than PCT%% "
+                             "of one core, 0 for no limit (default: %(default)s)")
+    parser.add_argument("--dvfs-sampler", type=float, default=DVFS_SAMPLER_HZ, metavar="HZ",
+                        help="sample the current frequency HZ times a second (20-50 is plenty) for cpufreq/devfreq "
+                             "domains without kernel statistics; 0 leaves them out of the DVFS panel "
+                             "(default: %(default)s)")
+    parser.add_argument("--history", type=float, default=300, metavar="SEC",
+                        help="window of the per-metric sparklines, 0 to disable (default: %(default)s)")
+    parser.add_argument("--profile", action="store_true",
+                        help="show the profile panel (collector/render timings, tick jitter, own CPU and RSS) "
+                             "from the start; 'p' toggles it")
+    parser.add_argument("--plugin", action="append", default=[], metavar="FILE",
+                        help="JSON file with collector plugins (see BUILTIN_PLUGINS for the format); a plugin "
+                             "named like a built-in replaces it; repeatable")
+    parser.add_argument("--stats", action="store_true",
+                        help="show the load statistics panel (mean, EWMA, min/max, p50/p95/p99 per CPU core, GPU, "
+                             "NPU core and RGA core) from the start; 't' toggles it")
+    parser.add_argument("--stats-window", choices=list(STATS_WINDOWS), default="1m",
+                        help="window shown by the statistics panel and used by --color-by; 'w' cycles it "
+                             "(default: %(default)s)")
+    parser.add_argument("--color-by", choices=("now",) + STATS_FIELDS, default="now",
+                        help="colour CPU/GPU/NPU/RGA loads by this statistic over the statistics window instead "
+                             "of the current value (default: %(default)s)")
+    parser.add_argument("--profile-out", metavar="FILE",
+                        help="write the profile as JSON to FILE on exit")
+    parser.add_argument("--procs", type=int, default=PROCESS_VIEW["rows"], metavar="N",
+                        help="rows in the process panel, 0 to hide it (default: %(default)s)")
+    parser.add_argument("--proc-sort", choices=("cpu", "rss"), default=PROCESS_VIEW["sort"],
+                        help="initial process panel order; 's' toggles it (default: %(default)s)")
+    parser.add_argument("--proc-filter", metavar="GLOB",
+                        help="only list processes whose container name, cgroup path or command matches, "
+                             "e.g. '/system.slice/docker-*'")
+    parser.add_argument("--dmabuf-rows", type=int, default=DMABUF_VIEW["rows"], metavar="N",
+                        help="exporters, devices and processes listed in the DMA-buf panel; 0 also skips the "
+                             "per-process file descriptor scan (default: %(default)s)")
+    parser.add_argument("--containers", type=int, default=CONTAINER_VIEW["rows"], metavar="N",
+                        help="rows in the container panel, busiest first, 0 to hide it (default: %(default)s)")
+    parser.add_argument("--net-include", default=",".join(NET_DEFAULT_INCLUDE), metavar="GLOBS",
+                        help="comma-separated interface globs to show (default: %(default)s)")
+    parser.add_argument("--net-exclude", default=",".join(NET_DEFAULT_EXCLUDE), metavar="GLOBS",
+                        help="comma-separated interface globs to hide, '' for none (default: %(default)s)")
+    parser.add_argument("--disk-partitions", action="store_true",
+                        help="list partitions in the disk I/O panel instead of only whole disks")
+    parser.add_argument("--disk-virtual", action="store_true",
+                        help="also list loop, zram and ram devices in the disk I/O panel")
+    parser.add_argument("--alert", action="append", default=[], metavar="RULE",
+                        help="extra alert rule, e.g. 'npu.* >= 80 clear 60 for 30' or "
+                             "'throttle.gpu < 100 when hot'; repeatable")
+    parser.add_argument("--alert-log", metavar="FILE",
+                        help="append alert events to FILE; also enables alerts in headless modes")
+    parser.add_argument("--log", metavar="FILE",
+                        help="write internal errors (failing collectors and listeners) to FILE; "
+                             "headless modes write them to stderr")
+    parser.add_argument("--once", action="store_true",
+                        help="print one sample (the dashboard as text, or JSON with --json) and exit")
+    parser.add_argument("--json", action="store_true", help="with --once, print the sample as JSON")
+    parser.add_argument("--full", action="store_true",
+                        help="with --once, also run the costly collectors: SMART, processes, containers and DMA-buf")
+    parser.add_argument("--stream", choices=("ndjson",),
+                        help="headless mode: print one JSON sample per line to stdout every --interval")
+    parser.add_argument("--interval", type=float, metavar="SEC",
+                        help="--stream output interval (default: the --fast interval)")
+    parser.add_argument("--record", metavar="FILE",
+                        help="headless mode: append samples to a ring-buffer file instead of showing the UI")
+    parser.add_argument("--record-size", type=float, default=16, metavar="MB",
+                        help="size of a new --record file; the oldest samples are overwritten (default: %(default)s)")
+    parser.add_argument("--replay", metavar="FILE", help="browse a file written by --record")
+    parser.add_argument("--serve", type=int, metavar="PORT",
+                        help="headless mode: serve OpenMetrics on http://BIND:PORT/metrics")
+    parser.add_argument("--agent", type=int, nargs="?", const=AGENT_PORT, metavar="PORT",
+                        help=f"headless mode: stream samples to --fleet viewers on PORT (default: {AGENT_PORT})")
+    parser.add_argument("--fleet", metavar="HOST[:PORT],...",
+                        help="show a summary of many boards running --agent, with drill-down into each")
+    parser.add_argument("--bind", default="127.0.0.1", metavar="ADDR",
+                        help="address for --serve and --agent to listen on (default: %(default)s, "
+                             "this board only; 0.0.0.0 exposes process command lines to the network)")
+    parser.add_argument("--min-interval", type=float, default=1.0, metavar="SEC",
+                        help="--serve samples each collector at most this often (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if sum(bool(mode) for mode in (args.record, args.replay, args.serve is not None,
+                                   args.agent is not None, args.fleet, args.once, args.stream)) > 1:
+        parser.error("--record, --replay, --serve, --agent, --fleet, --once and --stream are mutually exclusive")
+    if args.json and not args.once:
+        parser.error("--json needs --once")
+    if args.full and not args.once:
+        parser.error("--full needs --once")
+    if args.interval is not None and args.interval <= 0:
+        parser.error("--interval must be positive")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    for tier in REFRESH_TIERS:
+        if getattr(args, tier) <= 0:
+            parser.error(f"--{tier} must be positive")
+    if not 0 < args.min_refresh <= args.max_refresh:
+        parser.error("--min-refresh must be positive and at most --max-refresh")
+    if not 0 <= args.dvfs_sampler <= 1000:
+        parser.error("--dvfs-sampler must be between 0 and 1000")
+    if args.cpu_budget < 0:
+        parser.error("--cpu-budget must not be negative")
+    try:
+        args.alert = [AlertRule(rule) for rule in args.alert]
+        args.plugin = [spec for path in args.plugin for spec in load_plugin_file(path)]
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    return args
+
+def run_replay(path):
+    import urwid
+    replay = ReplaySource(RingFile(path))
+    dashboard = DashboardWidget(replay, replay.footer)
+
+    def replay_input(key):
+        if replay.handle_key(key):
+            dashboard.update_content()
+        else:
+            unhandled_input(key)
+
+    loop = urwid.MainLoop(dashboard.listbox, palette, handle_mouse=True, unhandled_input=replay_input)
+    loop.set_alarm_in(scheduler.tiers["fast"], replay_update, (dashboard, replay))
     loop.run()
 
+def run_dashboard(args, alerts=None):
+    import urwid
+    history = None
+    if args.history > 0:
+        # One slot per configured tier interval; history is time-based, so the
+        # adaptive rate changes how many samples share a slot, not the window
+        tiers = dict(scheduler.tiers)
+        history = MetricHistory(args.history, lambda name: tiers[scheduler.collectors[name][1]])
+        scheduler.listeners.append(history.feed)
+    profiler = Profiler()
+    profiler.visible = args.profile
+    scheduler.profiler = profiler
+    if alerts is not None:
+        scheduler.listeners.append(alerts.feed)
+    stats = WindowedStats()
+    stats.visible = args.stats
+    stats.window = args.stats_window
+    stats.color_by = None if args.color_by == "now" else args.color_by
+    scheduler.listeners.append(stats.feed)
+    rate = None
+    footer = None
+    if not args.fixed_rate:
+        rate = AdaptiveRate(scheduler.tiers["fast"], args.min_refresh, args.max_refresh, args.cpu_budget)
+        scheduler.listeners.append(rate.feed)
+        footer = lambda: f"Press 'q' to exit. {rate.describe()} (+/- pin, a auto)."
+    dashboard = DashboardWidget(footer=footer, history=history, profiler=profiler, alerts=alerts, stats=stats)
+
+    def dashboard_input(key):
+        if key in ('p', 'P'):
+            profiler.visible = not profiler.visible
+            dashboard.update_content()
+        elif key in ('s', 'S'):
+            PROCESS_VIEW["sort"] = "rss" if PROCESS_VIEW["sort"] == "cpu" else "cpu"
+            dashboard.update_content()
+        elif key in ('t', 'T'):
+            stats.visible = not stats.visible
+            dashboard.update_content()
+        elif key in ('w', 'W'):
+            stats.cycle_window()
+            dashboard.update_content()
+        elif rate is not None and key in ('+', '=', '-', 'a', 'A'):
+            # Takes effect from the next tick
+            if key in ('+', '='):
+                scheduler.tiers["fast"] = rate.pin(rate.current() / 2)
+            elif key == '-':
+                scheduler.tiers["fast"] = rate.pin(rate.current() * 2)
+            else:
+                rate.unpin()
+            dashboard.update_content()
+        else:
+            unhandled_input(key)
+
+    loop = urwid.MainLoop(dashboard.listbox, palette, handle_mouse=True, unhandled_input=dashboard_input)
+
+    def on_results(data):
+        dashboard.schedule_update(loop)
+        return True
+
+    # Workers write a byte to this pipe when a collector finishes, which wakes
+    # the event loop; input handling never waits on a collector. A tick's
+    # worth of finishing collectors is rendered once.
+    wake_fd = loop.watch_pipe(on_results)
+    scheduler.start(lambda: os.write(wake_fd, b"."), workers=args.workers)
+    scheduler.poll()
+    loop.set_alarm_in(scheduler.tiers["fast"], periodic_update, (dashboard, rate))
+    try:
+        loop.run()
+    finally:
+        if args.profile_out:
+            profiler.dump(args.profile_out)
+
+class FleetView:
+    """Summary table of all boards; Enter opens a board's full dashboard.
+
+    Rows are only re-rendered for boards that reported since the last tick.
+    """
+
+    def __init__(self, boards):
+        import urwid
+
+        class SelectableText(urwid.Text):
+            """Rows must be selectable so the ListBox moves focus (and scrolls) through them."""
+            _selectable = True
+
+            def keypress(self, size, key):
+                return key
+
+        self.boards = boards
+        self.texts = [SelectableText("") for _ in boards]
+        self.walker = urwid.SimpleFocusListWalker(
+            [urwid.AttrMap(text, None, focus_map="selected") for text in self.texts])
+        self.widget = urwid.Frame(
+            urwid.ListBox(self.walker),
+            header=urwid.Pile([urwid.Text(("title", f"🛰️  Fleet ({len(boards)} boards)")),
+                               urwid.Text(("header", FLEET_HEADER))]),
+            footer=urwid.Text(("footer", "Enter: board dashboard, Esc: back, q: exit.")))
+        self.update_content(force=True)
+
+    def update_content(self, force=False):
+        """Re-render rows of boards that reported; force=True re-renders all, for staleness."""
+        for board, text in zip(self.boards, self.texts):
+            if force or board.updated:
+                board.updated = False
+                text.set_text(fleet_summary(board))
+
+    def focused_board(self):
+        return self.boards[self.walker.focus] if self.boards else None
+
+def run_fleet(addresses):
+    """Viewer for many --agent boards, all served from one asyncio event loop."""
+    import asyncio
+    import urwid
+
+    boards = [FleetBoard(address, stale_after=3 * scheduler.tiers["fast"] + 1) for address in addresses]
+    fleet = FleetView(boards)
+    aio_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(aio_loop)
+    state = {"board": None, "dashboard": None}
+
+    def fleet_input(key):
+        if key == "enter" and state["board"] is None and fleet.focused_board() is not None:
+            board = state["board"] = fleet.focused_board()
+            label = f"{board.hostname} ({board.name})" if board.hostname else board.name
+            state["dashboard"] = DashboardWidget(board.snapshot, lambda: f"{label}: Esc to go back, 'q' to exit.")
+            loop.widget = state["dashboard"].listbox
+        elif key in ("esc", "backspace") and state["board"] is not None:
+            state["board"] = state["dashboard"] = None
+            fleet.update_content(force=True)
+            loop.widget = fleet.widget
+        else:
+            unhandled_input(key)
+
+    def tick(loop, ticks):
+        if state["dashboard"] is not None:
+            state["dashboard"].update_content()
+        else:
+            fleet.update_content(force=ticks % 4 == 0)
+        loop.set_alarm_in(scheduler.tiers["fast"], tick, ticks + 1)
+
+    loop = urwid.MainLoop(fleet.widget, palette, handle_mouse=True, unhandled_input=fleet_input,
+                          event_loop=urwid.AsyncioEventLoop(loop=aio_loop))
+    for board in boards:
+        aio_loop.create_task(board.run())
+    loop.set_alarm_in(scheduler.tiers["fast"], tick, 1)
+    try:
+        loop.run()
+    finally:
+        tasks = asyncio.all_tasks(aio_loop)
+        for task in tasks:
+            task.cancel()
+        aio_loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        aio_loop.close()
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.root or args.plugin:
+        configure(root=args.root, plugins=BUILTIN_PLUGINS + tuple(args.plugin) if args.plugin else None)
+    for tier in REFRESH_TIERS:
+        scheduler.tiers[tier] = getattr(args, tier)
+    PROCESS_VIEW.update(sort=args.proc_sort, filter=args.proc_filter, rows=args.procs)
+    CONTAINER_VIEW["rows"] = args.containers
+    DMABUF_VIEW["rows"] = args.dmabuf_rows
+    storage_cache.ttl = args.smart_ttl
+    dvfs_stat.sampler_hz = args.dvfs_sampler
+    disk_stat.partitions = args.disk_partitions
+    disk_stat.virtual = args.disk_virtual
+    net_stat.set_filter([g for g in args.net_include.split(",") if g], [g for g in args.net_exclude.split(",") if g])
+    headless = args.record or args.serve is not None or args.agent is not None or args.stream
+    if args.log or headless or args.once:
+        handler = logging.FileHandler(args.log) if args.log else logging.StreamHandler(sys.stderr)
+        handler.setFormatter(logging.Formatter("%(asctime)s myrktop: %(message)s"))
+        log.addHandler(handler)
+    alerts = None
+    try:
+        try:
+            if not (args.replay or args.fleet or args.once) and (not headless or args.alert or args.alert_log):
+                # Headless modes have no status line, so events also go to stderr there
+                echo = (lambda line: print(line, file=sys.stderr, flush=True)) if headless else None
+                alerts = AlertEngine(list(DEFAULT_ALERT_RULES) + args.alert, args.alert_log, echo)
+            if args.once:
+                run_once(args.json, args.full)
+                return
+            if args.stream:
+                run_stream(args.interval or scheduler.tiers["fast"], alerts)
+                return
+            if args.record:
+                run_recorder(args.record, int(args.record_size * (1 << 20)), scheduler.tiers["fast"], alerts)
+                return
+            if args.replay:
+                run_replay(args.replay)
+                return
+            if args.serve is not None:
+                run_exporter(args.serve, args.bind, args.min_interval, alerts)
+                return
+            if args.agent is not None:
+                run_agent(args.agent, args.bind, scheduler.tiers["fast"], args.workers, alerts)
+                return
+            if args.fleet:
+                run_fleet([address.strip() for address in args.fleet.split(",") if address.strip()])
+                return
+        except (OSError, ValueError) as e:
+            sys.exit(f"myrktop: {e}")
+        run_dashboard(args, alerts)
+    finally:
+        if alerts is not None:
+            alerts.close()
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,70 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MYRKTOP = os.path.join(HERE, "..", "myrktop.py")
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, os.path.join(HERE, "..", "benchmarks"))
+
+import bench_collectors  # noqa: E402
+import myrktop  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_listening(port, timeout=10.0):
+    """Block until something accepts connections on 127.0.0.1:port."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+@pytest.fixture
+def spawn():
+    """Start `myrktop.py ARGS...` in a subprocess; every process is stopped with SIGTERM afterwards."""
+    processes = []
+
+    def start(*args):
+        process = subprocess.Popen([sys.executable, MYRKTOP, *args], stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.PIPE)
+        processes.append(process)
+        return process
+
+    yield start
+    for process in processes:
+        if process.poll() is None:
+            process.terminate()
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+        process.stderr.close()
+
+
+@pytest.fixture
+def board(tmp_path):
+    """The benchmark's synthetic RK3588 tree, with the collectors pointed at it."""
+    root = str(tmp_path / "board")
+    bench_collectors.build_static_tree(root)
+    bench_collectors.build_tree(root, tick=1)
+    myrktop.configure(root=root, runner=bench_collectors.stub_runner)
+    try:
+        yield root
+    finally:
+        myrktop.configure(root="/", runner=myrktop.run_command)
@@ -0,0 +1,45 @@
+import myrktop
+
+
+def make_rate(**kwargs):
+    # budget=0 keeps myrktop's own CPU use out of the tests
+    return myrktop.AdaptiveRate(kwargs.pop("initial", 0.5), budget=0, **kwargs)
+
+
+def test_busy_halves_and_idle_backs_off():
+    rate = make_rate(minimum=0.1, maximum=3.0)
+    rate.feed("gpu", (10, 600))
+    assert rate.update() == 0.625
+    rate.feed("gpu", (60, 600))
+    assert rate.update() == 0.3125
+    for _ in range(50):
+        rate.feed("gpu", (60, 600))
+        interval = rate.update()
+    assert interval == 3.0
+
+
+def test_interval_stays_within_bounds():
+    rate = make_rate(minimum=0.1, maximum=3.0)
+    for i in range(20):
+        rate.feed("npu", ([0 if i % 2 else 100], 1000))
+        assert 0.1 <= rate.update() <= 3.0
+    assert rate.current() == 0.1
+
+
+def test_cpu_load_is_averaged_over_cores():
+    rate = make_rate()
+    rate.feed("cpu", ({0: 0, 1: 0}, {}, {}))
+    # one core jumping by 16 points moves the mean by 8, below the busy threshold
+    rate.feed("cpu", ({0: 16, 1: 0}, {}, {}))
+    assert rate.change == 8
+
+
+def test_pin_overrides_until_unpinned():
+    rate = make_rate(minimum=0.1, maximum=3.0)
+    assert rate.pin(10) == 3.0
+    rate.feed("gpu", (0, 0))
+    rate.feed("gpu", (100, 0))
+    assert rate.update() == 3.0
+    assert "pinned" in rate.describe()
+    rate.unpin()
+    assert rate.update() < 3.0
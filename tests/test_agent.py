@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import myrktop
+from conftest import free_port, wait_listening
+
+
+async def follow(boards, until, timeout=15.0):
+    """Run every board's connection loop until until() holds or the timeout expires."""
+    tasks = [asyncio.create_task(board.run()) for board in boards]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    try:
+        while not until() and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def fake_peer(handle):
+    """A hand-written agent on a free port; returns (server, "127.0.0.1:port")."""
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+def test_fleet_follows_two_agents(board, spawn):
+    ports = [free_port(), free_port()]
+    for port in ports:
+        spawn("--agent", str(port), "--bind", "127.0.0.1", "--root", board)
+    for port in ports:
+        wait_listening(port)
+
+    boards = [myrktop.FleetBoard(f"127.0.0.1:{port}") for port in ports]
+    asyncio.run(follow(boards, lambda: all(len(b.values.get("cpu", ({},))[0]) == 8 for b in boards)))
+
+    for fleet_board in boards:
+        assert fleet_board.connected and fleet_board.error is None
+        assert fleet_board.hostname
+        assert sorted(fleet_board.values["cpu"][0]) == list(range(8))
+        attr, text = myrktop.fleet_summary(fleet_board)
+        assert text.startswith(fleet_board.name) and "(stale)" not in text
+
+
+def test_dropped_and_slow_peers(board, spawn):
+    port = free_port()
+    spawn("--agent", str(port), "--bind", "127.0.0.1", "--root", board)
+    wait_listening(port)
+
+    sample = {"cpu": [{"0": 12.0}, {"0": 1800}, {"cores": {"0": [1, 2]}, "clusters": {}}]}
+
+    async def drop(reader, writer):
+        writer.write(json.dumps({"host": "dropper", "protocol": myrktop.AGENT_PROTOCOL}).encode() + b"\n")
+        writer.write(json.dumps({"t": 0, "d": sample, "s": [], "full": True}).encode() + b"\n")
+        await writer.drain()
+        writer.close()
+
+    async def stall(reader, writer):
+        # Accepts the connection but never says hello
+        await reader.read()
+        writer.close()
+
+    async def scenario():
+        dropper, dropper_address = await fake_peer(drop)
+        staller, staller_address = await fake_peer(stall)
+        live = myrktop.FleetBoard(f"127.0.0.1:{port}")
+        dropped = myrktop.FleetBoard(dropper_address)
+        slow = myrktop.FleetBoard(staller_address)
+        async with dropper, staller:
+            await follow([live, dropped, slow],
+                         lambda: live.values.get("cpu", ({},))[0] and dropped.error == "disconnected" and not dropped.connected)
+        return live, dropped, slow
+
+    live, dropped, slow = asyncio.run(scenario())
+
+    # The live agent is unaffected by its misbehaving neighbours
+    assert live.connected and live.values["cpu"][0]
+    # The dropped peer keeps its last sample but is shown as stale
+    assert not dropped.connected and dropped.error == "disconnected"
+    assert dropped.hostname == "dropper"
+    assert dropped.values["cpu"][0] == {0: 12.0}
+    assert dropped.is_stale()
+    assert myrktop.fleet_summary(dropped)[1].endswith("(stale)")
+    # The silent peer never got past the handshake
+    assert not slow.connected and slow.error == "connecting" and not slow.values
+    assert myrktop.fleet_summary(slow) == ("bad", f"{slow.name:<20} connecting")
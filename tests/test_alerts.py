@@ -0,0 +1,102 @@
+import pytest
+
+import myrktop
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(myrktop.time, "monotonic", lambda: now[0])
+    return now
+
+
+def kinds(engine):
+    return [line.split()[1] for line in engine.events]
+
+
+def test_rule_parsing():
+    rule = myrktop.AlertRule("npu.*  >= 80 clear 60 for 30s when hot")
+    assert (rule.pattern, rule.op, rule.threshold, rule.clear, rule.duration, rule.when_hot) == \
+        ("npu.*", ">=", 80.0, 60.0, 30.0, True)
+    assert myrktop.AlertRule("gpu > 90").clear == 90.0
+    with pytest.raises(ValueError):
+        myrktop.AlertRule("gpu is hot")
+
+
+def test_hysteresis(clock):
+    engine = myrktop.AlertEngine(["gpu >= 80 clear 60"])
+    engine.feed("gpu", (85, 800))
+    assert kinds(engine) == ["FIRING"]
+    # between the clear level and the threshold: still firing
+    engine.feed("gpu", (70, 800))
+    engine.feed("gpu", (82, 800))
+    assert kinds(engine) == ["FIRING"]
+    assert engine.status_line()[1].startswith("⚠️  1 active: gpu 82 >= 80")
+    engine.feed("gpu", (59, 800))
+    assert kinds(engine) == ["FIRING", "RESOLVED"]
+    assert engine.status_line() == ("good", "✅ No active alerts")
+
+
+def test_for_duration(clock):
+    engine = myrktop.AlertEngine(["npu.* >= 80 for 30"])
+    engine.feed("npu", ([90, 10], 1000))
+    clock[0] += 20
+    engine.feed("npu", ([90, 10], 1000))
+    assert not engine.events
+    # dipping below restarts the wait
+    clock[0] += 5
+    engine.feed("npu", ([70, 10], 1000))
+    clock[0] += 10
+    engine.feed("npu", ([90, 10], 1000))
+    clock[0] += 25
+    engine.feed("npu", ([90, 10], 1000))
+    assert not engine.events
+    clock[0] += 5
+    engine.feed("npu", ([90, 10], 1000))
+    assert engine.events[0].split()[1:3] == ["FIRING", "npu.0=90.0"]
+
+
+def test_when_hot(clock):
+    warning, critical = myrktop.THRESHOLDS["temp"]
+    engine = myrktop.AlertEngine(["gpu >= 50 when hot"])
+    engine.feed("temps", [("soc-thermal", critical - 10)])
+    engine.feed("gpu", (90, 800))
+    assert not engine.events
+    engine.feed("temps", [("soc-thermal", critical)])
+    engine.feed("gpu", (90, 800))
+    assert kinds(engine) == ["FIRING"]
+    # still hot above the warning level, cool below it
+    engine.feed("temps", [("soc-thermal", warning)])
+    engine.feed("gpu", (90, 800))
+    assert kinds(engine) == ["FIRING"]
+    engine.feed("temps", [("soc-thermal", warning - 1)])
+    engine.feed("gpu", (90, 800))
+    assert kinds(engine) == ["FIRING", "RESOLVED"]
+
+
+def test_events_go_to_the_log(clock, tmp_path):
+    path = tmp_path / "alerts.log"
+    echoed = []
+    engine = myrktop.AlertEngine(["gpu >= 80"], str(path), echoed.append)
+    engine.feed("gpu", (85, 800))
+    engine.feed("gpu", (10, 800))
+    engine.close()
+    lines = path.read_text().splitlines()
+    assert lines == echoed == engine.events
+    assert [line.split()[1:3] for line in lines] == [["FIRING", "gpu=85.0"], ["RESOLVED", "gpu=10.0"]]
+    assert lines[0].endswith("rule: gpu >= 80")
+
+
+def test_alert_ends_when_its_metric_disappears(clock):
+    engine = myrktop.AlertEngine(["container.*.cpu >= 50", "container.*.memory >= 1000 for 60"])
+    busy = (90.0, 2 << 30, None, 0.0, 0.0, 0.0, 0.0, 0.0)
+    engine.feed("containers", {"web": busy, "db": busy})
+    assert kinds(engine) == ["FIRING", "FIRING"]
+    engine.feed("containers", {"db": busy})
+    assert kinds(engine) == ["FIRING", "FIRING", "GONE"]
+    assert engine.events[-1].split()[2] == "container.web.cpu=90.0"
+    assert [key for _, key in engine.active] == ["container.db.cpu"]
+    # nothing is kept for the stopped container, pending or not
+    assert not any("web" in key for _, key in engine.state)
+    engine.feed("containers", {})
+    assert kinds(engine)[-1] == "GONE" and not engine.active and not engine.state
@@ -0,0 +1,74 @@
+import os
+import shutil
+import time
+
+import bench_collectors
+import myrktop
+
+
+def test_container_counters(board):
+    first = myrktop.read_containers()
+    assert len(first) == bench_collectors.CONTAINERS
+    cpu, memory, peak, psi_cpu, psi_memory, psi_io, read_mb, write_mb = first["inference-1"]
+    # rates need a previous update
+    assert (cpu, psi_cpu, read_mb, write_mb) == (0.0, 0.0, 0.0, 0.0)
+    assert (memory, peak) == (2 << 22, 3 << 22)
+
+    time.sleep(0.05)
+    bench_collectors.build_tree(board, tick=2)
+    cpu, memory, peak, psi_cpu, psi_memory, psi_io, read_mb, write_mb = myrktop.read_containers()["inference-1"]
+    assert cpu > 0 and psi_cpu > 0 and psi_io > 0
+    assert read_mb > 0 and write_mb > 0
+    assert psi_memory == psi_cpu
+
+
+def test_removed_container_is_forgotten(board):
+    myrktop.read_containers()
+    scope = f"/sys/fs/cgroup/system.slice/docker-{bench_collectors.container_id(3)}.scope"
+    assert f"{scope}/cpu.stat" in myrktop.sysfs.handles
+    shutil.rmtree(os.path.join(board, scope.lstrip("/")))
+    containers = myrktop.read_containers()
+    assert "inference-3" not in containers
+    assert len(containers) == bench_collectors.CONTAINERS - 1
+    assert not any(path.startswith(scope) for path in myrktop.sysfs.handles)
+
+
+def test_unknown_container_keeps_its_short_id(board):
+    os.remove(os.path.join(board, myrktop.DOCKER_CONTAINERS_DIR.lstrip("/"),
+                           bench_collectors.container_id(7), "config.v2.json"))
+    assert bench_collectors.container_id(7)[:12] in myrktop.read_containers()
+
+
+def test_missing_pressure_and_io_files(board, monkeypatch):
+    # A kernel without PSI, no io controller enabled for the containers and
+    # no memory controller for one of them
+    for parent in ("system.slice", "machine.slice", "docker"):
+        directory = os.path.join(board, "sys/fs/cgroup", parent)
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(".pressure") or name == "io.stat":
+                    os.remove(os.path.join(root, name))
+    scope = f"sys/fs/cgroup/system.slice/docker-{bench_collectors.container_id(2)}.scope"
+    for name in ("memory.current", "memory.peak"):
+        os.remove(os.path.join(board, scope, name))
+    resolved = []
+    resolve = myrktop.resolve_container_name
+    monkeypatch.setattr(myrktop, "resolve_container_name", lambda cid: resolved.append(cid) or resolve(cid))
+
+    myrktop.read_containers()
+    time.sleep(0.05)
+    bench_collectors.build_tree(board, tick=2)
+    containers = myrktop.read_containers()
+    assert len(containers) == bench_collectors.CONTAINERS
+    # names are resolved once, not on every update
+    assert len(resolved) == bench_collectors.CONTAINERS
+    cpu, memory, peak, psi_cpu, psi_memory, psi_io, read_mb, write_mb = containers["inference-1"]
+    assert cpu > 0 and memory == 2 << 22
+    assert (psi_cpu, psi_memory, psi_io, read_mb, write_mb) == (None,) * 5
+    assert containers["inference-2"][1:3] == (None, None)
+
+    sample = dict(myrktop.COLLECTOR_DEFAULTS, containers={"inference-1": containers["inference-1"]})
+    row = next(line for line in myrktop.build_dashboard(sample) if isinstance(line, list)
+               and line[0][1].startswith("inference-1"))
+    assert "".join(text for _, text in row).split()[-5:] == ["-"] * 5
+    assert "pressure" not in myrktop.format_openmetrics(sample)
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import bench_collectors
+import myrktop
+
+
+def proc_stat(*cores):
+    lines = ["cpu  1 2 3 4 5 6 7 8 0 0"]
+    lines += [f"cpu{core} " + " ".join(map(str, fields)) + " 0 0" for core, fields in cores]
+    return ("\n".join(lines) + "\nintr 1 2 3\ncpu9 1 1 1 1 1 1 1 1 0 0\n").encode()
+
+
+def test_parse_stops_at_intr_and_skips_unknown_cores():
+    stat = myrktop.CpuStat(core_count=4)
+    counters, present = stat.parse(proc_stat((0, range(1, 9)), (2, range(11, 19)), (7, range(8))))
+    assert present == [True, False, True, False]
+    n = myrktop.NUM_CPU_FIELDS
+    assert list(counters[:n]) == list(range(1, 9))
+    assert list(counters[2 * n:3 * n]) == list(range(11, 19))
+    assert not any(counters[n:2 * n])
+
+
+def test_per_core_deltas():
+    stat = myrktop.CpuStat(core_count=2)
+    stat.clusters = [("cpu (0-1)", [0, 1])]
+    loads, times, _ = stat.update(proc_stat((0, [0] * 8), (1, [0] * 8)))
+    # the first read has nothing to compare with
+    assert loads == {0: 0, 1: 0}
+    # core 0: 60 user + 10 nice, 20 system, 100 idle, 10 iowait; core 1 idle;
+    # a counter that went backwards (CPU hotplug) counts as zero
+    loads, times, clusters = stat.update(proc_stat((0, [60, 10, 20, 100, 10, 0, 0, 0]), (1, [0, 0, 0, 200, 0, 0, 0, 0])))
+    assert loads == {0: 50, 1: 0}
+    assert times[0] == {"user": 35.0, "system": 10.0, "iowait": 5.0, "irq": 0.0, "softirq": 0.0, "steal": 0.0}
+    assert times[1]["user"] == 0.0
+    # the cluster sums its cores' ticks before taking percentages
+    assert clusters[0][2]["user"] == pytest.approx(70 * 100 / 400)
+    loads, _, _ = stat.update(proc_stat((0, [0] * 8), (1, [0, 0, 0, 300, 0, 0, 0, 0])))
+    assert loads == {0: 0, 1: 0}
+
+
+def test_board_clusters_over_two_ticks(board):
+    myrktop.get_cpu_info()
+    bench_collectors.build_tree(board, tick=2)
+    loads, freqs, times = myrktop.get_cpu_info()
+
+    # per tick every core adds 100 user, 1 nice, 25 system, 1000 idle, 5 iowait, 1 irq, 2 softirq
+    total = 1134
+    assert loads == dict.fromkeys(range(8), 100 * (total - 1000) // total)
+    assert freqs == {**dict.fromkeys(range(4), 1800), **dict.fromkeys(range(4, 8), 2256)}
+    assert times["cores"][5]["user"] == pytest.approx(101 * 100 / total)
+    assert times["cores"][5]["system"] == pytest.approx(25 * 100 / total)
+
+    labels = [(label, cores) for label, cores, _ in times["clusters"]]
+    assert labels == [("A55 (0-3)", [0, 1, 2, 3]), ("A76 (4-7)", [4, 5, 6, 7])]
+    for _, _, percentages in times["clusters"]:
+        assert percentages["iowait"] == pytest.approx(5 * 100 / total)
+        assert percentages["softirq"] == pytest.approx(2 * 100 / total)
+
+
+def test_clusters_fall_back_to_cpufreq_policies(board):
+    os.remove(os.path.join(board, "proc/cpuinfo"))
+    clusters = myrktop.detect_cpu_clusters(8)
+    assert clusters == [("policy0 (0-3)", [0, 1, 2, 3]), ("policy4 (4-5)", [4, 5]), ("policy6 (6-7)", [6, 7])]
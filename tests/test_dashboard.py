@@ -0,0 +1,116 @@
+import urwid
+
+import myrktop
+
+
+class FakeLoop:
+    """The part of urwid.MainLoop the dashboard uses for alarms."""
+
+    def __init__(self):
+        self.alarms = []
+
+    def set_alarm_in(self, delay, callback, data=None):
+        handle = [delay, callback, data]
+        self.alarms.append(handle)
+        return handle
+
+    def remove_alarm(self, handle):
+        self.alarms.remove(handle)
+        return True
+
+    def run_alarms(self):
+        alarms, self.alarms = self.alarms, []
+        for _, callback, data in alarms:
+            callback(self, data)
+
+
+def counting_builds(monkeypatch):
+    builds = []
+    build_sections = myrktop.build_sections
+
+    def counting(*args, **kwargs):
+        builds.append(args)
+        return build_sections(*args, **kwargs)
+
+    monkeypatch.setattr(myrktop, "build_sections", counting)
+    return builds
+
+
+def snapshot():
+    return dict(myrktop.COLLECTOR_DEFAULTS), set()
+
+
+def test_finishing_collectors_share_one_render(monkeypatch):
+    builds = counting_builds(monkeypatch)
+    dashboard = myrktop.DashboardWidget(snapshot)
+    loop = FakeLoop()
+    for _ in myrktop.COLLECTORS:
+        dashboard.schedule_update(loop)
+    assert len(builds) == 1 and len(loop.alarms) == 1
+    loop.run_alarms()
+    assert len(builds) == 2
+    dashboard.schedule_update(loop)
+    assert len(loop.alarms) == 1
+
+
+def test_tick_render_covers_the_scheduled_one(monkeypatch):
+    builds = counting_builds(monkeypatch)
+    dashboard = myrktop.DashboardWidget(snapshot)
+    loop = FakeLoop()
+    dashboard.schedule_update(loop)
+    dashboard.update_content()
+    assert not loop.alarms
+    assert len(builds) == 2
+
+
+
+class CountingText(urwid.Text):
+    """urwid.Text that records every set_text() call."""
+
+    calls = []
+
+    def set_text(self, markup):
+        self.calls.append(markup)
+        super().set_text(markup)
+
+
+def markups(sample):
+    return [markup for _, lines in myrktop.build_sections(sample) for markup in lines]
+
+
+def test_only_changed_rows_are_set(monkeypatch):
+    monkeypatch.setattr(urwid, "Text", CountingText)
+    monkeypatch.setattr(CountingText, "calls", [])
+    sample = dict(myrktop.COLLECTOR_DEFAULTS, gpu=(10, 800), temps=[("soc-thermal", 40), ("gpu-thermal", 41)])
+    current = [sample]
+    dashboard = myrktop.DashboardWidget(lambda: (current[0], set()))
+    widgets = list(dashboard.walker)
+    # urwid.Text.__init__ goes through set_text() too
+    assert len(CountingText.calls) == len(widgets)
+    CountingText.calls.clear()
+
+    dashboard.update_content()
+    assert not CountingText.calls
+
+    current[0] = dict(sample, gpu=(95, 800))
+    changed = [new for old, new in zip(markups(sample), markups(current[0])) if old != new]
+    assert len(changed) == 1
+    dashboard.update_content()
+    assert CountingText.calls == changed
+    assert all(new is old for new, old in zip(dashboard.walker, widgets))
+    assert len(dashboard.walker) == len(widgets)
+
+
+def test_new_rows_keep_the_focus():
+    sample = dict(myrktop.COLLECTOR_DEFAULTS, temps=[("soc-thermal", 40)])
+    current = [sample]
+    dashboard = myrktop.DashboardWidget(lambda: (current[0], set()))
+    last = len(dashboard.walker) - 1
+    dashboard.walker.set_focus(last)
+    focused = dashboard.walker[last]
+
+    # A sensor row appears above the focused bottom row
+    current[0] = dict(sample, temps=[("soc-thermal", 40), ("gpu-thermal", 41)])
+    dashboard.update_content()
+    assert len(dashboard.walker) == last + 2
+    assert dashboard.walker[dashboard.walker.focus] is focused
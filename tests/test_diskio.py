@@ -0,0 +1,60 @@
+import os
+import shutil
+
+import pytest
+
+import myrktop
+
+
+def diskstats(**disks):
+    """/proc/diskstats with the given {name: (reads, read sectors, read ms, writes, write sectors, write ms, io ms)}."""
+    lines = []
+    for minor, (name, (reads, rsect, rms, writes, wsect, wms, io_ms)) in enumerate(disks.items()):
+        lines.append(f" 259 {minor} {name} {reads} 0 {rsect} {rms} {writes} 0 {wsect} {wms} 0 {io_ms} 0 0 0 0 0 0 0")
+    return ("\n".join(lines) + "\n").encode()
+
+
+IDLE = (0,) * 7
+
+
+def test_rates(board):
+    stat = myrktop.DiskStat()
+    assert stat.update(diskstats(nvme0n1=IDLE), 10.0) == {"nvme0n1": (0.0,) * 7}
+    rates = stat.update(diskstats(nvme0n1=(200, 4000, 400, 100, 2000, 500, 1000)), 12.0)["nvme0n1"]
+    assert rates == pytest.approx((4000 * 512 / 1e6 / 2, 2000 * 512 / 1e6 / 2, 100, 50, 2.0, 5.0, 50.0))
+    assert dict(zip(myrktop.DISK_RATE_FIELDS, rates))["util_percent"] == 50.0
+    # busy time can run ahead of the wall clock interval; util stays at 100%
+    rates = stat.update(diskstats(nvme0n1=(200, 4000, 400, 100, 2000, 500, 4000)), 13.0)["nvme0n1"]
+    assert rates[2:] == (0.0, 0.0, 0.0, 0.0, 100.0)
+
+
+def test_partitions_and_virtual_devices(board):
+    data = diskstats(loop0=IDLE, zram0=IDLE, nvme0n1=IDLE, nvme0n1p1=IDLE, nvme0n1p2=IDLE, sda=IDLE, sda1=IDLE)
+    assert sorted(myrktop.DiskStat().update(data, 1.0)) == ["nvme0n1", "sda"]
+    assert sorted(myrktop.DiskStat(partitions=True).update(data, 1.0)) == \
+        ["nvme0n1", "nvme0n1p1", "nvme0n1p2", "sda", "sda1"]
+    assert sorted(myrktop.DiskStat(virtual=True).update(data, 1.0)) == ["loop0", "nvme0n1", "sda", "zram0"]
+
+
+def test_hot_unplug_and_replug(board):
+    stat = myrktop.DiskStat()
+    busy = (1000, 20000, 100, 1000, 20000, 100, 500)
+    stat.update(diskstats(nvme0n1=IDLE, sdb=busy), 1.0)
+    assert "sdb" in stat.update(diskstats(nvme0n1=IDLE, sdb=busy), 2.0)
+
+    # the USB disk is pulled: gone from diskstats and /sys/block
+    sys_block = os.path.join(board, "sys/block/sdb")
+    saved = sys_block + ".saved"
+    shutil.move(sys_block, saved)
+    assert stat.update(diskstats(nvme0n1=IDLE), 3.0) == {"nvme0n1": (0.0,) * 7}
+    assert "sdb" not in stat.disks
+
+    # plugged back in with fresh counters: primed first, then rated from zero
+    shutil.move(saved, sys_block)
+    assert stat.update(diskstats(nvme0n1=IDLE, sdb=IDLE), 4.0)["sdb"] == (0.0,) * 7
+    reads = stat.update(diskstats(nvme0n1=IDLE, sdb=(10, 80, 5, 0, 0, 0, 10)), 5.0)["sdb"][2]
+    assert reads == 10.0
+
+    # counters lower than last time (same name, a different device) count from zero
+    reads = stat.update(diskstats(nvme0n1=IDLE, sdb=(4, 32, 2, 0, 0, 0, 4)), 6.0)["sdb"][2]
+    assert reads == 4.0
@@ -0,0 +1,58 @@
+import os
+
+import bench_collectors
+import myrktop
+
+BUFINFO = b"""
+Dma-buf Objects:
+size            flags           mode            count           exp_name        ino             name
+00032768\t00000002\t00080007\t00000003\trknpu\t00012345\t<none>
+\tExclusive fence: rknpu 1 signalled
+\tAttached Devices:
+\tfdab0000.npu
+\tfdb60000.rga
+Total 2 devices attached
+
+00065536\t00000002\t00080007\t00000001\tsystem\t00012346\tframe
+\tAttached Devices:
+Total 0 devices attached
+
+
+Total 2 objects, 98304 bytes
+"""
+
+
+def test_parse_bufinfo():
+    count, total, exporters, devices = myrktop.parse_bufinfo(BUFINFO.splitlines(keepends=True))
+    assert (count, total) == (2, 98304)
+    assert exporters == {"rknpu": [1, 32768], "system": [1, 65536]}
+    assert devices == {"fdab0000.npu": 32768, "fdb60000.rga": 32768}
+
+
+def test_parse_bufinfo_streams():
+    def lines():
+        yield b"size flags mode count exp_name ino name\n"
+        for _ in range(10000):
+            yield b"00004096\t00000002\t00080007\t00000001\tsystem\t00000001\t<none>\n"
+    assert myrktop.parse_bufinfo(lines())[:2] == (10000, 4096 * 10000)
+
+
+def test_read_dmabuf(board):
+    cma_total, cma_free, count, total, exporters, devices, processes, rknpu = myrktop.read_dmabuf()
+    assert (cma_total, cma_free) == (1048576, 262144)
+    assert count == bench_collectors.DMA_BUFS
+    assert sum(n for n, _ in exporters.values()) == count
+    assert sum(size for _, size in exporters.values()) == total
+    assert set(devices) == {"fdab0000.npu", "fdb60000.rga"}
+    assert rknpu == (1073741824, 4294967296)
+
+
+def test_sysfs_stats_without_debugfs(board):
+    os.remove(os.path.join(board, myrktop.DMABUF_BUFINFO.lstrip("/")))
+    for ino, (size, exporter) in enumerate([(4096, "system"), (8192, "rknpu"), (4096, "rknpu")]):
+        bench_collectors.write(board, f"{myrktop.DMABUF_SYSFS}/{ino}/size", f"{size}\n")
+        bench_collectors.write(board, f"{myrktop.DMABUF_SYSFS}/{ino}/exporter_name", f"{exporter}\n")
+    _, _, count, total, exporters, devices, _, _ = myrktop.read_dmabuf()
+    assert (count, total) == (3, 16384)
+    assert exporters == {"system": (1, 4096), "rknpu": (2, 12288)}
+    assert devices == {}
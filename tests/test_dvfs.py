@@ -0,0 +1,54 @@
+import time
+
+import bench_collectors
+import myrktop
+
+TRANS_TABLE = """   From  :    To
+         :    408000   1008000   1800000
+   408000:         0         3         2
+  1008000:         4         0         3
+  1800000:         1         6         0
+"""
+
+DEVFREQ_TRANS_STAT = """     From  :   To
+           :  300000000  600000000 1000000000   time(ms)
+  300000000:          0          2          1        300
+* 600000000:          4          0          3        600
+ 1000000000:          1          5          0        900
+Total transition : 16
+"""
+
+
+def test_parse_time_in_state():
+    ticks = myrktop.CLOCK_TICKS
+    assert myrktop.parse_time_in_state(f"408000 {ticks}\n1800000 {3 * ticks}\n") == {408: 1.0, 1800: 3.0}
+
+
+def test_parse_trans_table():
+    # up: 3 + 2 + 3, down: 4 + 1 + 6
+    assert myrktop.parse_trans_table(TRANS_TABLE) == (8, 11)
+
+
+def test_parse_trans_table_unavailable():
+    assert myrktop.parse_trans_table("N/A\n") is None
+    assert myrktop.parse_trans_table("") is None
+
+
+def test_parse_devfreq_trans_stat():
+    states, up, down, total = myrktop.parse_devfreq_trans_stat(DEVFREQ_TRANS_STAT)
+    assert states == {300: 0.3, 600: 0.6, 1000: 0.9}
+    assert (up, down, total) == (6, 10, 16)
+
+
+def test_dvfs_residency_over_an_interval(board):
+    assert myrktop.read_dvfs() == {}
+    time.sleep(0.05)
+    bench_collectors.build_tree(board, tick=2)
+    dvfs = myrktop.read_dvfs()
+    # policy6 has no stats/ and no sampler runs, so it is left out
+    assert set(dvfs) == {"cpu0", "cpu4", "gpu"}
+    states, transitions, up, down, source = dvfs["cpu0"]
+    assert [mhz for mhz, _ in states] == [408, 1008, 1800]
+    assert abs(sum(share for _, share in states) - 100) < 1e-6
+    assert transitions > 0 and up == down
+    assert source == "stats"
@@ -0,0 +1,64 @@
+import threading
+import urllib.error
+import urllib.request
+
+import myrktop
+from conftest import free_port, wait_listening
+
+
+def test_metrics_endpoint(board, spawn):
+    port = free_port()
+    spawn("--serve", str(port), "--bind", "127.0.0.1", "--min-interval", "0", "--root", board)
+    wait_listening(port)
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as response:
+        assert response.status == 200
+        assert response.headers["Content-Type"] == myrktop.OPENMETRICS_CONTENT_TYPE
+        body = response.read().decode("utf-8")
+
+    lines = body.splitlines()
+    assert any(line.startswith("# TYPE myrktop_") for line in lines)
+    assert lines[-1] == "# EOF"
+    assert body.endswith("# EOF\n")
+    assert 'myrktop_cpu_load_percent{core="0"}' in body
+
+
+def test_unknown_path_is_404(spawn):
+    port = free_port()
+    spawn("--serve", str(port), "--bind", "127.0.0.1")
+    wait_listening(port)
+
+    try:
+        urllib.request.urlopen(f"http://127.0.0.1:{port}/nope", timeout=10)
+    except urllib.error.HTTPError as e:
+        assert e.code == 404
+    else:
+        raise AssertionError("expected 404")
+
+
+def test_sigterm_exits_cleanly(spawn):
+    port = free_port()
+    process = spawn("--serve", str(port), "--bind", "127.0.0.1")
+    wait_listening(port)
+    process.terminate()
+    assert process.wait(10) == 0
+    assert b"Traceback" not in process.stderr.read()
+
+
+def test_collectors_without_families_are_skipped(board):
+    sampler = myrktop.MetricsSampler(0.0)
+    sample = sampler.sample()
+    assert sample["procs"]
+    without = dict(sample, **{name: myrktop.COLLECTOR_DEFAULTS[name] for name in myrktop.EXPORTER_SKIPPED})
+    assert myrktop.format_openmetrics(without) == myrktop.format_openmetrics(sample)
+
+
+def test_serve_does_not_scan_processes(board, monkeypatch):
+    scans = []
+    monkeypatch.setitem(myrktop.COLLECTORS, "procs", (lambda: scans.append(1) or [], "slow"))
+    port = free_port()
+    threading.Thread(target=myrktop.run_exporter, args=(port, "127.0.0.1", 0.0), daemon=True).start()
+    wait_listening(port)
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as response:
+        assert response.read().endswith(b"# EOF\n")
+    assert not scans
@@ -0,0 +1,85 @@
+import os
+import subprocess
+
+import pytest
+
+import myrktop
+
+
+def in_namespace(script):
+    """Output of a shell script run as root in a private mount namespace; skips where that is not allowed."""
+    try:
+        result = subprocess.run(["unshare", "-rm", "sh", "-ec", script], capture_output=True, text=True, timeout=60)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        pytest.skip(f"unshare: {e}")
+    if result.returncode != 0:
+        pytest.skip(f"unshare -rm: {result.stderr.strip()}")
+    return result.stdout
+
+
+# `uptime -p` as printed by procps-ng 3.3, the version the boards ship
+@pytest.mark.parametrize("seconds, expected", [
+    (0, "up 0 minutes"),
+    (59.9, "up 0 minutes"),
+    (61, "up 1 minute"),
+    (3600, "up 1 hour"),
+    (90061, "up 1 day, 1 hour, 1 minute"),
+    (8 * 86400, "up 1 week, 1 day"),
+    (400 * 86400 + 61, "up 1 year, 5 weeks, 1 day, 1 minute"),
+    (3650 * 86400, "up 1 decade, 1 week, 3 days"),
+])
+def test_format_uptime(seconds, expected):
+    assert myrktop.format_uptime(seconds) == expected
+
+
+# Sizes in bytes and `df -h` output
+@pytest.mark.parametrize("size, expected", [
+    (0, "0"), (1023, "1023"), (4096, "4.0K"), (1024000, "1000K"), (10485760, "10M"),
+    (10485761, "11M"), (1047527424, "999M"), (1073741824, "1.0G"), (1073741825, "1.1G"),
+    (270553174016, "252G"),
+])
+def test_format_size_df(size, expected):
+    assert myrktop.format_size_df(size) == expected
+
+
+# Sizes in KiB and `free -h` output
+@pytest.mark.parametrize("kib, expected", [
+    (0, "0B"), (9, "9.0Ki"), (1000, "1.0Mi"), (10188, "9.9Mi"), (10239, "9Mi"), (592912, "579Mi"),
+    (6147400, "5.9Gi"), (1064557800, "1.0Ti"),
+])
+def test_format_size_binary(kib, expected):
+    assert myrktop.format_size_binary(kib) == expected
+
+
+def test_format_size_df_matches_df(tmp_path):
+    mount = tmp_path / "mnt"
+    mount.mkdir()
+    script = ""
+    for size, used in (("4k", 0), ("1000k", 100), ("10239k", 5000), ("1048575k", 1 << 20), ("3g", 123456789)):
+        script += (f"mount -t tmpfs -o size={size} tmpfs {mount}; head -c {used} /dev/zero > {mount}/data; "
+                   f"df -B1 --output=size,used,avail {mount} | tail -1; df -h --output=size,used,avail {mount} | tail -1; "
+                   f"umount {mount}\n")
+    lines = in_namespace(script).splitlines()
+    for exact, human in zip(lines[::2], lines[1::2]):
+        assert [myrktop.format_size_df(int(size)) for size in exact.split()] == human.split()
+
+
+def test_format_size_binary_matches_free(tmp_path):
+    script = ""
+    for i, (total, free, available, shared, cached) in enumerate([
+        (16146624, 9412412, 12933520, 9484, 1687132),
+        (1000, 1, 1000, 9, 1023),
+        (10239, 10188, 10189, 1023, 1048063),
+        (1048576, 1024, 1047552, 102400, 0),
+    ]):
+        meminfo = tmp_path / f"meminfo{i}"
+        meminfo.write_text(f"MemTotal: {total} kB\nMemFree: {free} kB\nMemAvailable: {available} kB\n"
+                           f"Buffers: 0 kB\nCached: {cached} kB\nSReclaimable: 0 kB\nShmem: {shared} kB\n"
+                           f"SwapTotal: {total} kB\nSwapFree: {free} kB\n")
+        script += f"mount --bind {meminfo} /proc/meminfo; free -k; free -h; umount /proc/meminfo\n"
+    rows = [line.split()[1:] for line in in_namespace(script).splitlines() if line.startswith(("Mem:", "Swap:"))]
+    assert len(rows) == 16
+    for block in range(0, len(rows), 4):
+        exact = rows[block] + rows[block + 1]
+        human = rows[block + 2] + rows[block + 3]
+        assert [myrktop.format_size_binary(int(kib)) for kib in exact] == human
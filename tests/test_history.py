@@ -0,0 +1,35 @@
+import myrktop
+
+
+def test_window_is_time_based():
+    fast = myrktop.HistorySeries(10.0, 10)
+    slow = myrktop.HistorySeries(10.0, 10)
+    # 30 s of samples: every 0.1 s for one series, every 3 s for the other
+    for i in range(300):
+        fast.add(float(i // 10), i / 10)
+    for i in range(10):
+        slow.add(float(i * 3), i * 3.0)
+    values, lo, avg, hi = fast.window(29.95)
+    assert len(values) == 10
+    assert (lo, hi) == (20.0, 29.0)
+    values, lo, avg, hi = slow.window(29.95)
+    # the last 10 s hold the samples at 21, 24 and 27 s; empty slots repeat them
+    assert (lo, hi) == (21.0, 27.0)
+    assert avg == 24.0
+    assert values[-1] == 27.0
+
+
+def test_window_expires():
+    series = myrktop.HistorySeries(10.0, 10)
+    series.add(50.0, 0.0)
+    assert series.window(5.0)[1:] == (50.0, 50.0, 50.0)
+    assert series.window(30.0) is None
+
+
+def test_history_line_drops_vanished_metrics():
+    history = myrktop.MetricHistory(60, lambda name: 0.5)
+    history.feed("npu", ([10, 20, 30], 1000))
+    assert history.line("npu.2", "NPU2") is not None
+    history.feed("npu", ([10, 20], 1000))
+    assert history.line("npu.2", "NPU2") is None
+    assert "max  20%" in history.line("npu.1", "NPU1")[1]
@@ -0,0 +1,49 @@
+import pytest
+
+import bench_collectors
+import myrktop
+
+HEADER = ("Inter-|   Receive                                                |  Transmit\n"
+          " face |bytes    packets errs drop fifo frame compressed multicast|"
+          "bytes    packets errs drop fifo colls carrier compressed\n")
+
+
+def net_dev(rx_bytes, tx_bytes=0):
+    return (HEADER + f"  eth0: {rx_bytes} 10 0 0 0 0 0 0 {tx_bytes} 10 0 0 0 0 0 0\n").encode()
+
+
+def test_default_filter_skips_loopback_and_veth(board):
+    myrktop.get_network_traffic()
+    rates = myrktop.get_network_traffic()
+    assert sorted(rates) == sorted(set(bench_collectors.INTERFACES) - {"lo", "veth1a2b3c"})
+    assert all(len(r) == len(myrktop.NET_RATE_FIELDS) for r in rates.values())
+
+
+def test_include_and_exclude_globs():
+    stat = myrktop.NetDevStat(include=("e*", "docker*"), exclude=("docker*",))
+    data = (HEADER + "".join(f"{ifname:>6}: " + "1 " * 16 + "\n" for ifname in bench_collectors.INTERFACES)).encode()
+    assert sorted(stat.parse(data)) == ["enP3p49s0", "enP4p65s0", "eth0"]
+
+
+def test_rates():
+    stat = myrktop.NetDevStat()
+    stat.update(net_dev(1000, 2000), 10.0)
+    rx_mbps, tx_mbps, rx_pps, *_ = stat.update(net_dev(1000 + 250000, 2000 + 125000), 12.0)["eth0"]
+    assert rx_mbps == pytest.approx(1.0)
+    assert tx_mbps == pytest.approx(0.5)
+    assert rx_pps == 0
+
+
+def test_counter_reset_is_not_a_wrap():
+    # 64-bit counters after `ip link set eth0 down/up`
+    stat = myrktop.NetDevStat()
+    stat.update(net_dev(3_000_000_000), 10.0)
+    rx_mbps = stat.update(net_dev(125_000), 11.0)["eth0"][0]
+    assert rx_mbps == pytest.approx(1.0)
+
+
+def test_32_bit_counter_wrap():
+    stat = myrktop.NetDevStat()
+    stat.update(net_dev((1 << 32) - 100_000), 10.0)
+    rx_mbps = stat.update(net_dev(25_000), 11.0)["eth0"][0]
+    assert rx_mbps == pytest.approx(1.0)
@@ -0,0 +1,35 @@
+import json
+
+import myrktop
+
+
+def test_json_keeps_float_precision():
+    out = myrktop.sample_to_json({"plugins": {"rkvdec": {"load": [12.345678, 0.04]}}}, timestamp=0)
+    assert out["plugins"] == {"rkvdec": {"load": [12.345678, 0.04]}}
+
+
+def test_agent_encoding_stays_compact():
+    assert myrktop.compact_value({"a": (1.26, [2.0149])}) == {"a": [1.3, [2.0]]}
+
+
+def test_once_skips_costly_collectors(board, capsys, monkeypatch):
+    monkeypatch.setattr(myrktop, "scheduler", myrktop.CollectorScheduler())
+    calls = []
+    monkeypatch.setattr(myrktop, "PRIME_WINDOW", 0.0)
+    for name in myrktop.ONCE_SKIPPED:
+        func, tier = myrktop.scheduler.collectors[name]
+        myrktop.scheduler.collectors[name] = (lambda func=func, name=name: calls.append(name) or func(), tier)
+
+    myrktop.run_once(True)
+    sample = json.loads(capsys.readouterr().out)
+    assert calls == []
+    assert "cpu" in sample and "temps" in sample
+    assert not set(myrktop.ONCE_SKIPPED) & set(sample)
+
+    myrktop.run_once(False)
+    assert "NVMe & USB Storage Info" not in capsys.readouterr().out
+
+    myrktop.run_once(True, full=True)
+    sample = json.loads(capsys.readouterr().out)
+    assert set(calls) == set(myrktop.ONCE_SKIPPED)
+    assert set(myrktop.ONCE_SKIPPED) <= set(sample)
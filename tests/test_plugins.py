@@ -0,0 +1,56 @@
+import bench_collectors
+import myrktop
+import pytest
+
+
+def test_int_parser():
+    parse = myrktop.compile_parser("int")
+    assert parse(b"600000000\n") == [600000000]
+    assert parse(b"\n") == []
+
+
+def test_regex_parser():
+    parse = myrktop.compile_parser(r"regex:Core\d+:\s*(\d+)%")
+    assert parse(b"NPU load:  Core0: 45%, Core1: 12%, Core2:  0%,\n") == [45.0, 12.0, 0.0]
+
+
+def test_kv_parser_separators():
+    assert myrktop.compile_parser("kv:ctxt")(b"intr 1 2 3\nctxt 123456\n") == [123456.0]
+    assert myrktop.compile_parser("kv:load")(b"\t load = 4%\n") == [4.0]
+
+
+def test_kv_parser_tolerates_padded_keys():
+    # rkisp prints "%-10s Cnt:%d", i.e. two spaces after "Interrupt"
+    parse = myrktop.compile_parser("kv:Interrupt Cnt")
+    assert parse(b"Isp online\nInterrupt  Cnt:42 ErrCnt:0\n") == [42.0]
+    assert parse(b"Interrupt Cnt: 7\n") == [7.0]
+    assert parse(b"Interrupt\tCnt=3\n") == [3.0]
+
+
+@pytest.mark.parametrize("rule", ["", "int:1", "regex:", "kv:", "kv: ", "float"])
+def test_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        myrktop.compile_parser(rule)
+
+
+def test_validate_plugin():
+    with pytest.raises(ValueError):
+        myrktop.validate_plugin({"name": "x", "metrics": {"m": {"path": "relative"}}})
+    spec = {"name": "dmc", "metrics": {"load": {"path": "devfreq:dmc/load", "parse": "regex:^(\\d+)"}}}
+    assert myrktop.validate_plugin(spec) is spec
+
+
+def test_builtin_plan(board, monkeypatch):
+    monkeypatch.setattr(myrktop, "PLAN_REUSE", 0.0)
+    plan = myrktop.plugin_plan
+    first = plan.run()
+    assert first["gpu"] == {"load": 37.0, "freq": 600.0}
+    assert first["npu"]["load"] == [45.0, 12.0, 0.0]
+    assert first["rga"]["load"] == [4.0, 0.0, 9.0]
+    assert first["rkvdec"]["load"] == [1.0, 3.5]
+    # rate metrics need two reads
+    assert "irq" not in first.get("isp", {})
+
+    bench_collectors.build_tree(board, tick=2)
+    second = plan.run()
+    assert second["isp"]["irq"] > 0
@@ -0,0 +1,13 @@
+import bench_collectors
+import myrktop
+
+
+def test_process_scan(board):
+    processes = {p[0]: p for p in myrktop.process_table.scan()}
+    assert len(processes) == bench_collectors.PROCESSES
+    pid, comm, cmdline, cpu, rss, container, cgroup = processes[bench_collectors.FIRST_PID]
+    assert comm == "worker 0"
+    assert cmdline == "python3 /opt/app/worker.py --id 0"
+    assert container == "inference-0"
+    assert rss == 256 * myrktop.process_table.page_kib
+    assert processes[bench_collectors.FIRST_PID + 1][5] == ""
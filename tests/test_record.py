@@ -0,0 +1,82 @@
+import pytest
+
+import myrktop
+
+LAYOUT = {"cores": 2, "npu": 1, "rga": 1, "temps": ["soc-thermal"], "net": ["eth0"],
+          "device": "Test board", "npu_version": "0.9.8"}
+
+
+def sample(n):
+    values = dict(myrktop.COLLECTOR_DEFAULTS)
+    values.update({
+        "cpu": ({0: n, 1: 2 * n}, {0: 1800, 1: 2256}, {"cores": {}, "clusters": []}),
+        "gpu": (n, 800),
+        "npu": ([n], 1000),
+        "rga": [n],
+        "temps": [("soc-thermal", 40 + n)],
+        "net": {"eth0": (n / 2, n / 4)},
+    })
+    return values
+
+
+def small_ring(path, records):
+    record_size = myrktop.RingFile._record_struct(LAYOUT).size
+    return myrktop.RingFile(path, LAYOUT, myrktop.RING_HEADER_SIZE + records * record_size)
+
+
+def test_record_and_replay_wrap_around(tmp_path):
+    path = str(tmp_path / "board.ring")
+    ring = small_ring(path, 3)
+    for n in range(5):
+        ring.append(sample(n), 1000.0 + n)
+    assert len(ring) == 3
+    ring.close()
+
+    ring = myrktop.RingFile(path)
+    assert ring.layout == LAYOUT and len(ring) == 3
+    # the two oldest samples were overwritten
+    timestamp, replayed = ring.read(0)
+    assert timestamp == 1002.0
+    assert replayed["cpu"][:2] == ({0: 2, 1: 4}, {0: 1800, 1: 2256})
+    assert replayed["gpu"] == (2, 800) and replayed["npu"] == ([2], 1000) and replayed["rga"] == [2]
+    assert replayed["temps"] == [("soc-thermal", 42)]
+    assert replayed["net"] == {"eth0": (1.0, 0.5)}
+    assert [ring.read(i)[0] for i in range(3)] == [1002.0, 1003.0, 1004.0]
+    ring.close()
+
+    # recording again appends to the same ring
+    ring = small_ring(path, 3)
+    ring.append(sample(5), 1005.0)
+    assert [ring.read(i)[0] for i in range(3)] == [1003.0, 1004.0, 1005.0]
+    ring.close()
+
+
+def test_other_files_are_never_overwritten(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a recording\n")
+    for layout in (LAYOUT, None):
+        with pytest.raises(ValueError, match="not a myrktop recording"):
+            myrktop.RingFile(str(path), layout)
+    assert path.read_bytes() == b"not a recording\n"
+
+
+@pytest.mark.parametrize("damage", ["truncated", "layout"])
+def test_damaged_header_is_refused(tmp_path, damage):
+    path = tmp_path / "board.ring"
+    small_ring(str(path), 3).close()
+    data = bytearray(path.read_bytes())
+    if damage == "truncated":
+        data = data[:myrktop.RING_HEADER_SIZE + 1]
+    else:
+        data[myrktop.RING_HEADER.size] = ord("[")
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError, match="damaged"):
+        myrktop.RingFile(str(path), LAYOUT)
+    assert path.read_bytes() == bytes(data)
+
+
+def test_layout_change_needs_another_file(tmp_path):
+    path = str(tmp_path / "board.ring")
+    small_ring(path, 3).close()
+    with pytest.raises(ValueError, match="different layout"):
+        myrktop.RingFile(path, dict(LAYOUT, cores=8))
@@ -0,0 +1,48 @@
+import logging
+import time
+
+import myrktop
+
+
+def failing():
+    raise OSError("gone")
+
+
+def make_scheduler(collectors):
+    return myrktop.CollectorScheduler(collectors={name: (func, "fast") for name, func in collectors.items()},
+                                      tiers={"fast": 0.01}, timeouts={name: 0.01 for name in collectors})
+
+
+def test_failing_collector_goes_stale():
+    scheduler = make_scheduler({"ok": lambda: 1, "bad": failing})
+    sample = scheduler.refresh()
+    assert sample == {"ok": 1, "bad": None}
+    time.sleep(0.05)
+    # still polled on every tick, but it never succeeds
+    scheduler.refresh()
+    sample, stale = scheduler.snapshot()
+    assert stale == {"bad"}
+
+
+def test_collector_going_stale_after_success():
+    results = [5]
+    scheduler = make_scheduler({"flaky": lambda: results.pop()})
+    scheduler.refresh()
+    time.sleep(0.05)
+    scheduler.refresh()
+    sample, stale = scheduler.snapshot()
+    assert sample == {"flaky": 5}
+    assert stale == {"flaky"}
+
+
+def test_worker_failures_are_logged_once(caplog):
+    scheduler = make_scheduler({"bad": failing})
+    scheduler.start(workers=1)
+    with caplog.at_level(logging.DEBUG, logger="myrktop"):
+        for _ in range(3):
+            scheduler.poll()
+            time.sleep(0.03)
+    errors = [r for r in caplog.records if r.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert "collector failed on bad" in errors[0].getMessage()
+    assert scheduler.snapshot()[1] == {"bad"}
@@ -0,0 +1,54 @@
+import myrktop
+
+
+def test_quantiles_and_extremes():
+    window = myrktop.SlidingWindow(10.0)
+    for i in range(100):
+        window.add(float(i + 1), i * 0.05)
+    summary = window.summary(5.0)
+    assert summary["count"] == 100
+    assert summary["mean"] == 50.5
+    assert (summary["min"], summary["max"]) == (1.0, 100.0)
+    assert (summary["p50"], summary["p95"], summary["p99"]) == (50.0, 95.0, 99.0)
+
+
+def test_out_of_range_loads_are_clamped_to_the_histogram():
+    window = myrktop.SlidingWindow(10.0)
+    window.add(-5.0, 0.0)
+    window.add(250.0, 0.0)
+    summary = window.summary(0.0)
+    assert (summary["p50"], summary["p99"]) == (0.0, 100.0)
+    assert (summary["min"], summary["max"]) == (-5.0, 250.0)
+
+
+def test_old_slots_expire():
+    window = myrktop.SlidingWindow(10.0)
+    window.add(90.0, 0.0)
+    for t in range(1, 20):
+        window.add(10.0, float(t))
+    summary = window.summary(19.0)
+    assert summary["max"] == 10.0
+    assert summary["p99"] == 10.0
+    assert window.summary(100.0) is None
+
+
+def test_ewma_follows_a_step():
+    window = myrktop.SlidingWindow(10.0)
+    window.add(0.0, 0.0)
+    window.add(100.0, 10.0)
+    # one time constant after the step
+    assert abs(window.summary(10.0)["ewma"] - 100 * (1 - 1 / 2.718281828)) < 0.01
+
+
+def test_windowed_stats_per_core():
+    stats = myrktop.WindowedStats()
+    stats.feed("npu", ([80, 0, 20], 1000))
+    stats.feed("npu", ([60, 0], 1000))
+    assert stats.summary("npu.0")["mean"] == 70.0
+    assert stats.summary("npu.2") is None
+    stats.color_by = "max"
+    assert stats.color_value("npu.0", 10) == 80.0
+    assert stats.color_value("gpu", 10) == 10
+    stats.window = "15m"
+    stats.cycle_window()
+    assert stats.window == "10s"
@@ -0,0 +1,30 @@
+import bench_collectors
+import myrktop
+
+
+def test_parse_smartctl_json():
+    record = myrktop.parse_smartctl(bench_collectors.SMARTCTL_OUTPUT)
+    assert record == {"model": "Portable SSD T7", "serial": "S5SXNG0R123456", "health": "PASSED",
+                      "temp": 36, "hours": 1234}
+
+
+def test_parse_smartctl_text():
+    text = b"""=== START OF INFORMATION SECTION ===
+Device Model:     Samsung SSD 870 EVO 1TB
+Serial Number:    S6PUNX0R000000
+SMART overall-health self-assessment test result: PASSED
+  9 Power_On_Hours          0x0032   099   099   000    Old_age   Always       -       4321
+194 Temperature_Celsius     0x0022   064   052   000    Old_age   Always       -       36
+"""
+    assert myrktop.parse_smartctl(text) == {"model": "Samsung SSD 870 EVO 1TB", "serial": "S6PUNX0R000000",
+                                            "health": "PASSED", "hours": 4321, "temp": 36}
+
+
+def test_usb_model_from_first_smartctl_report(board, monkeypatch):
+    output = bench_collectors.SMARTCTL_OUTPUT.replace(b"Portable SSD T7", b"Samsung PSSD T7 Shield")
+    monkeypatch.setattr(myrktop, "COMMAND_RUNNER", lambda argv, timeout=None: output)
+    nvme, usb = myrktop.read_storage_info()
+    assert [disk["model"] for disk in usb] == ["Samsung PSSD T7 Shield"] * len(bench_collectors.USB_DISKS)
+    assert all(disk["model"] == "Samsung SSD 980 PRO 1TB" for disk in nvme)
+    _, usb_lines = myrktop.format_storage_info((nvme, usb))
+    assert usb_lines[0] == "sda - Samsung PSSD T7 Shield | Temp: 36°C | Hours: 1234"
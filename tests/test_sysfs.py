@@ -0,0 +1,73 @@
+import os
+import threading
+
+import bench_collectors
+import myrktop
+
+
+def test_reads_past_max_handles_open_per_read(board):
+    reader = myrktop.SysfsReader(max_handles=1)
+    try:
+        assert reader.read("/proc/uptime").startswith(b"349123.45")
+        assert reader.read_int("/sys/class/devfreq/fb000000.gpu/cur_freq") == 600000000
+        assert list(reader.handles) == ["/proc/uptime"]
+        # the uncached file is still re-read on every call
+        with open(os.path.join(board, "sys/class/devfreq/fb000000.gpu/cur_freq"), "w") as f:
+            f.write("300000000\n")
+        assert reader.read_int("/sys/class/devfreq/fb000000.gpu/cur_freq") == 300000000
+    finally:
+        reader.close()
+    assert reader.handles == {}
+
+
+def test_large_files_are_read_whole(board):
+    reader = myrktop.SysfsReader(bufsize=16)
+    try:
+        data = reader.read("/proc/stat")
+    finally:
+        reader.close()
+    with open(os.path.join(board, "proc/stat"), "rb") as f:
+        assert data == f.read()
+
+
+def test_process_table_shares_the_budget_with_sysfs(board):
+    myrktop.sysfs.read("/proc/uptime")
+    table = myrktop.ProcessTable(max_fds=len(myrktop.sysfs.handles) + 1)
+    try:
+        assert len(table.scan()) == bench_collectors.PROCESSES
+        assert table.open_fds == 1
+    finally:
+        table.close()
+
+
+
+def test_close_waits_for_a_read_in_progress(board):
+    reader = myrktop.SysfsReader()
+    reader.read("/proc/uptime")
+    handle = reader.handles["/proc/uptime"]
+    fd = handle[0]
+    # a reader thread is inside _pread() on this handle
+    handle[2].acquire()
+    closer = threading.Thread(target=reader.close, args=("/proc/uptime",))
+    closer.start()
+    closer.join(0.2)
+    assert closer.is_alive()
+    assert "/proc/uptime" not in reader.handles
+    os.fstat(fd)
+    handle[2].release()
+    closer.join(5)
+    assert handle[0] == -1
+
+
+def test_read_on_a_handle_closed_meanwhile_reopens(board):
+    reader = myrktop.SysfsReader()
+    try:
+        reader.read("/proc/uptime")
+        handle = reader.handles["/proc/uptime"]
+        # what read() sees when close() wins the handle's lock
+        reader.handles["/proc/uptime"] = [-1, handle[1], handle[2]]
+        os.close(handle[0])
+        assert reader.read("/proc/uptime").startswith(b"349123.45")
+        assert reader.handles["/proc/uptime"][0] >= 0
+    finally:
+        reader.close()
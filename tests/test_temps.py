@@ -0,0 +1,29 @@
+import os
+import shutil
+
+import myrktop
+
+
+def test_chip_names_like_sensors(board):
+    readings = dict(myrktop.read_temperatures())
+    assert readings["soc_thermal-virtual-0"] == 41
+    assert readings["nvme-pci-0100"] == readings["nvme-pci-10100"] == 38
+
+
+def test_chip_names_are_resolved_once_per_device(board, monkeypatch):
+    resolved = []
+    resolve = myrktop._resolve_hwmon_chip_name
+    monkeypatch.setattr(myrktop, "_resolve_hwmon_chip_name",
+                        lambda hwmon_dir, name: resolved.append(hwmon_dir) or resolve(hwmon_dir, name))
+    first = myrktop.read_temperatures()
+    assert len(resolved) == len(first)
+    resolved.clear()
+    assert myrktop.read_temperatures() == first
+    assert not resolved
+
+    # the NVMe drive is re-plugged and registers hwmon7 again
+    hwmon, old = os.path.join(board, "sys/class/hwmon/hwmon7"), os.path.join(board, "hwmon7.old")
+    shutil.move(hwmon, old)
+    shutil.copytree(old, hwmon, symlinks=True)
+    assert myrktop.read_temperatures() == first
+    assert resolved == ["/sys/class/hwmon/hwmon7"]